@@ -1,21 +1,22 @@
-from datetime import datetime
+import sys
+from pathlib import Path
 
 from google.adk.agents import Agent
 
+# Torna o pacote `shared/` (na raiz do repositório) importável
+sys.path.append(str(Path(__file__).resolve().parents[2]))
 
-def get_current_time() -> dict:
-    """Retorna a hora atual no formato YYYY-MM-DD HH:MM:SS."""
-    # É crucial especificar o tipo de retorno da ferramenta (-> dict) e garantir
-    # que a saída seja um dicionário. Se a função retornasse um valor que não seja
-    # um dicionário (ex: uma string), o ADK o encapsularia em um dicionário genérico
-    # como {'result': 'resultado da tool'}, o que pode ser menos descritivo para o LLM.
-    # Retornar um dicionário com chaves bem nomeadas (como 'current_time')
-    # fornece um contexto muito mais rico, melhorando o funcionamento do agente.
-    return {
-        'current_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-    }
+from shared.time_tools import get_current_time  # noqa: E402
+from shared.tool_cache import ToolCache  # noqa: E402
 
+# Chamadas repetidas de get_current_time no mesmo segundo usam o resultado
+# guardado, sem executar a ferramenta de novo
+tool_cache = ToolCache()
 
+
+# A ferramenta `get_current_time` fica em `shared/time_tools.py`, compartilhada
+# com o agente do exemplo 3-litellm. Ela aceita um fuso horário opcional e
+# formata o horário no máximo uma vez por segundo para cada fuso.
 root_agent = Agent(
     name='get_current_time_agent',
     model='gemini-2.5-flash',
@@ -28,4 +29,6 @@ root_agent = Agent(
     # IMPORTANTE: Um agente pode ter ferramentas personalizadas (funções Python, como esta)
     # OU ferramentas pré-construídas (como google_search), mas não ambas ao mesmo tempo.
     tools=[get_current_time],
+    before_tool_callback=tool_cache.before_tool_callback,
+    after_tool_callback=tool_cache.after_tool_callback,
 )
@@ -1,6 +1,21 @@
+import sys
+from pathlib import Path
+
 from google.adk.agents import Agent
 from google.adk.tools import google_search
 
+# Torna o pacote `shared/` (na raiz do repositório) importável
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from shared.search_cache import SearchCache  # noqa: E402
+
+# A busca acontece dentro da própria chamada ao Gemini, então o cache fica nos
+# callbacks do modelo: perguntas equivalentes ("Notícias de IA?" e "noticias
+# de ia") reaproveitam a resposta por 15 minutos, inclusive após reiniciar.
+# O cache só é ativado com SEARCH_CACHE=1; veja também SEARCH_CACHE_DB e
+# SEARCH_RATE_LIMIT em `SearchCache.from_env`.
+search_cache = SearchCache.from_env()
+
 root_agent = Agent(
     name='google_search_agent',
     model='gemini-2.5-flash',
@@ -9,6 +24,8 @@ root_agent = Agent(
     Você é um assistente prestativo que pode usar as seguintes ferramentas:
     - google_search
     """,
+    before_model_callback=search_cache.before_model_callback,
+    after_model_callback=search_cache.after_model_callback,
     # O parâmetro 'tools' recebe uma lista de ferramentas que o agente pode chamar.
     # IMPORTANTE: Um agente pode ter ferramentas pré-construídas (como google_search)
     # OU ferramentas personalizadas (funções Python), mas não ambas ao mesmo tempo.
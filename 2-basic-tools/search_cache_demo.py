@@ -0,0 +1,171 @@
+"""Demonstração do cache de buscas do google_search_agent com um backend local.
+
+Troca o Gemini com busca por um modelo local (FakeLlm) com latência simulada
+e envia várias vezes as mesmas perguntas, escritas de formas diferentes e em
+sessões diferentes. No final mostra a taxa de acerto do cache, a latência
+economizada e o tempo de espera imposto pelo limitador de taxa.
+
+Rode duas vezes com o mesmo --db para ver o cache sobreviver à reinicialização:
+    python search_cache_demo.py --db /tmp/search_cache.db
+    python search_cache_demo.py --db /tmp/search_cache.db
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from google.adk.agents import Agent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+# Torna importáveis o agente desta pasta e o pacote `shared/` (na raiz)
+sys.path.append(str(Path(__file__).resolve().parent))
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+# O cache do agente original não é usado aqui: a demonstração cria o seu
+os.environ.pop('SEARCH_CACHE', None)
+
+from google_search_agent.agent import root_agent  # noqa: E402
+from shared.fake_llm import FakeLlm, last_user_text, text_reply  # noqa: E402
+from shared.rate_limit import SharedTokenBucket  # noqa: E402
+from shared.search_cache import SearchCache, normalize_query  # noqa: E402
+
+APP_NAME = 'Search Cache Demo'
+
+# A mesma pergunta escrita de formas diferentes
+QUERIES = [
+    [
+        'Notícias recentes sobre inteligência artificial',
+        'noticias recentes sobre inteligencia artificial?',
+        '  Notícias   recentes sobre Inteligência Artificial!',
+    ],
+    [
+        'Quais são os últimos avanços em computação quântica?',
+        'quais sao os ultimos avancos em computacao quantica',
+    ],
+    [
+        'O que é o Kit de Desenvolvimento de Agentes do Google?',
+        'o que e o kit de desenvolvimento de agentes do google',
+    ],
+    ['Previsão do tempo em São Paulo', 'previsao do tempo em sao paulo.'],
+]
+
+
+def fake_search(llm_request) -> types.Content:
+    """Backend local no lugar do Gemini com busca: responde com um 'resultado'."""
+    query = normalize_query(last_user_text(llm_request))
+    return text_reply(f'Resultados da busca para "{query}": ...')
+
+
+async def ask(runner, limit, user_id: str, text: str) -> float:
+    async with limit:
+        return await _ask(runner, user_id, text)
+
+
+async def _ask(runner, user_id: str, text: str) -> float:
+    session = await runner.session_service.create_session(
+        app_name=APP_NAME, user_id=user_id
+    )
+    message = types.Content(role='user', parts=[types.Part(text=text)])
+    start = time.perf_counter()
+    async for _ in runner.run_async(
+        user_id=user_id, session_id=session.id, new_message=message
+    ):
+        pass
+    return time.perf_counter() - start
+
+
+async def main(args):
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), 'search_cache.db')
+    limiter = None
+    if args.rpm:
+        limiter = SharedTokenBucket(
+            db_path, rate=args.rpm / 60, name='google_search'
+        )
+    search_cache = SearchCache(db_path=db_path, ttl=args.ttl, limiter=limiter)
+
+    # A ferramenta google_search só funciona com modelos Gemini, então o
+    # agente local fica apenas com a instrução e os callbacks do cache
+    model = FakeLlm(responder=fake_search, latency=args.search_latency)
+    agent = Agent(
+        name=root_agent.name,
+        model=model,
+        instruction=root_agent.instruction,
+        description=root_agent.description,
+        before_model_callback=search_cache.before_model_callback,
+        after_model_callback=search_cache.after_model_callback,
+    )
+    runner = Runner(
+        agent=agent,
+        app_name=APP_NAME,
+        session_service=InMemorySessionService(),
+    )
+
+    rng = random.Random(args.seed)
+    questions = [
+        (f'user-{index % args.users}', rng.choice(rng.choice(QUERIES)))
+        for index in range(args.requests)
+    ]
+    limit = asyncio.Semaphore(args.concurrency)
+    start = time.perf_counter()
+    latencies = await asyncio.gather(
+        *(ask(runner, limit, user_id, text) for user_id, text in questions)
+    )
+    elapsed = time.perf_counter() - start
+
+    print(
+        f'{len(questions)} perguntas em {elapsed:.2f}s '
+        f'(média {sum(latencies) / len(latencies) * 1000:.0f} ms por turno)'
+    )
+    print(f'Chamadas ao backend de busca: {model.calls}')
+    print(f'Cache de buscas: {search_cache.stats}')
+    print(f'Arquivo do cache: {db_path}')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--requests', type=int, default=40, help='Total de perguntas'
+    )
+    parser.add_argument(
+        '--users', type=int, default=5, help='Usuários (sessões) diferentes'
+    )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=4,
+        help='Perguntas em andamento ao mesmo tempo',
+    )
+    parser.add_argument(
+        '--db',
+        help='Arquivo SQLite do cache (padrão: um arquivo temporário novo)',
+    )
+    parser.add_argument(
+        '--ttl',
+        type=float,
+        default=900,
+        help='Validade de cada resposta no cache, em segundos',
+    )
+    parser.add_argument(
+        '--rpm',
+        type=float,
+        help='Limite de buscas por minuto, compartilhado entre processos',
+    )
+    parser.add_argument(
+        '--search-latency',
+        type=float,
+        default=0.8,
+        help='Latência simulada de cada busca, em segundos',
+    )
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    asyncio.run(main(parse_args()))
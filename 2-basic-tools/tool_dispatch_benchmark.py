@@ -0,0 +1,123 @@
+"""Micro-benchmark do custo de despacho de uma ferramenta de função no ADK.
+
+Compara, por chamada, o corpo da função `get_current_time` (com e sem o cache
+por segundo) com o caminho que o ADK percorre para executá-la: o
+`FunctionTool.run_async` e o `handle_function_calls_async`, que também monta
+o evento de resposta da ferramenta. Não usa o modelo nem a rede.
+
+Exemplo:
+    python tool_dispatch_benchmark.py --calls 20000
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from google.adk.agents import Agent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from google.adk.flows.llm_flows.functions import handle_function_calls_async
+from google.adk.sessions import InMemorySessionService
+from google.adk.tools import FunctionTool, ToolContext
+from google.genai import types
+
+# Torna o pacote `shared/` (na raiz do repositório) importável
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from shared.time_tools import TIME_FORMAT, get_current_time  # noqa: E402
+
+
+def uncached_get_current_time() -> dict:
+    """Versão original da ferramenta: formata o horário a cada chamada."""
+    return {'current_time': datetime.now().strftime(TIME_FORMAT)}
+
+
+def measure_sync(function, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - start) / calls
+
+
+async def measure_async(coroutine_function, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        await coroutine_function()
+    return (time.perf_counter() - start) / calls
+
+
+async def main(args):
+    agent = Agent(
+        name='dispatch_benchmark',
+        model='gemini-2.5-flash',
+        tools=[get_current_time],
+    )
+    session_service = InMemorySessionService()
+    session = await session_service.create_session(
+        app_name='Tool Dispatch Benchmark', user_id='benchmark'
+    )
+    invocation_context = InvocationContext(
+        session_service=session_service,
+        invocation_id='benchmark',
+        agent=agent,
+        session=session,
+    )
+    tool = FunctionTool(get_current_time)
+    tools_dict = {tool.name: tool}
+    function_call_event = Event(
+        author=agent.name,
+        invocation_id='benchmark',
+        content=types.Content(
+            role='model',
+            parts=[
+                types.Part(
+                    function_call=types.FunctionCall(
+                        id='call-1', name=tool.name, args={}
+                    )
+                )
+            ],
+        ),
+    )
+
+    async def run_tool():
+        await tool.run_async(
+            args={}, tool_context=ToolContext(invocation_context)
+        )
+
+    async def dispatch():
+        await handle_function_calls_async(
+            invocation_context, function_call_event, tools_dict
+        )
+
+    results = {
+        'corpo sem cache (strftime)': measure_sync(
+            uncached_get_current_time, args.calls
+        ),
+        'corpo com cache por segundo': measure_sync(
+            get_current_time, args.calls
+        ),
+        'FunctionTool.run_async': await measure_async(run_tool, args.calls),
+        'handle_function_calls_async': await measure_async(
+            dispatch, args.calls
+        ),
+    }
+
+    body = results['corpo com cache por segundo']
+    for name, seconds in results.items():
+        print(
+            f'{name:>30}: {seconds * 1e6:8.2f} µs/chamada '
+            f'({seconds / body:6.1f}x o corpo)'
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=20000)
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,168 @@
+"""Mede o tempo de inicialização (cold start) de cada agente do repositório.
+
+Para cada agente, abre um processo Python novo com `-X importtime`, carrega
+só aquele agente pelo `AgentRegistry` e lê do stderr quanto tempo cada
+import levou. Também mede o registro sozinho (descoberta, sem importar
+nenhum agente) e um worker que importa todos os agentes de uma vez.
+
+Exemplo:
+    python startup_benchmark.py
+    python startup_benchmark.py --agents greeting_agent memory_agent --repeat 5
+"""
+
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+# Torna o pacote `shared/` (na raiz do repositório) importável
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from shared.agent_registry import REPO_ROOT, AgentRegistry  # noqa: E402
+
+# Linhas do -X importtime: "import time: <self us> | <cumulativo us> | <módulo>"
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)')
+
+# Código rodado em cada processo filho
+CHILD_CODE = """
+import sys
+sys.path.insert(0, {root!r})
+from shared.agent_registry import AgentRegistry
+registry = AgentRegistry()
+failed = []
+for name in {names!r}:
+    try:
+        registry.get(name)
+    except Exception as e:
+        failed.append(f'ERRO {{name}}: {{type(e).__name__}}: {{e}}')
+if failed:
+    sys.exit('\\n'.join(failed))
+"""
+
+
+def parse_importtime(stderr: str) -> dict[str, int]:
+    """Tempo próprio (self, em µs) de cada módulo importado."""
+    modules = {}
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            modules[match.group(4)] = int(match.group(1))
+    return modules
+
+
+def run_child(names: list[str]) -> dict:
+    start = time.perf_counter()
+    process = subprocess.run(
+        [
+            sys.executable,
+            '-X',
+            'importtime',
+            '-c',
+            CHILD_CODE.format(root=str(REPO_ROOT), names=names),
+        ],
+        capture_output=True,
+        text=True,
+        cwd=REPO_ROOT,
+    )
+    wall = time.perf_counter() - start
+    modules = parse_importtime(process.stderr)
+    error = None
+    if process.returncode != 0:
+        # Agentes que não carregaram (ex: "ERRO x: ModuleNotFoundError: ...")
+        lines = [
+            line.removeprefix('ERRO ')
+            for line in process.stderr.splitlines()
+            if line.startswith('ERRO ')
+        ]
+        error = '; '.join(lines) or f'código {process.returncode}'
+    return {'wall': wall, 'modules': modules, 'error': error}
+
+
+def measure(label: str, names: list[str], repeat: int, top: int) -> dict:
+    runs = [run_child(names) for _ in range(repeat)]
+    last = runs[-1]
+    # Tempo próprio somado por pacote de primeiro nível (ex: 'google', 'pydantic')
+    packages = Counter()
+    for module, self_us in last['modules'].items():
+        packages[module.split('.')[0]] += self_us
+    return {
+        'label': label,
+        'agents': names,
+        'wall_ms': statistics.median(run['wall'] for run in runs) * 1000,
+        'import_ms': statistics.median(
+            sum(run['modules'].values()) for run in runs
+        )
+        / 1000,
+        'modules': len(last['modules']),
+        'litellm': 'litellm' in last['modules'],
+        'top_packages': [
+            (package, self_us / 1000)
+            for package, self_us in packages.most_common(top)
+        ],
+        'error': last['error'],
+    }
+
+
+def print_result(result: dict):
+    litellm = 'sim' if result['litellm'] else 'não'
+    print(
+        f'{result["label"]:<26} {result["wall_ms"]:>9.0f} '
+        f'{result["import_ms"]:>9.0f} {result["modules"]:>8} {litellm:>8}'
+    )
+    if result['error']:
+        print(f'{"":<26} erro: {result["error"]}')
+    heaviest = ', '.join(
+        f'{package} {ms:.0f} ms' for package, ms in result['top_packages']
+    )
+    print(f'{"":<26} {heaviest}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--agents', nargs='*', help='Agentes a medir (padrão: todos)'
+    )
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=3,
+        help='Processos por medição (mostra a mediana)',
+    )
+    parser.add_argument(
+        '--top',
+        type=int,
+        default=3,
+        help='Quantos pacotes mais lentos mostrar por agente',
+    )
+    parser.add_argument('--json', help='Salva o resultado neste arquivo')
+    args = parser.parse_args()
+
+    registry = AgentRegistry()
+    names = args.agents or registry.names()
+    for name in names:
+        registry.spec(name)
+
+    print(
+        f'{"":<26} {"processo":>9} {"imports":>9} {"módulos":>8} {"litellm":>8}'
+    )
+    print(f'{"":<26} {"(ms)":>9} {"(ms)":>9}')
+    results = [measure('(só o registro)', [], args.repeat, args.top)]
+    print_result(results[0])
+    for name in names:
+        results.append(measure(name, [name], args.repeat, args.top))
+        print_result(results[-1])
+    results.append(measure('(todos os agentes)', names, args.repeat, args.top))
+    print_result(results[-1])
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+        print(f'\nResultado salvo em {args.json}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+"""Servidor local compatível com a API da OpenAI, para testes sem rede.
+
+Responde a `GET /v1/models` e `POST /v1/chat/completions` (com ou sem
+streaming) após uma latência configurável, e conta quantas conexões TCP e
+quantas requisições recebeu. Assim dá para verificar se o cliente reaproveita
+conexões (keep-alive) e quantas chamadas realmente chegam ao "provedor".
+
+Exemplo:
+    python mock_openai_server.py --port 8765 --latency 0.2
+
+E no agente:
+    LiteLlm(model='openai/mock', api_base='http://127.0.0.1:8765/v1', api_key='x')
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 mantém a conexão aberta entre requisições (keep-alive)
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            self._send_json(
+                200,
+                {
+                    'object': 'list',
+                    'data': [{'id': 'mock', 'object': 'model'}],
+                },
+            )
+        else:
+            self._send_json(404, {'error': {'message': 'not found'}})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': 'not found'}})
+            return
+
+        with self.server.lock:
+            self.server.completions += 1
+            fail = self.server.fail_next > 0
+            if fail:
+                self.server.fail_next -= 1
+        time.sleep(self.server.latency)
+        if fail:
+            self._send_json(
+                429, {'error': {'message': 'Rate limit', 'code': 429}}
+            )
+            return
+
+        text = f'Resposta simulada para: {_last_user_text(request)}'
+        if request.get('stream'):
+            self._stream(request, text)
+        else:
+            self._send_json(200, _completion(request, text))
+
+    def _stream(self, request: dict, text: str):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        completion_id = f'chatcmpl-{uuid.uuid4().hex}'
+        words = text.split(' ')
+        for i, word in enumerate(words):
+            chunk = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': request.get('model', 'mock'),
+                'choices': [
+                    {
+                        'index': 0,
+                        'delta': {
+                            'role': 'assistant',
+                            'content': word if i == 0 else f' {word}',
+                        },
+                        'finish_reason': (
+                            'stop' if i == len(words) - 1 else None
+                        ),
+                    }
+                ],
+            }
+            self._write_chunk(f'data: {json.dumps(chunk)}\n\n'.encode())
+        self._write_chunk(b'data: [DONE]\n\n')
+        self._write_chunk(b'')
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f'{len(data):x}\r\n'.encode() + data + b'\r\n')
+        self.wfile.flush()
+
+
+def _last_user_text(request: dict) -> str:
+    for message in reversed(request.get('messages', [])):
+        if message.get('role') == 'user':
+            content = message.get('content')
+            if isinstance(content, list):
+                return ' '.join(
+                    part.get('text', '')
+                    for part in content
+                    if isinstance(part, dict)
+                )
+            return content or ''
+    return ''
+
+
+def _completion(request: dict, text: str) -> dict:
+    prompt_tokens = sum(
+        len(str(m.get('content', ''))) for m in request.get('messages', [])
+    )
+    completion_tokens = len(text)
+    return {
+        'id': f'chatcmpl-{uuid.uuid4().hex}',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': request.get('model', 'mock'),
+        'choices': [
+            {
+                'index': 0,
+                'message': {'role': 'assistant', 'content': text},
+                'finish_reason': 'stop',
+            }
+        ],
+        'usage': {
+            'prompt_tokens': prompt_tokens // 4,
+            'completion_tokens': completion_tokens // 4,
+            'total_tokens': (prompt_tokens + completion_tokens) // 4,
+        },
+    }
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    """Servidor que roda em uma thread própria; use como context manager."""
+
+    daemon_threads = True
+
+    def __init__(
+        self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0
+    ):
+        super().__init__((host, port), MockOpenAIHandler)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.completions = 0
+        # Quantas das próximas chamadas respondem 429 (limite de taxa)
+        self.fail_next = 0
+        self._thread: threading.Thread | None = None
+
+    @property
+    def api_base(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def reset_counters(self):
+        with self.lock:
+            self.connections = 0
+            self.completions = 0
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument(
+        '--latency',
+        type=float,
+        default=0.2,
+        help='Latência de cada resposta, em segundos',
+    )
+    args = parser.parse_args()
+    server = MockOpenAIServer(args.host, args.port, args.latency)
+    print(f'Servidor simulado em {server.api_base}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -1,24 +1,50 @@
 import os
-from datetime import datetime
+import sys
+from pathlib import Path
 
 from google.adk.agents import Agent
-from google.adk.models.lite_llm import LiteLlm
 
+# Torna o pacote `shared/` (na raiz do repositório) importável
+sys.path.append(str(Path(__file__).resolve().parents[2]))
 
-def get_current_time() -> dict:
-    """Retorna a hora atual no formato YYYY-MM-DD HH:MM:SS."""
-    return {
-        'current_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-    }
+from shared.model_router import RouterLlm  # noqa: E402
+from shared.pooled_lite_llm import PooledLiteLlm  # noqa: E402
+from shared.time_tools import get_current_time  # noqa: E402
+from shared.tool_cache import ToolCache  # noqa: E402
+
+# Chamadas repetidas de get_current_time no mesmo segundo usam o resultado
+# guardado, sem executar a ferramenta de novo
+tool_cache = ToolCache()
 
 
 # Para usar um modelo de outro provedor, instanciamos a classe 'LiteLlm'.
-model = LiteLlm(
+# Aqui usamos o 'PooledLiteLlm', que aceita os mesmos argumentos, mas
+# reaproveita conexões HTTP (keep-alive), abre o pool antecipadamente e junta
+# requisições idênticas feitas ao mesmo tempo em uma única chamada.
+openrouter_model = PooledLiteLlm(
     # 'model' especifica o modelo que você deseja usar.
     model='openrouter/openai/gpt-4.1-nano',
     api_key=os.getenv('OPENROUTER_API_KEY'),
+    # Número máximo de conexões mantidas abertas com o provedor
+    pool_size=int(os.getenv('LITELLM_POOL_SIZE', '20')),
 )
 
+# Com OPENAI_API_KEY definida, o mesmo modelo também fica disponível direto na
+# OpenAI e o 'RouterLlm' escolhe, a cada chamada, o provedor mais rápido e
+# saudável (e recorre ao outro quando um deles fica lento ou falha).
+if os.getenv('OPENAI_API_KEY'):
+    model = RouterLlm(
+        backends=[
+            openrouter_model,
+            PooledLiteLlm(
+                model='openai/gpt-4.1-nano',
+                api_key=os.getenv('OPENAI_API_KEY'),
+            ),
+        ]
+    )
+else:
+    model = openrouter_model
+
 root_agent = Agent(
     name='openai_agent',
     model=model,
@@ -28,4 +54,6 @@ root_agent = Agent(
     - get_current_time
     """,
     tools=[get_current_time],
+    before_tool_callback=tool_cache.before_tool_callback,
+    after_tool_callback=tool_cache.after_tool_callback,
 )
@@ -0,0 +1,117 @@
+"""Compara o LiteLlm padrão com o PooledLiteLlm contra o servidor simulado.
+
+Dispara rodadas de requisições simultâneas (parte delas idênticas) e mede a
+latência, quantas conexões TCP o servidor recebeu e quantas chamadas chegaram
+até ele. Não usa rede nem chaves de API.
+
+Exemplo:
+    python pool_benchmark.py --requests 50 --rounds 5 --latency 0.1
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from google.adk.models import LlmRequest
+from google.adk.models.lite_llm import LiteLlm
+from google.genai import types
+from mock_openai_server import MockOpenAIServer
+
+# Torna o pacote `shared/` (na raiz do repositório) importável
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from shared.pooled_lite_llm import PooledLiteLlm  # noqa: E402
+
+
+def make_request(text: str) -> LlmRequest:
+    return LlmRequest(
+        contents=[types.Content(role='user', parts=[types.Part(text=text)])],
+        config=types.GenerateContentConfig(),
+    )
+
+
+async def run_rounds(model, args) -> list[float]:
+    latencies = []
+
+    async def call(i: int):
+        # Metade das perguntas se repete dentro da rodada
+        text = f'pergunta {i % (args.requests // 2 or 1)}'
+        start = time.perf_counter()
+        async for _ in model.generate_content_async(make_request(text)):
+            pass
+        latencies.append(time.perf_counter() - start)
+
+    for _ in range(args.rounds):
+        await asyncio.gather(*(call(i) for i in range(args.requests)))
+    return latencies
+
+
+async def measure(name: str, model, server: MockOpenAIServer, args) -> dict:
+    server.reset_counters()
+    if isinstance(model, PooledLiteLlm):
+        await model.warm()
+        # As conexões do pré-aquecimento não contam para as rodadas
+        server.reset_counters()
+    start = time.perf_counter()
+    latencies = await run_rounds(model, args)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'model': name,
+        'wall_s': round(elapsed, 3),
+        'p50_ms': round(statistics.median(latencies) * 1000, 1),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+        'tcp_connections': server.connections,
+        'upstream_calls': server.completions,
+    }
+
+
+async def main(args):
+    with MockOpenAIServer(latency=args.latency) as server:
+        common = {
+            'model': 'openai/mock',
+            'api_base': server.api_base,
+            'api_key': 'mock',
+        }
+        # O LiteLlm padrão roda antes: o PooledLiteLlm troca os clientes
+        # HTTP globais do LiteLLM para o processo inteiro
+        results = [
+            await measure('LiteLlm', LiteLlm(**common), server, args),
+            await measure(
+                'PooledLiteLlm',
+                PooledLiteLlm(**common, pool_size=args.pool_size),
+                server,
+                args,
+            ),
+        ]
+
+    for result in results:
+        print(
+            f'{result["model"]:>14}: {result["wall_s"]}s no total, '
+            f'p50={result["p50_ms"]}ms p95={result["p95_ms"]}ms, '
+            f'{result["tcp_connections"]} conexões TCP, '
+            f'{result["upstream_calls"]} chamadas ao servidor'
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--requests', type=int, default=20, help='Requisições por rodada'
+    )
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--pool-size', type=int, default=20)
+    parser.add_argument(
+        '--latency',
+        type=float,
+        default=0.1,
+        help='Latência do servidor simulado, em segundos',
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,376 @@
+"""Geração de e-mails em lote com o email_agent.
+
+Lê os pedidos de um arquivo JSONL (`{"id": ..., "prompt": ...}` por linha, ou
+apenas o texto do pedido) e grava cada `EmailContent` validado em outro JSONL,
+na ordem em que ficam prontos. Um único `Runner` atende todos os pedidos, com
+limite de concorrência, limite de taxa (token bucket) e nova tentativa com
+espera exponencial quando o provedor recusa por limite de taxa.
+
+Exemplo:
+    python batch_emails.py pedidos.jsonl -o emails.jsonl --concurrency 8 --rpm 300
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Iterable, Optional
+
+from dotenv import load_dotenv
+from google.adk.agents import LlmAgent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+# Torna o pacote `shared/` (na raiz do repositório) importável
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from email_agent.agent import (  # noqa: E402
+    EmailContent,
+    instruction_template,
+    output_guard,
+    root_agent,
+)
+from shared.fake_llm import FakeLlm, last_user_text, text_reply  # noqa: E402
+from shared.rate_limit import (  # noqa: E402
+    TokenBucket,
+    backoff_delay,
+    is_rate_limit_error,
+)
+from shared.structured_output import StructuredOutputGuard  # noqa: E402
+
+load_dotenv()
+
+APP_NAME = 'Email Batch'
+USER_ID = 'batch'
+
+
+@dataclass
+class EmailRequest:
+    id: str
+    prompt: str
+    # Linha da entrada que não pôde ser lida (o pedido falha sem chamar o modelo)
+    error: Optional[str] = None
+
+
+@dataclass
+class BatchResult:
+    id: str
+    email: Optional[EmailContent] = None
+    error: Optional[str] = None
+    attempts: int = 1
+    latency: float = 0.0
+
+    def to_json(self) -> str:
+        record = {'id': self.id, 'attempts': self.attempts}
+        if self.email is not None:
+            record['email'] = self.email.model_dump()
+        else:
+            record['error'] = self.error
+        record['latency_ms'] = round(self.latency * 1000, 1)
+        return json.dumps(record, ensure_ascii=False)
+
+
+def with_guard(agent: LlmAgent, guard: StructuredOutputGuard) -> LlmAgent:
+    """Cópia do agente com `guard` no lugar do `output_guard` do email_agent.
+
+    Os demais callbacks (cache de respostas, instrução) continuam os mesmos.
+    """
+    swap = {
+        output_guard.before_model_callback: guard.before_model_callback,
+        output_guard.after_model_callback: guard.after_model_callback,
+    }
+
+    def replace(callbacks):
+        if callbacks is None:
+            return None
+        if not isinstance(callbacks, list):
+            callbacks = [callbacks]
+        return [swap.get(callback, callback) for callback in callbacks]
+
+    return agent.model_copy(
+        update={
+            'before_model_callback': replace(agent.before_model_callback),
+            'after_model_callback': replace(agent.after_model_callback),
+        }
+    )
+
+
+class EmailBatch:
+    """Executa muitos pedidos de e-mail em paralelo sobre um único Runner.
+
+    Cada pedido usa uma sessão própria e descartável (o agente não depende de
+    histórico), apagada ao final para que a memória não cresça com o lote.
+    """
+
+    def __init__(
+        self,
+        agent: LlmAgent = root_agent,
+        *,
+        concurrency: int = 8,
+        requests_per_minute: Optional[float] = None,
+        burst: Optional[float] = None,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+    ):
+        self.bucket = (
+            TokenBucket(requests_per_minute / 60, burst)
+            if requests_per_minute
+            else None
+        )
+        # Guard próprio do lote: as novas tentativas (saída inválida) também
+        # gastam cota do `bucket`, sem alterar o `output_guard` compartilhado
+        # pelo `root_agent`
+        self.guard = StructuredOutputGuard(
+            EmailContent,
+            model=agent.canonical_model,
+            max_retries=output_guard.max_retries,
+            limiter=self.bucket,
+        )
+        agent = with_guard(agent, self.guard)
+        self.session_service = InMemorySessionService()
+        self.runner = Runner(
+            **instruction_template.runner_args(APP_NAME, agent),
+            session_service=self.session_service,
+        )
+        self.output_key = agent.output_key
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.completed = 0
+        self.failed = 0
+        self.rate_limited = 0
+
+    async def _run_once(self, request: EmailRequest) -> EmailContent:
+        session = await self.session_service.create_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id=str(uuid.uuid4())
+        )
+        try:
+            email = None
+            async for event in self.runner.run_async(
+                user_id=USER_ID,
+                session_id=session.id,
+                new_message=types.Content(
+                    role='user', parts=[types.Part(text=request.prompt)]
+                ),
+            ):
+                # O ADK já validou a saída e a gravou em `output_key`
+                state_delta = (
+                    event.actions.state_delta if event.actions else {}
+                )
+                if self.output_key in state_delta:
+                    email = EmailContent.model_validate(
+                        state_delta[self.output_key]
+                    )
+            if email is None:
+                raise ValueError('O agente não produziu um e-mail.')
+            return email
+        finally:
+            await self.session_service.delete_session(
+                app_name=APP_NAME, user_id=USER_ID, session_id=session.id
+            )
+
+    async def generate(self, request: EmailRequest) -> BatchResult:
+        start = time.perf_counter()
+        if request.error is not None:
+            self.failed += 1
+            return BatchResult(request.id, error=request.error, attempts=0)
+        for attempt in range(self.max_retries + 1):
+            if self.bucket is not None:
+                await self.bucket.acquire()
+            try:
+                email = await self._run_once(request)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.max_retries:
+                    self.failed += 1
+                    return BatchResult(
+                        request.id,
+                        error=f'{type(e).__name__}: {e}',
+                        attempts=attempt + 1,
+                        latency=time.perf_counter() - start,
+                    )
+                # Limite de taxa: pausa o lote inteiro, não só este pedido
+                self.rate_limited += 1
+                if self.bucket is not None:
+                    self.bucket.drain()
+                await asyncio.sleep(backoff_delay(attempt, self.backoff))
+                continue
+
+            self.completed += 1
+            return BatchResult(
+                request.id,
+                email=email,
+                attempts=attempt + 1,
+                latency=time.perf_counter() - start,
+            )
+
+    async def run(
+        self, requests: Iterable[EmailRequest]
+    ) -> AsyncIterator[BatchResult]:
+        """Gera os e-mails e os devolve na ordem em que ficam prontos.
+
+        Os pedidos são lidos do iterável sob demanda: nunca há mais que
+        `concurrency` em andamento, mesmo com milhares na fila.
+        """
+        pending: set[asyncio.Task] = set()
+        requests = iter(requests)
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < self.concurrency:
+                request = next(requests, None)
+                if request is None:
+                    exhausted = True
+                    break
+                pending.add(asyncio.create_task(self.generate(request)))
+            if not pending:
+                return
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                yield task.result()
+
+
+def parse_request(number: int, line: str) -> EmailRequest:
+    """Um pedido da entrada; linhas inválidas viram um pedido com `error`."""
+    if not line.startswith('{'):
+        return EmailRequest(str(number), line)
+    try:
+        record = json.loads(line)
+        return EmailRequest(str(record.get('id', number)), record['prompt'])
+    except (ValueError, KeyError, AttributeError) as e:
+        return EmailRequest(
+            str(number), '', error=f'Linha {number} inválida: {e!r}'
+        )
+
+
+def read_requests(path: str) -> Iterable[EmailRequest]:
+    """Lê os pedidos linha a linha (use '-' para a entrada padrão)."""
+    if path == '-':
+        # A entrada padrão não é nossa: lê sem fechar
+        lines = sys.stdin
+    else:
+        lines = open(path, encoding='utf-8')
+    try:
+        for number, line in enumerate(lines, start=1):
+            line = line.strip()
+            if line:
+                yield parse_request(number, line)
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+
+
+def fake_email(llm_request) -> types.Content:
+    """Resposta local para testar o lote sem gastar cota do provedor."""
+    prompt = last_user_text(llm_request)
+    return text_reply(
+        json.dumps(
+            {
+                'subject': prompt[:60],
+                'body': f'Olá,\n\n{prompt}\n\nAtenciosamente',
+            },
+            ensure_ascii=False,
+        )
+    )
+
+
+async def main(args):
+    agent = root_agent
+    if args.fake:
+        agent = LlmAgent(
+            name=root_agent.name,
+            model=FakeLlm(
+                responder=fake_email,
+                latency=args.model_latency,
+                prefix_cache=True,
+            ),
+            instruction=root_agent.instruction,
+            description=root_agent.description,
+            output_schema=root_agent.output_schema,
+            output_key=root_agent.output_key,
+            before_model_callback=root_agent.before_model_callback,
+            after_model_callback=root_agent.after_model_callback,
+        )
+
+    batch = EmailBatch(
+        agent,
+        concurrency=args.concurrency,
+        requests_per_minute=args.rpm,
+        max_retries=args.max_retries,
+    )
+    output = (
+        sys.stdout
+        if args.output == '-'
+        else open(args.output, 'w', encoding='utf-8')
+    )
+    start = time.perf_counter()
+    try:
+        async for result in batch.run(read_requests(args.input)):
+            output.write(result.to_json() + '\n')
+            output.flush()
+    finally:
+        # Só fecha o arquivo aberto aqui, nunca a saída padrão
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - start
+
+    total = batch.completed + batch.failed
+    print(
+        f'{batch.completed}/{total} e-mails em {elapsed:.1f}s '
+        f'({total / elapsed if elapsed else 0:.1f}/s), '
+        f'{batch.failed} falhas, {batch.rate_limited} recusas por limite de taxa',
+        file=sys.stderr,
+    )
+    print(f'Validação da saída: {batch.guard.stats}', file=sys.stderr)
+    print(f'Instrução: {instruction_template.stats}', file=sys.stderr)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        'input', help="Arquivo JSONL com os pedidos ('-' para stdin)"
+    )
+    parser.add_argument(
+        '-o',
+        '--output',
+        default='-',
+        help="Arquivo JSONL de saída ('-' para stdout)",
+    )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=8,
+        help='Máximo de pedidos em andamento ao mesmo tempo',
+    )
+    parser.add_argument(
+        '--rpm',
+        type=float,
+        help='Limite de chamadas ao modelo por minuto (cota do provedor)',
+    )
+    parser.add_argument(
+        '--max-retries',
+        type=int,
+        default=5,
+        help='Novas tentativas quando o provedor recusa por limite de taxa',
+    )
+    parser.add_argument(
+        '--fake',
+        action='store_true',
+        help='Usa um modelo local (FakeLlm) em vez do Gemini',
+    )
+    parser.add_argument(
+        '--model-latency',
+        type=float,
+        default=0.5,
+        help='Latência simulada do modelo local, em segundos',
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    asyncio.run(main(parse_args()))
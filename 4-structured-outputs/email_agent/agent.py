@@ -1,6 +1,16 @@
+import sys
+from pathlib import Path
+
 from google.adk.agents import LlmAgent
 from pydantic import BaseModel, Field
 
+# Torna o pacote `shared/` (na raiz do repositório) importável
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from shared.prompt_template import PromptTemplate  # noqa: E402
+from shared.response_cache import ResponseCache  # noqa: E402
+from shared.structured_output import StructuredOutputGuard  # noqa: E402
+
 
 # Define a estrutura de dados desejada para a saída do LLM.
 class EmailContent(BaseModel):
@@ -14,17 +24,24 @@ class EmailContent(BaseModel):
     )
 
 
-root_agent = LlmAgent(
-    name='email_agent',
-    model='gemini-2.5-flash',
-    # A instrução é FUNDAMENTAL para guiar o agente. Sempre inclua UMA PARTE CLARA
-    # na instrução especificando o modelo de saída desejado. isso ajuda a IA a
-    # entender exatamente como deve estruturar a resposta, reduz drasticamente a
-    # chance de erros de formatação, diminui o número de tentativas necessárias
-    # (retries) e evita respostas fora do padrão ("crashs" de parsing). Quando a
-    # LLM sabe qual é o modelo de saída esperado, ela tem MUITO MAIS CHANCE de
-    # gerar um resultado válido de primeira, o que otimiza o fluxo da aplicação.
-    instruction="""
+MODEL = 'gemini-2.5-flash'
+
+# Cache opcional de respostas (ative com RESPONSE_CACHE=1). Como este agente
+# não usa ferramentas, a mesma instrução com o mesmo pedido sempre pode
+# reaproveitar a resposta anterior em vez de chamar o modelo de novo.
+response_cache = ResponseCache.from_env()
+
+# Valida a resposta com o validador já compilado do EmailContent e corrige
+# localmente defeitos comuns de JSON (vírgula sobrando, cercas ```json, texto
+# truncado). Só chama o modelo (o mesmo do agente) de novo quando não há
+# conserto possível.
+output_guard = StructuredOutputGuard(EmailContent, model=MODEL, max_retries=1)
+
+# A instrução não tem placeholders: é compilada uma única vez e enviada
+# sempre igual, então o provedor pode reaproveitá-la (context caching) de um
+# pedido para o outro. O exemplo de JSON abaixo não é um placeholder.
+instruction_template = PromptTemplate(
+    """
         Você é um Assistente de Geração de E-mail.
         Sua tarefa é gerar um e-mail profissional com base na solicitação do usuário.
 
@@ -41,11 +58,24 @@ root_agent = LlmAgent(
         IMPORTANTE: Sua resposta DEVE ser um JSON válido que corresponda a esta estrutura:
         {
             "subject": "Assunto aqui",
-            "body": "Corpo do e-mail aqui com parágrafos e formatação adequados",
+            "body": "Corpo do e-mail aqui com parágrafos e formatação adequados"
         }
 
         NÃO inclua nenhuma explicação ou texto adicional fora da resposta JSON.
-    """,
+    """
+)
+
+root_agent = LlmAgent(
+    name='email_agent',
+    model=MODEL,
+    # A instrução é FUNDAMENTAL para guiar o agente. Sempre inclua UMA PARTE CLARA
+    # na instrução especificando o modelo de saída desejado. isso ajuda a IA a
+    # entender exatamente como deve estruturar a resposta, reduz drasticamente a
+    # chance de erros de formatação, diminui o número de tentativas necessárias
+    # (retries) e evita respostas fora do padrão ("crashs" de parsing). Quando a
+    # LLM sabe qual é o modelo de saída esperado, ela tem MUITO MAIS CHANCE de
+    # gerar um resultado válido de primeira, o que otimiza o fluxo da aplicação.
+    instruction=instruction_template.instruction,
     description='Gera e-mails profissionais com assunto e corpo estruturados',
     # 'output_schema' informa ao agente qual é a estrutura de saída esperada.
     # IMPORTANTE: Um agente que define um 'output_schema' para saídas estruturadas
@@ -55,4 +85,16 @@ root_agent = LlmAgent(
     # 'output_key' define a chave sob a qual a resposta JSON validada
     # será armazenada no estado da sessão para uso posterior.
     output_key='email',
+    # Callbacks rodam em ordem. O guard vem antes do cache na volta do modelo
+    # para que apenas respostas já corrigidas sejam guardadas.
+    before_model_callback=[
+        response_cache.before_model_callback,
+        output_guard.before_model_callback,
+        instruction_template.before_model_callback,
+    ],
+    after_model_callback=[
+        instruction_template.after_model_callback,
+        output_guard.after_model_callback,
+        response_cache.after_model_callback,
+    ],
 )
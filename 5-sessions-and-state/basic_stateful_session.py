@@ -2,19 +2,36 @@ import asyncio
 import uuid
 
 from dotenv import load_dotenv
+from fan_out import ask_many
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
 from google.genai import types
-from question_answering_agent import question_answering_agent
+from question_answering_agent import (
+    instruction_template,
+    question_answering_agent,
+)
+from sharded_session_service import ShardedSessionService
 
 load_dotenv()
 
+FAQ_QUESTIONS = [
+    'Qual é o meu nome?',
+    'Quais esportes eu pratico?',
+    'Qual é a minha comida favorita?',
+    'Qual série você me recomendaria assistir de novo?',
+    'O que eu gosto de fazer no tempo livre?',
+]
+
 
 async def main():
     # `InMemorySessionService` é uma implementação de SessionService que armazena
     # todas as sessões na memória. É ideal para desenvolvimento e testes, mas
     # para produção, é ideal usar outro tipos de serviço de sessões.
-    session_service_stateful = InMemorySessionService()
+    # O `ShardedSessionService` também guarda as sessões em memória, mas com
+    # limite de uso (64 MB aqui), descarte das sessões inativas após 30
+    # minutos e leituras sem `deepcopy`, então pode rodar em processos longos.
+    session_service_stateful = ShardedSessionService(
+        max_bytes=64 * 1024 * 1024, ttl=30 * 60
+    )
 
     # 'initial_state' é um dicionário que define o state inicial da sessão.
     # O agente usará estes dados como seu contexto inicial.
@@ -44,8 +61,7 @@ async def main():
     # ele recebe a mensagem do usuário, inicia o agente, processa as respostas,
     # atualiza o estado da conversa e garante que cada etapa aconteça na ordem certa.
     runner = Runner(
-        agent=question_answering_agent,
-        app_name=APP_NAME,
+        **instruction_template.runner_args(APP_NAME, question_answering_agent),
         session_service=session_service_stateful,
     )
 
@@ -56,10 +72,11 @@ async def main():
         ],
     )
 
-    # `runner.run()` gerencia o "bate-papo interno" entre o agente e os serviços,
+    # `runner.run_async()` gerencia o "bate-papo interno" entre o agente e os serviços,
     # garantindo que cada passo seja executado na ordem certa e com persistência,
-    # usando os IDs para carregar o contexto da sessão.
-    for event in runner.run(
+    # usando os IDs para carregar o contexto da sessão. (O `runner.run()`
+    # síncrono faz o mesmo, mas roda o Runner em uma thread separada.)
+    async for event in runner.run_async(
         user_id=USER_ID,
         session_id=SESSION_ID,
         new_message=new_message,
@@ -70,6 +87,21 @@ async def main():
             if event.content and event.content.parts:
                 print(f'Resposta Final: {event.content.parts[0].text}')
 
+    # Várias perguntas independentes sobre o mesmo perfil, em paralelo. Cada
+    # uma roda em um fork da sessão (que compartilha o estado), e as respostas
+    # voltam para a sessão em uma única gravação, na chave 'faq_answers'.
+    answers = await ask_many(
+        runner,
+        user_id=USER_ID,
+        session_id=SESSION_ID,
+        questions=FAQ_QUESTIONS,
+        concurrency=3,
+    )
+    print('\n==== Perguntas em Paralelo ====')
+    for answer in answers:
+        print(f'P: {answer.question}')
+        print(f'R: {answer.answer or answer.error}')
+
     print('\n==== Exploração do Estado Final da Sessão ====')
     # Após a conclusão da execução do Runner, podemos recuperar a sessão do
     # `session_service` para inspecionar seu estado final e o histórico de eventos.
@@ -82,6 +114,9 @@ async def main():
     for key, value in session.state.items():
         print(f'{key}: {value}')
 
+    # Uso de memória do session service
+    print(f'\nSession service: {session_service_stateful.stats}')
+
 
 if __name__ == '__main__':
     asyncio.run(main())
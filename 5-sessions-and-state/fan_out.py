@@ -0,0 +1,217 @@
+import asyncio
+import copy
+import time
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+from google.adk.events import Event, EventActions
+from google.adk.runners import Runner
+from google.adk.sessions import BaseSessionService, Session, State
+from google.genai import types
+
+
+@dataclass
+class FanOutAnswer:
+    question: str
+    answer: Optional[str] = None
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'question': self.question,
+            'answer': self.answer,
+            'error': self.error,
+        }
+
+
+_SHARED_PREFIXES = (State.APP_PREFIX, State.USER_PREFIX)
+
+
+class _ReadOnlyForks(BaseSessionService):
+    """Session service dos forks quando o serviço não tem `fork_session`.
+
+    Repassa tudo ao serviço original, exceto as gravações em 'user:' e 'app:':
+    elas saem do evento persistido e ficam apenas no objeto `Session` do fork,
+    visíveis para o resto da pergunta. Assim o estado compartilhado com a
+    sessão base (e com as outras sessões do usuário) nunca é alterado.
+    """
+
+    def __init__(self, inner: BaseSessionService):
+        self._inner = inner
+
+    async def create_session(self, **kwargs) -> Session:
+        return await self._inner.create_session(**kwargs)
+
+    async def get_session(self, **kwargs) -> Optional[Session]:
+        return await self._inner.get_session(**kwargs)
+
+    async def list_sessions(self, **kwargs):
+        return await self._inner.list_sessions(**kwargs)
+
+    async def delete_session(self, **kwargs) -> None:
+        await self._inner.delete_session(**kwargs)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        delta = event.actions.state_delta if event.actions else None
+        shared = {
+            key: value
+            for key, value in (delta or {}).items()
+            if key.startswith(_SHARED_PREFIXES)
+        }
+        if not shared:
+            return await self._inner.append_event(session=session, event=event)
+        stored = event.model_copy(
+            update={
+                'actions': event.actions.model_copy(
+                    update={
+                        'state_delta': {
+                            key: value
+                            for key, value in delta.items()
+                            if key not in shared
+                        }
+                    }
+                )
+            }
+        )
+        await self._inner.append_event(session=session, event=stored)
+        session.state.update(shared)
+        return event
+
+
+def _with_read_only_forks(runner: Runner) -> Runner:
+    """Cópia rasa do Runner (mesmo agente, plugins e serviços) cujo session
+    service não deixa os forks gravarem em 'user:' e 'app:'."""
+    forks_runner = copy.copy(runner)
+    forks_runner.session_service = _ReadOnlyForks(runner.session_service)
+    return forks_runner
+
+
+async def _fork(runner: Runner, base: Session) -> Session:
+    """Sessão de trabalho com o estado (e o histórico) da sessão base.
+
+    Com o `fork_session` do `ShardedSessionService`, nada do que a pergunta
+    gravar (nem em 'user:' ou 'app:') chega à sessão base. Nos outros session
+    services, o fork é uma sessão nova com uma cópia do estado da sessão, e o
+    `ask_many` a executa com `_ReadOnlyForks`, que descarta as gravações em
+    'user:' e 'app:' antes de chegarem ao serviço.
+    """
+    service = runner.session_service
+    fork_session = getattr(service, 'fork_session', None)
+    if fork_session is not None:
+        fork = await fork_session(
+            app_name=base.app_name, user_id=base.user_id, session_id=base.id
+        )
+        if fork is None:
+            raise ValueError(f'Sessão não encontrada: {base.id}')
+        return fork
+    # Session services sem fork: uma sessão nova com uma cópia do estado da
+    # sessão. 'user:' e 'app:' ficam de fora: o session service já os junta ao
+    # estado, e gravá-los de novo na criação mudaria o estado compartilhado.
+    state = {
+        key: copy.deepcopy(value)
+        for key, value in base.state.items()
+        if not key.startswith(
+            (State.APP_PREFIX, State.USER_PREFIX, State.TEMP_PREFIX)
+        )
+    }
+    return await service.create_session(
+        app_name=base.app_name, user_id=base.user_id, state=state
+    )
+
+
+async def _ask(
+    runner: Runner, base: Session, question: str, limit: asyncio.Semaphore
+) -> FanOutAnswer:
+    result = FanOutAnswer(question)
+    async with limit:
+        start = time.perf_counter()
+        fork = await _fork(runner, base)
+        try:
+            async for event in runner.run_async(
+                user_id=fork.user_id,
+                session_id=fork.id,
+                new_message=types.Content(
+                    role='user', parts=[types.Part(text=question)]
+                ),
+            ):
+                if event.is_final_response() and event.content:
+                    result.answer = ''.join(
+                        part.text or '' for part in event.content.parts or []
+                    ).strip()
+        except Exception as e:
+            result.error = f'{type(e).__name__}: {e}'
+        finally:
+            # O fork é descartável: só a resposta volta para a sessão base
+            await runner.session_service.delete_session(
+                app_name=fork.app_name,
+                user_id=fork.user_id,
+                session_id=fork.id,
+            )
+            result.elapsed = time.perf_counter() - start
+    return result
+
+
+async def ask_many(
+    runner: Runner,
+    *,
+    user_id: str,
+    session_id: str,
+    questions: Sequence[str],
+    concurrency: int = 4,
+    result_key: Optional[str] = 'faq_answers',
+) -> list[FanOutAnswer]:
+    """Faz várias perguntas independentes sobre a mesma sessão, em paralelo.
+
+    Cada pergunta roda em um fork descartável da sessão base, então as
+    respostas não veem umas às outras e a sessão base não recebe o histórico
+    de cada pergunta. No máximo `concurrency` perguntas rodam ao mesmo tempo.
+
+    Args:
+        runner: Runner do agente que responde às perguntas
+        user_id: Usuário dono da sessão base
+        session_id: Sessão base, cujo estado é usado por todas as perguntas
+        questions: Perguntas a fazer
+        concurrency: Máximo de perguntas em andamento ao mesmo tempo
+        result_key: Chave do estado em que as respostas são gravadas na sessão
+            base, em um único evento. Use None para não gravar nada.
+
+    Returns:
+        As respostas, na mesma ordem das perguntas
+    """
+    service = runner.session_service
+    base = await service.get_session(
+        app_name=runner.app_name, user_id=user_id, session_id=session_id
+    )
+    if base is None:
+        raise ValueError(f'Sessão não encontrada: {session_id}')
+
+    # Sem `fork_session`, os forks compartilham 'user:' e 'app:' com a sessão
+    # base no serviço: as perguntas rodam em um Runner que os trata como
+    # somente leitura
+    forks_runner = (
+        runner
+        if hasattr(service, 'fork_session')
+        else _with_read_only_forks(runner)
+    )
+    limit = asyncio.Semaphore(concurrency)
+    # `gather` devolve os resultados na ordem das perguntas, não na de término
+    answers = await asyncio.gather(
+        *(_ask(forks_runner, base, question, limit) for question in questions)
+    )
+
+    if result_key:
+        # Todas as respostas voltam para a sessão base em uma única gravação
+        await service.append_event(
+            base,
+            Event(
+                author='fan_out',
+                invocation_id=Event.new_id(),
+                actions=EventActions(
+                    state_delta={
+                        result_key: [answer.to_dict() for answer in answers]
+                    }
+                ),
+            ),
+        )
+    return answers
@@ -1 +1 @@
-from .agent import question_answering_agent
+from .agent import instruction_template, question_answering_agent
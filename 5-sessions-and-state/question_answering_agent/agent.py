@@ -1,13 +1,25 @@
+import sys
+from pathlib import Path
+
 from google.adk.agents import LlmAgent
 
-question_answering_agent = LlmAgent(
-    name='question_answering_agent',
-    model='gemini-2.5-flash',
-    description='Agente de resposta a perguntas',
-    # A instrução contém placeholders como {user_name} e {user_preferences}.
-    # O ADK os substitui automaticamente pelos valores do estado da sessão
-    # durante a execução, permitindo que o agente seja ciente do contexto.
-    instruction="""
+# Torna o pacote `shared/` (na raiz do repositório) importável
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from shared.prompt_template import PromptTemplate  # noqa: E402
+from shared.response_cache import ResponseCache  # noqa: E402
+
+# Cache opcional de respostas (ative com RESPONSE_CACHE=1): a mesma pergunta
+# com o mesmo estado renderizado reaproveita a resposta anterior.
+response_cache = ResponseCache.from_env()
+
+# A instrução contém placeholders como {user_name} e {user_preferences},
+# substituídos pelos valores do estado da sessão a cada turno, permitindo que
+# o agente seja ciente do contexto. O texto é compilado uma única vez e os
+# placeholders ficam no fim: o início, sempre igual, pode ficar em cache no
+# provedor.
+instruction_template = PromptTemplate(
+    """
     Você é um assistente prestativo que responde a perguntas sobre as preferências do usuário.
 
     Aqui estão algumas informações sobre o usuário:
@@ -15,5 +27,20 @@ question_answering_agent = LlmAgent(
     {user_name}
     Preferências:
     {user_preferences}
-    """,
+    """
+)
+
+question_answering_agent = LlmAgent(
+    name='question_answering_agent',
+    model='gemini-2.5-flash',
+    description='Agente de resposta a perguntas',
+    instruction=instruction_template.instruction,
+    before_model_callback=[
+        response_cache.before_model_callback,
+        instruction_template.before_model_callback,
+    ],
+    after_model_callback=[
+        instruction_template.after_model_callback,
+        response_cache.after_model_callback,
+    ],
 )
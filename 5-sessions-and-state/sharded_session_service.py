@@ -0,0 +1,513 @@
+import copy
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session, State
+from google.adk.sessions.base_session_service import (
+    GetSessionConfig,
+    ListSessionsResponse,
+)
+
+logger = logging.getLogger(__name__)
+
+SessionKey = tuple[str, str, str]
+UserKey = tuple[str, str]
+
+# Valores que podem ser compartilhados entre o armazenamento e os snapshots
+_IMMUTABLE = (str, int, float, bool, bytes, type(None))
+
+
+def _state_size(state: dict[str, Any]) -> int:
+    return len(json.dumps(state, default=str).encode()) if state else 0
+
+
+def _event_size(event: Event) -> int:
+    return len(event.model_dump_json(exclude_none=True).encode())
+
+
+def _copy_value(value: Any) -> Any:
+    """Cópia de um valor do estado; valores imutáveis não precisam de cópia."""
+    if isinstance(value, _IMMUTABLE):
+        return value
+    return copy.deepcopy(value)
+
+
+@dataclass
+class _StoredSession:
+    app_name: str
+    user_id: str
+    id: str
+    # Estado da sessão (sem 'app:' e 'user:'), com cópias próprias dos valores
+    state: dict[str, Any]
+    events: list[Event] = field(default_factory=list)
+    last_update_time: float = 0.0
+    last_access: float = 0.0
+    # Tamanho estimado do estado inicial; os eventos são contados no shard
+    size: int = 0
+    # Só nos forks: valores 'app:' e 'user:' gravados pelo próprio fork (com
+    # o prefixo), que ficam só nele em vez de mudar o estado compartilhado
+    overlay: Optional[dict[str, Any]] = None
+
+
+@dataclass
+class _Shard:
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    # Ordem de acesso: a sessão menos usada recentemente fica no início
+    sessions: 'OrderedDict[SessionKey, _StoredSession]' = field(
+        default_factory=OrderedDict
+    )
+    # Estado 'user:' de cada (app_name, user_id) deste shard, com o tamanho
+    # estimado e quantas sessões do usuário ainda estão no shard
+    user_state: dict[UserKey, dict[str, Any]] = field(default_factory=dict)
+    user_sizes: dict[UserKey, int] = field(default_factory=dict)
+    user_sessions: Counter = field(default_factory=Counter)
+    # id(evento) -> [tamanho, sessões que o guardam]: um evento compartilhado
+    # por várias sessões (forks) conta uma vez e só sai com a última delas
+    event_refs: dict[int, list[int]] = field(default_factory=dict)
+    size: int = 0
+
+
+class ShardedSessionService(BaseSessionService):
+    """Session service em memória para muitas sessões curtas em processos longos.
+
+    Diferente do `InMemorySessionService`, que guarda todas as sessões até o
+    processo terminar e faz `deepcopy` a cada leitura:
+
+    - As sessões são divididas em `num_shards` partes por (app_name, user_id),
+      cada uma com seu próprio lock. Usuários diferentes raramente disputam o
+      mesmo lock, mesmo com o Runner rodando em várias threads.
+    - Cada shard tem um limite de memória (`max_bytes / num_shards`, depois
+      de descontado o estado 'app:'), estimado pelo JSON do estado das
+      sessões, do estado 'user:' e dos eventos. Acima dele, as sessões menos
+      usadas recentemente são descartadas (LRU); o estado 'user:' sai junto
+      com a última sessão do usuário. Com `ttl`, sessões sem acesso há mais
+      de `ttl` segundos também são descartadas.
+    - Leituras devolvem um snapshot: um novo `Session` com um novo dicionário
+      de estado e uma nova lista de eventos. Só os valores mutáveis do estado
+      (listas, dicionários...) são copiados, e o estado guardado também é uma
+      cópia do que foi gravado: alterar um valor no lugar não muda o
+      armazenamento sem um evento. Os eventos em si são compartilhados (o ADK
+      não altera um evento já gravado).
+
+    `stats` mostra o uso de memória e quantas sessões foram descartadas.
+    """
+
+    def __init__(
+        self,
+        *,
+        num_shards: int = 16,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl: Optional[float] = None,
+    ):
+        if num_shards < 1:
+            raise ValueError('num_shards deve ser maior que zero.')
+        self.num_shards = num_shards
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._shards = [_Shard() for _ in range(num_shards)]
+        # Estado 'app:' é compartilhado entre todos os shards
+        self._app_state: dict[str, dict[str, Any]] = {}
+        self._app_sizes: dict[str, int] = {}
+        self._app_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted_lru = 0
+        self.evicted_ttl = 0
+
+    @property
+    def app_bytes(self) -> int:
+        with self._app_lock:
+            return sum(self._app_sizes.values())
+
+    @property
+    def shard_max_bytes(self) -> int:
+        # O estado 'app:' não pertence a nenhum shard: sai do limite de todos
+        return max(0, self.max_bytes - self.app_bytes) // self.num_shards
+
+    def _shard(self, app_name: str, user_id: str) -> _Shard:
+        return self._shards[hash((app_name, user_id)) % self.num_shards]
+
+    @property
+    def stats(self) -> dict:
+        sizes, sessions, events = [], 0, 0
+        for shard in self._shards:
+            with shard.lock:
+                sizes.append(shard.size)
+                sessions += len(shard.sessions)
+                events += sum(
+                    len(stored.events) for stored in shard.sessions.values()
+                )
+        total = self.hits + self.misses
+        app_bytes = self.app_bytes
+        return {
+            'sessions': sessions,
+            'events': events,
+            'bytes': sum(sizes) + app_bytes,
+            'app_bytes': app_bytes,
+            'max_bytes': self.max_bytes,
+            'largest_shard_bytes': max(sizes),
+            'evicted_lru': self.evicted_lru,
+            'evicted_ttl': self.evicted_ttl,
+            'hit_ratio': round(self.hits / total, 3) if total else 0.0,
+        }
+
+    # ===== Descarte =====
+
+    def _evict(self, shard: _Shard, keep: Optional[SessionKey] = None):
+        """Descarta sessões expiradas e, acima do limite, as menos usadas.
+
+        Chamado com o lock do shard. `keep` nunca é descartada (é a sessão
+        que acabou de ser usada, mesmo que sozinha passe do limite).
+        """
+        if self.ttl is not None:
+            deadline = time.time() - self.ttl
+            while shard.sessions:
+                key, stored = next(iter(shard.sessions.items()))
+                if key == keep or stored.last_access > deadline:
+                    break
+                self._drop(shard, key)
+                self.evicted_ttl += 1
+
+        max_bytes = self.shard_max_bytes
+        while shard.size > max_bytes and shard.sessions:
+            key = next(iter(shard.sessions))
+            if key == keep:
+                break
+            self._drop(shard, key)
+            self.evicted_lru += 1
+
+    # ===== Contagem de memória (chamadas com o lock do shard) =====
+
+    @staticmethod
+    def _add(shard: _Shard, key: SessionKey, stored: _StoredSession):
+        shard.sessions[key] = stored
+        shard.size += stored.size
+        shard.user_sessions[(stored.app_name, stored.user_id)] += 1
+        for event in stored.events:
+            ShardedSessionService._add_event(shard, event)
+
+    @staticmethod
+    def _add_event(shard: _Shard, event: Event):
+        ref = shard.event_refs.get(id(event))
+        if ref is None:
+            size = _event_size(event)
+            shard.event_refs[id(event)] = [size, 1]
+            shard.size += size
+        else:
+            ref[1] += 1
+
+    @staticmethod
+    def _drop(shard: _Shard, key: SessionKey):
+        ShardedSessionService._release(shard, shard.sessions.pop(key))
+
+    @staticmethod
+    def _release(shard: _Shard, stored: _StoredSession):
+        """Desconta uma sessão que já saiu de `shard.sessions`."""
+        shard.size -= stored.size
+        for event in stored.events:
+            ref = shard.event_refs[id(event)]
+            ref[1] -= 1
+            if ref[1] == 0:
+                del shard.event_refs[id(event)]
+                shard.size -= ref[0]
+        user_key = (stored.app_name, stored.user_id)
+        shard.user_sessions[user_key] -= 1
+        if shard.user_sessions[user_key] <= 0:
+            # Última sessão do usuário no shard: o estado 'user:' sai junto
+            del shard.user_sessions[user_key]
+            shard.user_state.pop(user_key, None)
+            shard.size -= shard.user_sizes.pop(user_key, 0)
+
+    @staticmethod
+    def _update_user_state(
+        shard: _Shard, user_key: UserKey, delta: dict[str, Any]
+    ):
+        user_state = shard.user_state.setdefault(user_key, {})
+        for key, value in delta.items():
+            user_state[key] = _copy_value(value)
+        size = _state_size(user_state)
+        shard.size += size - shard.user_sizes.get(user_key, 0)
+        shard.user_sizes[user_key] = size
+
+    def _update_app_state(self, app_name: str, delta: dict[str, Any]):
+        with self._app_lock:
+            app_state = self._app_state.setdefault(app_name, {})
+            for key, value in delta.items():
+                app_state[key] = _copy_value(value)
+            self._app_sizes[app_name] = _state_size(app_state)
+
+    @staticmethod
+    def _update_overlay(
+        shard: _Shard,
+        stored: _StoredSession,
+        app_delta: dict[str, Any],
+        user_delta: dict[str, Any],
+    ):
+        if not app_delta and not user_delta:
+            return
+        previous = _state_size(stored.overlay)
+        for key, value in app_delta.items():
+            stored.overlay[State.APP_PREFIX + key] = _copy_value(value)
+        for key, value in user_delta.items():
+            stored.overlay[State.USER_PREFIX + key] = _copy_value(value)
+        size = _state_size(stored.overlay) - previous
+        stored.size += size
+        shard.size += size
+
+    @staticmethod
+    def _split_state(
+        state: dict[str, Any],
+    ) -> tuple[dict[str, Any], dict[str, Any], dict[str, Any]]:
+        """Separa em (app, usuário, sessão), sem os prefixos; descarta `temp:`."""
+        app_delta, user_delta, session_delta = {}, {}, {}
+        for key, value in state.items():
+            if key.startswith(State.APP_PREFIX):
+                app_delta[key.removeprefix(State.APP_PREFIX)] = value
+            elif key.startswith(State.USER_PREFIX):
+                user_delta[key.removeprefix(State.USER_PREFIX)] = value
+            elif not key.startswith(State.TEMP_PREFIX):
+                session_delta[key] = value
+        return app_delta, user_delta, session_delta
+
+    def _expired(self, stored: _StoredSession) -> bool:
+        return (
+            self.ttl is not None
+            and time.time() - stored.last_access > self.ttl
+        )
+
+    # ===== Snapshots =====
+
+    def _snapshot(
+        self,
+        shard: _Shard,
+        stored: _StoredSession,
+        events: Optional[list[Event]] = None,
+    ) -> Session:
+        """Nova `Session` com cópias do estado e uma nova lista de eventos."""
+        state = {
+            key: _copy_value(value) for key, value in stored.state.items()
+        }
+        with self._app_lock:
+            app_state = self._app_state.get(stored.app_name)
+            if app_state:
+                for key, value in app_state.items():
+                    state[State.APP_PREFIX + key] = _copy_value(value)
+        user_state = shard.user_state.get((stored.app_name, stored.user_id))
+        if user_state:
+            for key, value in user_state.items():
+                state[State.USER_PREFIX + key] = _copy_value(value)
+        if stored.overlay:
+            for key, value in stored.overlay.items():
+                state[key] = _copy_value(value)
+        # `model_construct` não revalida (nem copia de novo) estado e eventos
+        return Session.model_construct(
+            app_name=stored.app_name,
+            user_id=stored.user_id,
+            id=stored.id,
+            state=state,
+            events=list(stored.events if events is None else events),
+            last_update_time=stored.last_update_time,
+        )
+
+    # ===== BaseSessionService =====
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session_id = (
+            session_id.strip()
+            if session_id and session_id.strip()
+            else str(uuid.uuid4())
+        )
+        now = time.time()
+        app_delta, user_delta, session_state = self._split_state(state or {})
+        session_state = {
+            key: _copy_value(value) for key, value in session_state.items()
+        }
+        stored = _StoredSession(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=session_state,
+            last_update_time=now,
+            last_access=now,
+            size=_state_size(session_state),
+        )
+        if app_delta:
+            self._update_app_state(app_name, app_delta)
+        key = (app_name, user_id, session_id)
+        shard = self._shard(app_name, user_id)
+        with shard.lock:
+            # A nova sessão entra antes de a anterior ser descontada, para
+            # não levar junto o estado 'user:'
+            previous = shard.sessions.pop(key, None)
+            self._add(shard, key, stored)
+            if previous is not None:
+                self._release(shard, previous)
+            if user_delta:
+                self._update_user_state(shard, (app_name, user_id), user_delta)
+            self._evict(shard, keep=key)
+            return self._snapshot(shard, stored)
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        key = (app_name, user_id, session_id)
+        shard = self._shard(app_name, user_id)
+        with shard.lock:
+            stored = shard.sessions.get(key)
+            if stored is not None and self._expired(stored):
+                self._drop(shard, key)
+                self.evicted_ttl += 1
+                stored = None
+            if stored is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            stored.last_access = time.time()
+            shard.sessions.move_to_end(key)
+
+            events = stored.events
+            if config is not None:
+                if config.num_recent_events:
+                    events = events[-config.num_recent_events :]
+                if config.after_timestamp:
+                    events = [
+                        event
+                        for event in events
+                        if event.timestamp >= config.after_timestamp
+                    ]
+            return self._snapshot(shard, stored, events)
+
+    async def list_sessions(
+        self, *, app_name: str, user_id: str
+    ) -> ListSessionsResponse:
+        shard = self._shard(app_name, user_id)
+        with shard.lock:
+            self._evict(shard)
+            sessions = [
+                Session(
+                    app_name=stored.app_name,
+                    user_id=stored.user_id,
+                    id=stored.id,
+                    last_update_time=stored.last_update_time,
+                )
+                for (app, user, _), stored in shard.sessions.items()
+                if app == app_name and user == user_id
+            ]
+        return ListSessionsResponse(sessions=sessions)
+
+    async def delete_session(
+        self, *, app_name: str, user_id: str, session_id: str
+    ) -> None:
+        shard = self._shard(app_name, user_id)
+        with shard.lock:
+            if (app_name, user_id, session_id) in shard.sessions:
+                self._drop(shard, (app_name, user_id, session_id))
+
+    async def fork_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        fork_id: Optional[str] = None,
+    ) -> Optional[Session]:
+        """Cria uma nova sessão a partir do estado e do histórico de outra.
+
+        O fork começa com o estado e a lista de eventos da sessão base. Os
+        valores guardados nunca são alterados no lugar, e os eventos também
+        não, então ambos são compartilhados, não duplicados: um evento conta
+        uma vez no limite de memória enquanto alguma das sessões o guardar.
+
+        Mudanças no fork não afetam a sessão base nem as outras sessões do
+        usuário: o fork vê o estado 'app:' e 'user:' compartilhado, mas o que
+        ele grava nesses escopos fica só nele e some quando ele é apagado.
+        """
+        key = (app_name, user_id, session_id)
+        shard = self._shard(app_name, user_id)
+        with shard.lock:
+            base = shard.sessions.get(key)
+            if base is None or self._expired(base):
+                return None
+            now = time.time()
+            base.last_access = now
+            shard.sessions.move_to_end(key)
+            fork = _StoredSession(
+                app_name=app_name,
+                user_id=user_id,
+                id=fork_id or str(uuid.uuid4()),
+                state=dict(base.state),
+                events=list(base.events),
+                last_update_time=base.last_update_time,
+                last_access=now,
+                size=base.size,
+                overlay={},
+            )
+            fork_key = (app_name, user_id, fork.id)
+            if fork_key in shard.sessions:
+                raise ValueError(f'A sessão {fork.id} já existe.')
+            self._add(shard, fork_key, fork)
+            self._evict(shard, keep=fork_key)
+            return self._snapshot(shard, fork)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        # Atualiza a sessão recebida (o snapshot do chamador)
+        await super().append_event(session=session, event=event)
+        if event.partial:
+            return event
+        session.last_update_time = event.timestamp
+
+        key = (session.app_name, session.user_id, session.id)
+        shard = self._shard(session.app_name, session.user_id)
+        state_delta = event.actions.state_delta if event.actions else {}
+        with shard.lock:
+            stored = shard.sessions.get(key)
+            if stored is None:
+                logger.warning(
+                    f'Sessão {session.id} não está mais em memória '
+                    '(descartada ou removida); evento não armazenado.'
+                )
+                return event
+
+            app_delta, user_delta, session_delta = self._split_state(
+                state_delta or {}
+            )
+            # Cópias: o chamador ainda tem os valores do delta
+            for state_key, value in session_delta.items():
+                stored.state[state_key] = _copy_value(value)
+            if stored.overlay is not None:
+                self._update_overlay(shard, stored, app_delta, user_delta)
+            else:
+                if user_delta:
+                    self._update_user_state(
+                        shard, (session.app_name, session.user_id), user_delta
+                    )
+                if app_delta:
+                    self._update_app_state(session.app_name, app_delta)
+
+            stored.events.append(event)
+            self._add_event(shard, event)
+            stored.last_update_time = event.timestamp
+            stored.last_access = time.time()
+            shard.sessions.move_to_end(key)
+            self._evict(shard, keep=key)
+        return event
@@ -0,0 +1,77 @@
+"""Acesso às tabelas do DatabaseSessionService usado pelos session services desta aula.
+
+O ADK não expõe as tabelas (`StorageSession`, `StorageEvent`...) nem a
+fábrica de sessões do SQLAlchemy como API pública, e elas mudam entre
+versões. Todo acesso a esses detalhes fica neste módulo, conferido nas
+versões da faixa `SUPPORTED_ADK_VERSIONS` (a mesma do pyproject.toml):
+
+- a partir da 1.19, `database_session_factory` passa a ser assíncrona
+- o `_extract_state_delta` privado sumiu na 1.17; aqui a separação do delta
+  usa só os prefixos públicos de `State`
+"""
+
+from datetime import datetime, timezone
+from typing import Any
+
+from google.adk import version
+from google.adk.events import Event
+from google.adk.sessions import Session
+from google.adk.sessions.database_session_service import (
+    StorageEvent,
+    StorageSession,
+)
+from google.adk.sessions.state import State
+
+SUPPORTED_ADK_VERSIONS = ((1, 3), (1, 19))
+
+
+def _check_adk_version():
+    installed = tuple(int(part) for part in version.__version__.split('.')[:2])
+    low, high = SUPPORTED_ADK_VERSIONS
+    if not low <= installed < high:
+        raise RuntimeError(
+            f'google-adk {version.__version__} não é suportado pelos session '
+            f'services desta aula (use >={low[0]}.{low[1]},<{high[0]}.{high[1]}).'
+        )
+
+
+_check_adk_version()
+
+
+def extract_state_delta(
+    state_delta: dict[str, Any],
+) -> tuple[dict[str, Any], dict[str, Any], dict[str, Any]]:
+    """Separa um delta em (app, usuário, sessão), sem os prefixos; descarta `temp:`."""
+    app_delta, user_delta, session_delta = {}, {}, {}
+    for key, value in (state_delta or {}).items():
+        if key.startswith(State.APP_PREFIX):
+            app_delta[key.removeprefix(State.APP_PREFIX)] = value
+        elif key.startswith(State.USER_PREFIX):
+            user_delta[key.removeprefix(State.USER_PREFIX)] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session_delta[key] = value
+    return app_delta, user_delta, session_delta
+
+
+def storage_event(
+    app_name: str, user_id: str, session_id: str, event: Event
+) -> StorageEvent:
+    """Linha da tabela `events`, montada pelo próprio ADK (`from_event`)."""
+    session = Session(app_name=app_name, user_id=user_id, id=session_id)
+    return StorageEvent.from_event(session, event)
+
+
+# A partir da 1.16, o ADK lê o `update_time` do SQLite (gravado sem fuso pelo
+# CURRENT_TIMESTAMP) como UTC; antes, como hora local
+_SQLITE_NAIVE_IS_UTC = hasattr(StorageSession, 'update_timestamp_tz')
+
+
+def update_timestamp(update_time: datetime, dialect_name: str) -> float:
+    """`update_time` do banco como timestamp, do mesmo jeito que o ADK converte."""
+    if (
+        _SQLITE_NAIVE_IS_UTC
+        and dialect_name == 'sqlite'
+        and update_time.tzinfo is None
+    ):
+        return update_time.replace(tzinfo=timezone.utc).timestamp()
+    return update_time.timestamp()
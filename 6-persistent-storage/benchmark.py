@@ -0,0 +1,293 @@
+"""Benchmark de carga do memory_agent com vários usuários simultâneos.
+
+Roda N usuários, cada um com sua própria sessão, enviando mensagens com roteiro
+fixo para um `Runner` com o memory_agent. O LLM é substituído por um modelo
+local e determinístico (FakeLlm) que chama as ferramentas do agente, então o
+benchmark mede apenas o custo do ADK, das ferramentas e do session service,
+sem acesso à rede.
+
+Exemplo:
+    python benchmark.py --users 20 --turns 30 --backend write-behind
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import psutil
+from google.adk.agents import Agent
+from google.adk.models import LlmRequest
+from google.adk.runners import Runner
+from google.adk.sessions import DatabaseSessionService
+from google.genai import types
+from sqlalchemy import event as sa_event
+
+# Torna o pacote `shared/` (na raiz do repositório) importável
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from cached_session_service import CachedSessionService  # noqa: E402
+from concurrent_session_service import ConcurrentSessionService  # noqa: E402
+from memory_agent.agent import memory_agent  # noqa: E402
+from shared.fake_llm import (  # noqa: E402
+    FakeLlm,
+    last_function_response,
+    last_user_text,
+    text_reply,
+    tool_call,
+)
+from write_behind_session_service import WriteBehindSessionService  # noqa: E402
+
+APP_NAME = 'Memory Agent Benchmark'
+
+TASKS = [
+    'comprar leite',
+    'reunião com o time',
+    'pagar a conta de luz',
+    'ligar para o dentista',
+    'terminar o relatório',
+    'levar o carro na revisão',
+    'estudar para a prova',
+    'regar as plantas',
+]
+
+# ===== Roteiro do modelo falso =====
+# Cada mensagem do usuário vira exatamente uma chamada de ferramenta, e a
+# resposta da ferramenta vira a resposta final em texto.
+_COMMANDS = [
+    (
+        re.compile(r'^adicione um lembrete: (.+)$'),
+        'add_reminder',
+        ('reminder',),
+    ),
+    (re.compile(r'^mostre meus lembretes$'), 'view_reminders', ()),
+    (re.compile(r'^encontre (.+)$'), 'find_reminder', ('query',)),
+    (
+        re.compile(r'^atualize o lembrete (\d+): (.+)$'),
+        'update_reminder',
+        ('index', 'updated_text'),
+    ),
+    (re.compile(r'^exclua o lembrete (\d+)$'), 'delete_reminder', ('index',)),
+    (re.compile(r'^meu nome é (.+)$'), 'update_user_name', ('name',)),
+]
+
+
+def memory_agent_script(llm_request: LlmRequest) -> types.Content:
+    """Responde como o memory_agent responderia, sem chamar um modelo real."""
+    function_response = last_function_response(llm_request)
+    if function_response is not None:
+        response = function_response.response or {}
+        return text_reply(response.get('message') or f'Pronto: {response}')
+
+    text = last_user_text(llm_request)
+    for pattern, tool_name, arg_names in _COMMANDS:
+        match = pattern.match(text)
+        if match:
+            args = {
+                name: int(value) if name == 'index' else value
+                for name, value in zip(arg_names, match.groups())
+            }
+            return tool_call(tool_name, **args)
+    return text_reply('Olá! Como posso ajudar com seus lembretes?')
+
+
+def user_messages(user_index: int, turns: int) -> list[str]:
+    """Sequência determinística de mensagens de um usuário simulado."""
+    rng = random.Random(user_index)
+    messages = [f'meu nome é Usuário {user_index}']
+    reminders = 0
+    while len(messages) < turns:
+        roll = rng.random()
+        if reminders == 0 or roll < 0.4:
+            messages.append(f'adicione um lembrete: {rng.choice(TASKS)}')
+            reminders += 1
+        elif roll < 0.6:
+            messages.append('mostre meus lembretes')
+        elif roll < 0.75:
+            messages.append(f'encontre {rng.choice(TASKS).split()[-1]}')
+        elif roll < 0.9:
+            index = rng.randint(1, reminders)
+            messages.append(
+                f'atualize o lembrete {index}: {rng.choice(TASKS)}'
+            )
+        else:
+            messages.append(f'exclua o lembrete {rng.randint(1, reminders)}')
+            reminders -= 1
+    return messages[:turns]
+
+
+# ===== Métricas =====
+
+
+class WriteCounter:
+    """Conta comandos de escrita e commits executados em um engine SQLAlchemy."""
+
+    def __init__(self, engine):
+        self.statements = 0
+        self.commits = 0
+        sa_event.listen(engine, 'before_cursor_execute', self._on_execute)
+        sa_event.listen(engine, 'commit', self._on_commit)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, many):
+        if statement.lstrip()[:6].upper() in ('INSERT', 'UPDATE', 'DELETE'):
+            self.statements += 1
+
+    def _on_commit(self, conn):
+        self.commits += 1
+
+
+def build_session_service(backend: str, db_url: str):
+    """Retorna (session_service, engine) para o backend escolhido."""
+    if backend == 'database':
+        service = DatabaseSessionService(db_url=db_url)
+        return service, service.db_engine
+    if backend == 'concurrent':
+        service = ConcurrentSessionService(db_url=db_url)
+        return service, service.db_engine
+
+    write_behind = WriteBehindSessionService(db_url=db_url)
+    if backend == 'write-behind':
+        return write_behind, write_behind.database.db_engine
+    return (
+        CachedSessionService(write_behind),
+        write_behind.database.db_engine,
+    )
+
+
+async def run_user(runner, user_index, turns, latencies):
+    user_id = f'user-{user_index}'
+    session = await runner.session_service.create_session(
+        app_name=APP_NAME, user_id=user_id
+    )
+    for text in user_messages(user_index, turns):
+        message = types.Content(role='user', parts=[types.Part(text=text)])
+        start = time.perf_counter()
+        async for _ in runner.run_async(
+            user_id=user_id, session_id=session.id, new_message=message
+        ):
+            pass
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_benchmark(args) -> dict:
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+    session_service, engine = build_session_service(
+        args.backend, f'sqlite:///{db_path}'
+    )
+    writes = WriteCounter(engine)
+
+    # Mesmo agente, mesmas ferramentas e instrução, mas com o modelo falso
+    agent = Agent(
+        name=memory_agent.name,
+        model=FakeLlm(
+            responder=memory_agent_script, latency=args.model_latency
+        ),
+        description=memory_agent.description,
+        instruction=memory_agent.instruction,
+        before_model_callback=memory_agent.before_model_callback,
+        after_model_callback=memory_agent.after_model_callback,
+        before_tool_callback=memory_agent.before_tool_callback,
+        after_tool_callback=memory_agent.after_tool_callback,
+        tools=memory_agent.tools,
+    )
+    runner = Runner(
+        agent=agent, app_name=APP_NAME, session_service=session_service
+    )
+
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+    latencies: list[float] = []
+
+    start = time.perf_counter()
+    # As ferramentas imprimem no terminal; o benchmark descarta essa saída
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.gather(
+            *(
+                run_user(runner, i, args.turns, latencies)
+                for i in range(args.users)
+            )
+        )
+        if hasattr(session_service, 'close'):
+            await session_service.close()
+    elapsed = time.perf_counter() - start
+
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {
+        'backend': args.backend,
+        'users': args.users,
+        'turns_per_user': args.turns,
+        'total_turns': len(latencies),
+        'elapsed_s': round(elapsed, 3),
+        'turns_per_s': round(len(latencies) / elapsed, 1),
+        'latency_ms': {
+            'p50': round(percentiles[49] * 1000, 2),
+            'p95': round(percentiles[94] * 1000, 2),
+            'p99': round(percentiles[98] * 1000, 2),
+        },
+        'db_write_statements': writes.statements,
+        'db_commits': writes.commits,
+        'rss_mb': round(process.memory_info().rss / 2**20, 1),
+        'rss_growth_mb': round(
+            (process.memory_info().rss - rss_before) / 2**20, 1
+        ),
+    }
+
+
+def print_report(result: dict):
+    latency = result['latency_ms']
+    print(f'\n===== Benchmark: {result["backend"]} =====')
+    print(
+        f'Usuários: {result["users"]} | Turnos por usuário: {result["turns_per_user"]} '
+        f'| Total: {result["total_turns"]} turnos em {result["elapsed_s"]}s'
+    )
+    print(f'Vazão: {result["turns_per_s"]} turnos/s')
+    print(
+        f'Latência por turno: p50={latency["p50"]}ms p95={latency["p95"]}ms p99={latency["p99"]}ms'
+    )
+    print(
+        f'Escritas no banco: {result["db_write_statements"]} comandos, {result["db_commits"]} commits'
+    )
+    print(f'RSS: {result["rss_mb"]} MB (+{result["rss_growth_mb"]} MB)')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--turns', type=int, default=20)
+    parser.add_argument(
+        '--backend',
+        choices=['database', 'concurrent', 'write-behind', 'cached'],
+        default='cached',
+        help='Session service usado no benchmark',
+    )
+    parser.add_argument(
+        '--model-latency',
+        type=float,
+        default=0.0,
+        help='Latência simulada de cada chamada ao modelo, em segundos',
+    )
+    parser.add_argument(
+        '--db', help='Arquivo SQLite (padrão: um arquivo temporário novo)'
+    )
+    parser.add_argument(
+        '--json', action='store_true', help='Imprime o resultado em JSON'
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    result = asyncio.run(run_benchmark(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
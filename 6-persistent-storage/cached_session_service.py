@@ -0,0 +1,160 @@
+from collections import OrderedDict
+from typing import Any, Optional
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import (
+    GetSessionConfig,
+    ListSessionsResponse,
+)
+
+SessionKey = tuple[str, str, str]
+
+
+class CachedSessionService(BaseSessionService):
+    """Cache de leitura (read-through) com limite LRU na frente de outro session service.
+
+    O `get_session` só vai ao banco na primeira leitura de uma sessão; as
+    seguintes recebem o mesmo objeto `Session` em memória. Como o Runner altera
+    esse objeto em `append_event`, a entrada do cache é substituída pela sessão
+    que acabou de receber o evento, e quem lê depois do turno enxerga o estado
+    atualizado sem uma nova consulta.
+
+    Com `max_events`, cada sessão é carregada apenas com os eventos mais
+    recentes e o cache guarda no máximo essa quantidade por sessão, então o
+    custo de carregar uma sessão não depende da idade dela. A sessão que o
+    Runner está usando não é cortada durante a invocação: o cache passa a
+    guardar uma cópia rasa dela com os eventos mais recentes.
+
+    IMPORTANTE: a sessão retornada é compartilhada. Altere-a apenas através
+    de `append_event`, como o Runner faz.
+    """
+
+    def __init__(
+        self,
+        inner: BaseSessionService,
+        *,
+        max_sessions: int = 256,
+        max_events: Optional[int] = None,
+    ):
+        self._inner = inner
+        self.max_sessions = max_sessions
+        self.max_events = max_events
+        self._cache: 'OrderedDict[SessionKey, Session]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, session: Session):
+        key = (session.app_name, session.user_id, session.id)
+        self._cache[key] = session
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.max_sessions:
+            self._cache.popitem(last=False)
+
+    def invalidate(self, app_name: str, user_id: str, session_id: str):
+        """Remove uma sessão do cache; a próxima leitura irá ao serviço interno."""
+        self._cache.pop((app_name, user_id, session_id), None)
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session = await self._inner.create_session(
+            app_name=app_name,
+            user_id=user_id,
+            state=state,
+            session_id=session_id,
+        )
+        self._remember(session)
+        return session
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        key = (app_name, user_id, session_id)
+        session = self._cache.get(key)
+        if session is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+        else:
+            self.misses += 1
+            session = await self._inner.get_session(
+                app_name=app_name,
+                user_id=user_id,
+                session_id=session_id,
+                config=GetSessionConfig(num_recent_events=self.max_events)
+                if self.max_events
+                else None,
+            )
+            if session is None:
+                return None
+            self._remember(session)
+
+        if config is None:
+            return session
+
+        # Filtros de eventos devolvem uma cópia rasa, sem tocar na sessão em cache
+        events = session.events
+        if config.after_timestamp:
+            events = [
+                e for e in events if e.timestamp >= config.after_timestamp
+            ]
+        if config.num_recent_events:
+            events = events[-config.num_recent_events :]
+        return session.model_copy(update={'events': events})
+
+    async def list_sessions(
+        self, *, app_name: str, user_id: str
+    ) -> ListSessionsResponse:
+        return await self._inner.list_sessions(
+            app_name=app_name, user_id=user_id
+        )
+
+    async def latest_session(
+        self, *, app_name: str, user_id: str
+    ) -> Optional[Session]:
+        """Cabeçalho da sessão mais recente, direto do serviço interno."""
+        return await self._inner.latest_session(
+            app_name=app_name, user_id=user_id
+        )
+
+    async def list_sessions_page(self, **kwargs):
+        """Listagem paginada e ordenada, direto do serviço interno."""
+        return await self._inner.list_sessions_page(**kwargs)
+
+    async def delete_session(
+        self, *, app_name: str, user_id: str, session_id: str
+    ) -> None:
+        self.invalidate(app_name, user_id, session_id)
+        await self._inner.delete_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        )
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        # A cópia antiga deixa de valer: o serviço interno persiste o evento e
+        # atualiza `session`, que passa a ser a versão em cache.
+        self.invalidate(session.app_name, session.user_id, session.id)
+        event = await self._inner.append_event(session=session, event=event)
+        # Mantém a janela de eventos do cache limitada sem cortar a lista da
+        # sessão viva, que o Runner ainda usa no resto da invocação
+        if self.max_events and len(session.events) > self.max_events:
+            session = session.model_copy(
+                update={'events': session.events[-self.max_events :]}
+            )
+        self._remember(session)
+        return event
+
+    async def close(self):
+        """Encerra o serviço interno, se ele tiver algo a gravar."""
+        self._cache.clear()
+        if hasattr(self._inner, 'close'):
+            await self._inner.close()
@@ -0,0 +1,377 @@
+import asyncio
+import copy
+import logging
+import random
+import weakref
+from typing import Any, Optional
+
+from adk_storage import extract_state_delta, storage_event, update_timestamp
+from google.adk.events import Event
+from google.adk.sessions import (
+    BaseSessionService,
+    DatabaseSessionService,
+    Session,
+)
+from google.adk.sessions.database_session_service import (
+    StorageAppState,
+    StorageSession,
+    StorageUserState,
+)
+from google.adk.sessions.base_session_service import GetSessionConfig
+from google.adk.sessions.state import State
+from sqlalchemy import Integer, String, delete, func, update
+from sqlalchemy import event as sa_event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+from session_index import (
+    SessionPage,
+    ensure_session_index,
+    latest_session,
+    list_sessions_page,
+)
+from state_serialization import check_state_format
+
+logger = logging.getLogger(__name__)
+
+
+class _VersionBase(DeclarativeBase):
+    pass
+
+
+class SessionVersion(_VersionBase):
+    """Versão do estado de cada sessão, usada no controle de concorrência otimista.
+
+    Fica em uma tabela própria para não alterar o esquema criado pelo ADK.
+    """
+
+    __tablename__ = 'session_versions'
+
+    app_name: Mapped[str] = mapped_column(String(128), primary_key=True)
+    user_id: Mapped[str] = mapped_column(String(128), primary_key=True)
+    session_id: Mapped[str] = mapped_column(String(128), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class _VersionConflict(Exception):
+    """Outro processo gravou a sessão entre a leitura e a escrita."""
+
+
+class ConcurrentSessionService(DatabaseSessionService):
+    """DatabaseSessionService seguro para vários processos na mesma sessão.
+
+    - Pool de conexões configurável e `busy_timeout` no SQLite (modo WAL), ou
+      `pool_pre_ping`/`pool_recycle` em bancos como o PostgreSQL
+    - Um lock por sessão dentro do processo, para que turnos simultâneos não
+      disputem a mesma linha à toa
+    - Controle de concorrência otimista entre processos: cada gravação confere
+      e incrementa a versão da sessão; se outro processo gravou antes, a
+      tentativa é refeita sobre o estado mais novo
+
+    Em vez de sobrescrever o estado inteiro com a cópia em memória (o que
+    perdia lembretes adicionados por outro turno), apenas as chaves do delta
+    do evento são aplicadas sobre o estado atual do banco. Se outro turno
+    alterou a MESMA chave com outro valor, vale a última gravação e o conflito
+    é registrado em `conflicts`.
+    """
+
+    def __init__(
+        self,
+        db_url: str,
+        *,
+        pool_size: int = 10,
+        max_overflow: int = 20,
+        busy_timeout: float = 30.0,
+        max_retries: int = 8,
+        retry_backoff: float = 0.01,
+        **kwargs: Any,
+    ):
+        is_sqlite = make_url(db_url).get_backend_name() == 'sqlite'
+        kwargs.setdefault('pool_size', pool_size)
+        kwargs.setdefault('max_overflow', max_overflow)
+        if is_sqlite:
+            # Tempo que o driver espera um lock antes de falhar com "database is locked"
+            kwargs.setdefault('connect_args', {}).setdefault(
+                'timeout', busy_timeout
+            )
+        else:
+            # Descarta conexões mortas e recicla as antigas antes que o servidor as feche
+            kwargs.setdefault('pool_pre_ping', True)
+            kwargs.setdefault('pool_recycle', 1800)
+
+        super().__init__(db_url=db_url, **kwargs)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.busy_timeout = busy_timeout
+
+        if is_sqlite:
+            self._configure_sqlite()
+        # Não lê bancos com estado binário gravado pelo WriteBehindSessionService
+        check_state_format(self.db_engine)
+        _VersionBase.metadata.create_all(self.db_engine)
+        ensure_session_index(self.db_engine)
+
+        # Locks por sessão; somem sozinhos quando nenhum turno os usa mais
+        self._locks: 'weakref.WeakValueDictionary[tuple, asyncio.Lock]' = (
+            weakref.WeakValueDictionary()
+        )
+        # Estado da sessão como foi lido do banco (a base do merge de três
+        # vias), por objeto `Session`; a entrada some junto com a sessão
+        self._bases: dict[int, dict[str, Any]] = {}
+        self.retries = 0
+        self.conflicts = 0
+
+    def _configure_sqlite(self):
+        busy_timeout_ms = int(self.busy_timeout * 1000)
+
+        @sa_event.listens_for(self.db_engine, 'connect')
+        def _set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+            cursor.execute(f'PRAGMA busy_timeout={busy_timeout_ms}')
+            cursor.close()
+
+        self.db_engine.dispose()
+
+    def _lock_for(self, key: tuple) -> asyncio.Lock:
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[key] = lock
+        return lock
+
+    def _remember_base(self, session: Session, state: dict[str, Any]):
+        key = id(session)
+        if key not in self._bases:
+            weakref.finalize(session, self._bases.pop, key, None)
+        # Só as chaves da sessão entram no merge (app: e user: não)
+        self._bases[key] = copy.deepcopy(
+            {
+                k: v
+                for k, v in state.items()
+                if not k.startswith((State.APP_PREFIX, State.USER_PREFIX))
+            }
+        )
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session = await super().create_session(
+            app_name=app_name,
+            user_id=user_id,
+            state=state,
+            session_id=session_id,
+        )
+        self._remember_base(session, session.state)
+        return session
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        session = await super().get_session(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            config=config,
+        )
+        if session is not None:
+            self._remember_base(session, session.state)
+        return session
+
+    async def latest_session(
+        self, *, app_name: str, user_id: str
+    ) -> Optional[Session]:
+        """Cabeçalho (sem estado e eventos) da sessão atualizada por último."""
+        return await latest_session(self, app_name=app_name, user_id=user_id)
+
+    async def list_sessions_page(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        page_size: int = 20,
+        page_token: Optional[str] = None,
+    ) -> SessionPage:
+        """Cabeçalhos das sessões, da mais recente para a mais antiga, em páginas."""
+        return await list_sessions_page(
+            self,
+            app_name=app_name,
+            user_id=user_id,
+            page_size=page_size,
+            page_token=page_token,
+        )
+
+    async def delete_session(
+        self, *, app_name: str, user_id: str, session_id: str
+    ) -> None:
+        await super().delete_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        )
+        with self.database_session_factory() as db:
+            db.execute(
+                delete(SessionVersion)
+                .where(SessionVersion.app_name == app_name)
+                .where(SessionVersion.user_id == user_id)
+                .where(SessionVersion.session_id == session_id)
+            )
+            db.commit()
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+
+        key = (session.app_name, session.user_id, session.id)
+        async with self._lock_for(key):
+            for attempt in range(self.max_retries + 1):
+                try:
+                    # Com o banco disputado, o commit pode esperar até o
+                    # `busy_timeout`: roda fora do event loop
+                    merged_state, update_time = await asyncio.to_thread(
+                        self._commit_event, session, event
+                    )
+                    break
+                except (_VersionConflict, IntegrityError):
+                    pass
+                except OperationalError as e:
+                    if 'locked' not in str(e).lower():
+                        raise
+                if attempt == self.max_retries:
+                    raise RuntimeError(
+                        f'Não foi possível gravar o evento na sessão {session.id} '
+                        f'após {self.max_retries} tentativas.'
+                    )
+                # Espera exponencial com jitter antes de tentar de novo
+                self.retries += 1
+                await asyncio.sleep(
+                    self.retry_backoff * 2**attempt * random.uniform(0.5, 1.5)
+                )
+
+        # Atualiza a sessão em memória: histórico, delta deste evento e as
+        # mudanças que outros turnos gravaram nesse meio-tempo
+        await BaseSessionService.append_event(
+            self, session=session, event=event
+        )
+        session.state.update(merged_state)
+        session.last_update_time = update_time
+        # O próximo evento desta sessão parte do que acabou de ser gravado
+        self._remember_base(session, merged_state)
+        return event
+
+    def _commit_event(
+        self, session: Session, event: Event
+    ) -> tuple[dict[str, Any], float]:
+        """Uma tentativa de gravar o evento; levanta _VersionConflict se perder a corrida."""
+        key = (session.app_name, session.user_id, session.id)
+        state_delta = (event.actions and event.actions.state_delta) or {}
+        app_delta, user_delta, session_delta = extract_state_delta(state_delta)
+
+        with self.database_session_factory() as db:
+            # A versão é lida ANTES do estado. Sem transação aberta, cada
+            # SELECT vê o banco do seu momento: se outro processo gravar entre
+            # as duas leituras, o estado lido já é o novo e a versão esperada
+            # é a antiga, então o compare-and-swap falha e a tentativa é
+            # refeita. Na ordem inversa, um estado antigo passaria pela
+            # versão nova e apagaria a gravação do outro processo.
+            version_row = db.get(SessionVersion, key)
+            expected = version_row.version if version_row else 0
+            storage_session = db.get(StorageSession, key)
+            if storage_session is None:
+                raise ValueError(f'Sessão {session.id} não encontrada.')
+
+            # Merge de três vias por chave: base (o que este turno leu do
+            # banco), nosso valor (delta) e o valor atual no banco (de outros
+            # turnos). O `session.state` não serve de base: o ADK já gravou
+            # nele o nosso valor antes de chamar `append_event`.
+            current = dict(storage_session.state)
+            bases = self._bases.get(id(session))
+            for state_key, ours in session_delta.items():
+                theirs = current.get(state_key)
+                # Sessão que não foi lida por este serviço: sem base conhecida
+                base = bases.get(state_key) if bases is not None else theirs
+                if theirs != base and theirs != ours:
+                    self.conflicts += 1
+                    logger.warning(
+                        f"Conflito na chave '{state_key}' da sessão {session.id}: "
+                        'mantendo o valor deste turno.'
+                    )
+                current[state_key] = ours
+            if session_delta:
+                storage_session.state = current
+            # Todo evento conta como atualização da sessão, mesmo sem
+            # mudança no estado (usado para achar a sessão mais recente)
+            storage_session.update_time = func.now()
+
+            storage_app_state = db.get(StorageAppState, (session.app_name))
+            storage_user_state = db.get(
+                StorageUserState, (session.app_name, session.user_id)
+            )
+            if app_delta:
+                storage_app_state.state = {
+                    **storage_app_state.state,
+                    **app_delta,
+                }
+            if user_delta:
+                storage_user_state.state = {
+                    **storage_user_state.state,
+                    **user_delta,
+                }
+
+            db.add(
+                storage_event(
+                    session.app_name, session.user_id, session.id, event
+                )
+            )
+
+            # Compare-and-swap da versão: falha se outro processo gravou antes
+            if version_row is None:
+                db.add(
+                    SessionVersion(
+                        app_name=session.app_name,
+                        user_id=session.user_id,
+                        session_id=session.id,
+                        version=1,
+                    )
+                )
+            else:
+                result = db.execute(
+                    update(SessionVersion)
+                    .where(SessionVersion.app_name == key[0])
+                    .where(SessionVersion.user_id == key[1])
+                    .where(SessionVersion.session_id == key[2])
+                    .where(SessionVersion.version == expected)
+                    .values(version=expected + 1)
+                )
+                if result.rowcount != 1:
+                    db.rollback()
+                    raise _VersionConflict()
+
+            db.commit()
+            db.refresh(storage_session)
+
+            merged = dict(storage_session.state)
+            merged.update(
+                {
+                    State.APP_PREFIX + k: v
+                    for k, v in storage_app_state.state.items()
+                }
+            )
+            merged.update(
+                {
+                    State.USER_PREFIX + k: v
+                    for k, v in storage_user_state.state.items()
+                }
+            )
+            return merged, update_timestamp(
+                storage_session.update_time, self.db_engine.dialect.name
+            )
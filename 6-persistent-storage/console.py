@@ -0,0 +1,71 @@
+import asyncio
+import sys
+import threading
+from typing import Optional, TextIO
+
+
+class AsyncConsole:
+    """Terminal assíncrono: leitura sem bloquear o event loop e escrita em buffer.
+
+    Uma thread lê o stdin continuamente e entrega cada linha para uma fila do
+    asyncio. Assim, enquanto o programa espera o usuário digitar, o event loop
+    continua livre (para gravações em segundo plano, por exemplo), e o que for
+    digitado durante um turno fica na fila para o próximo (type-ahead).
+
+    A saída é acumulada com `print()` e escrita de uma vez só em `flush()`, em
+    vez de uma chamada de sistema para cada linha.
+    """
+
+    def __init__(self, stdin: TextIO = sys.stdin, stdout: TextIO = sys.stdout):
+        self._stdin = stdin
+        self._stdout = stdout
+        self._buffer: list[str] = []
+        self._lines: Optional[asyncio.Queue] = None
+
+    def print(self, *values, sep: str = ' ', end: str = '\n'):
+        """Mesmo uso do `print()` nativo, mas apenas acumula no buffer."""
+        self._buffer.append(sep.join(str(value) for value in values) + end)
+
+    def flush(self):
+        """Escreve tudo o que está no buffer com uma única chamada."""
+        if not self._buffer:
+            return
+        self._stdout.write(''.join(self._buffer))
+        self._stdout.flush()
+        self._buffer.clear()
+
+    def _start_reader(self):
+        loop = asyncio.get_running_loop()
+        self._lines = asyncio.Queue()
+
+        def read_forever():
+            while True:
+                line = self._stdin.readline()
+                if not line:
+                    # EOF (ex: Ctrl+D): None sinaliza o fim da entrada
+                    loop.call_soon_threadsafe(self._lines.put_nowait, None)
+                    return
+                loop.call_soon_threadsafe(
+                    self._lines.put_nowait, line.rstrip('\r\n')
+                )
+
+        # Thread daemon: não impede o programa de terminar
+        threading.Thread(
+            target=read_forever, name='console-stdin', daemon=True
+        ).start()
+
+    async def readline(self, prompt: str = '') -> Optional[str]:
+        """Mostra o prompt e aguarda a próxima linha sem bloquear o event loop.
+
+        Returns:
+            A linha digitada (sem a quebra de linha) ou None no fim da entrada
+        """
+        if self._lines is None:
+            self._start_reader()
+        self.print(prompt, end='')
+        self.flush()
+        return await self._lines.get()
+
+
+# Instância compartilhada pelo main.py e pelas funções de utils.py
+console = AsyncConsole()
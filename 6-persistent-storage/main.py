@@ -1,45 +1,111 @@
+import argparse
 import asyncio
 
+from cached_session_service import CachedSessionService
+from console import console
 from dotenv import load_dotenv
 from google.adk.runners import Runner
-from google.adk.sessions import DatabaseSessionService
-from memory_agent.agent import memory_agent
+from memory_agent.agent import instruction_template, memory_agent
+from memory_agent.output import set_output
+from memory_agent.reminder_store import compact_state
+from session_compaction import compact_session
+from tracing import OtlpExporter, TracedRunner, TracedSessionService, Tracer
 from utils import call_agent_async
+from write_behind_session_service import WriteBehindSessionService
 
 load_dotenv()
 
+# As mensagens das ferramentas e callbacks do agente entram no mesmo buffer do
+# console, para sair na ordem certa junto com as respostas
+set_output(console.print)
+
 # ===== PARTE 1: Inicializar Serviço de Sessão Persistente =====
 # Usando banco de dados SQLite para armazenamento persistente.
 # O arquivo será criado automaticamente se não existir.
 db_url = 'sqlite:///./my_agent_data.db'
-session_service = DatabaseSessionService(db_url=db_url)
+# O `WriteBehindSessionService` envolve o `DatabaseSessionService` e agrupa os
+# eventos de cada sessão em uma única transação (por tamanho ou por tempo),
+# em vez de fazer um commit para cada chamada de ferramenta.
+database_service = WriteBehindSessionService(
+    db_url=db_url,
+    max_pending_events=32,
+    flush_interval=1.0,
+    durability='normal',
+)
+
+# Quando o histórico ativo de uma sessão passa de COMPACT_THRESHOLD eventos,
+# os mais antigos são arquivados e trocados por um evento de resumo, mantendo
+# apenas os KEEP_LAST_EVENTS mais recentes.
+COMPACT_THRESHOLD = 200
+KEEP_LAST_EVENTS = 100
+
+# Na frente dele, o `CachedSessionService` mantém as sessões recentes em memória
+# (LRU), evitando recarregar todo o histórico do banco a cada leitura. A janela
+# de eventos cobre todo o histórico ativo, incluindo o evento de resumo.
+session_service = CachedSessionService(
+    database_service,
+    max_sessions=256,
+    max_events=COMPACT_THRESHOLD + 1,
+)
 
 # ===== PARTE 2: Definir Estado Inicial =====
 # Será usado apenas ao criar uma nova sessão.
 # Se uma sessão já existir, este estado será ignorado.
+# Os lembretes não entram aqui: cada um é gravado em sua própria chave
+# ('reminder:<id>') pelas ferramentas do agente.
 initial_state = {
     'user_name': 'Alexandre Cavalcanti',
-    'reminders': [],
 }
 
 
-async def main_async():
+async def compact_if_needed(app_name, user_id, session_id):
+    """Compacta o histórico da sessão se ele passou do limite."""
+    session = await session_service.get_session(
+        app_name=app_name, user_id=user_id, session_id=session_id
+    )
+    if session is None or len(session.events) <= COMPACT_THRESHOLD:
+        return
+
+    # Grava o que está no buffer antes de mexer nos eventos do banco
+    await database_service.flush()
+    archived = await compact_session(
+        database_service.database,
+        app_name=app_name,
+        user_id=user_id,
+        session_id=session_id,
+        keep_last=KEEP_LAST_EVENTS,
+        # Descarta os marcadores dos lembretes excluídos
+        compact_state=compact_state,
+    )
+    if archived:
+        # A próxima leitura carrega o histórico compactado
+        session_service.invalidate(app_name, user_id, session_id)
+        console.print(
+            f'Histórico compactado: {archived} eventos antigos arquivados.'
+        )
+        console.flush()
+
+
+async def main_async(streaming=True, trace_path=None, otlp_endpoint=None):
     # Configurar constantes
     APP_NAME = 'Memory Agent'
     USER_ID = 'alexandrecavalcanti'
 
     # ===== PARTE 3: Gerenciamento de Sessão - Encontrar ou Criar =====
-    # Verifica se existem sessões para este usuário
-    existing_sessions = await session_service.list_sessions(
+    # Busca apenas o cabeçalho da sessão atualizada mais recentemente (uma
+    # leitura no índice por usuário e data), sem listar todas as sessões
+    latest = await session_service.latest_session(
         app_name=APP_NAME,
         user_id=USER_ID,
     )
 
     # Se houver uma sessão existente, usa ela, senão cria uma nova
-    if existing_sessions and len(existing_sessions.sessions) > 0:
+    if latest is not None:
         # Usa a sessão mais recente
-        SESSION_ID = existing_sessions.sessions[0].id
-        print(f'Continuando sessão existente: {SESSION_ID}')
+        SESSION_ID = latest.id
+        console.print(f'Continuando sessão existente: {SESSION_ID}')
+        # Sessões antigas podem ter acumulado muitos eventos
+        await compact_if_needed(APP_NAME, USER_ID, SESSION_ID)
     else:
         # Cria uma nova sessão com estado inicial
         new_session = await session_service.create_session(
@@ -48,36 +114,109 @@ async def main_async():
             state=initial_state,
         )
         SESSION_ID = new_session.id
-        print(f'Nova sessão criada: {SESSION_ID}')
+        console.print(f'Nova sessão criada: {SESSION_ID}')
 
     # ===== PARTE 4: Configuração do Runner do Agente =====
     # Cria um runner com o agente de memória.
     # O DatabaseSessionService garante que todas as mudanças sejam persistidas.
+    # Onde o ADK instalado oferece cache explícito de contexto, o agente roda
+    # dentro de um App com `context_cache_config` (veja `runner_args`).
     runner = Runner(
-        agent=memory_agent,
-        app_name=APP_NAME,
+        **instruction_template.runner_args(APP_NAME, memory_agent),
         session_service=session_service,
     )
 
+    # Com --trace, cada turno é medido em spans (carregar a sessão, modelo,
+    # ferramentas, gravar a sessão) exportados em OTLP/JSON, e um resumo é
+    # exibido ao final de cada turno.
+    tracer = None
+    if trace_path or otlp_endpoint:
+        tracer = Tracer(OtlpExporter(path=trace_path, endpoint=otlp_endpoint))
+        tracer.instrument_agent(memory_agent)
+        runner = TracedRunner(
+            tracer=tracer,
+            **instruction_template.runner_args(APP_NAME, memory_agent),
+            session_service=TracedSessionService(
+                session_service,
+                tracer,
+                engine=database_service.database.db_engine,
+            ),
+        )
+
     # ===== PARTE 5: Loop de Conversa Interativo =====
-    print('\nBem-vindo ao Memory Agent Chat!')
-    print('Seus lembretes serão lembrados entre conversas.')
-    print("Digite 'exit' ou 'quit' para encerrar a conversa.\n")
+    console.print('\nBem-vindo ao Memory Agent Chat!')
+    console.print('Seus lembretes serão lembrados entre conversas.')
+    console.print("Digite 'exit' ou 'quit' para encerrar a conversa.\n")
+    console.flush()
 
-    while True:
-        # Captura entrada do usuário
-        user_input = input('Você: ')
+    try:
+        while True:
+            # Captura entrada do usuário sem bloquear o event loop. O que for
+            # digitado enquanto o agente responde fica na fila para depois.
+            user_input = await console.readline('Você: ')
 
-        # Verifica se o usuário quer sair
-        if user_input.lower() in ['exit', 'quit']:
-            print(
-                'Encerrando conversa. Seus dados foram salvos no banco de dados.'
-            )
-            break
+            # Verifica se o usuário quer sair (None = fim da entrada, ex: Ctrl+D)
+            if user_input is None or user_input.lower() in ['exit', 'quit']:
+                console.print(
+                    'Encerrando conversa. Seus dados foram salvos no banco de dados.'
+                )
+                console.flush()
+                break
 
-        # Processa a consulta do usuário através do agente
-        await call_agent_async(runner, USER_ID, SESSION_ID, user_input)
+            # Processa a consulta do usuário através do agente
+            if tracer is None:
+                await call_agent_async(
+                    runner,
+                    USER_ID,
+                    SESSION_ID,
+                    user_input,
+                    streaming=streaming,
+                )
+            else:
+                with tracer.span('turn', **{'session.id': SESSION_ID}):
+                    await call_agent_async(
+                        runner,
+                        USER_ID,
+                        SESSION_ID,
+                        user_input,
+                        streaming=streaming,
+                    )
+                console.print(Tracer.format_turn(tracer.turns[-1]))
+                console.flush()
+            await compact_if_needed(APP_NAME, USER_ID, SESSION_ID)
+    finally:
+        # Grava no banco os eventos que ainda estão no buffer
+        await session_service.close()
+        if tracer is not None:
+            console.print(tracer.format_agents())
+            console.flush()
 
 
 if __name__ == '__main__':
-    asyncio.run(main_async())
+    parser = argparse.ArgumentParser(description='Memory Agent Chat')
+    parser.add_argument(
+        '--stream',
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help='Exibe a resposta token a token (use --no-stream para desativar)',
+    )
+    parser.add_argument(
+        '--trace',
+        nargs='?',
+        const='traces.jsonl',
+        help='Mede cada turno e grava os spans em OTLP/JSON neste arquivo '
+        '(padrão: traces.jsonl)',
+    )
+    parser.add_argument(
+        '--otlp-endpoint',
+        help='Também envia os spans a um collector OTLP/HTTP '
+        '(ex: http://localhost:4318/v1/traces)',
+    )
+    args = parser.parse_args()
+    asyncio.run(
+        main_async(
+            streaming=args.stream,
+            trace_path=args.trace,
+            otlp_endpoint=args.otlp_endpoint,
+        )
+    )
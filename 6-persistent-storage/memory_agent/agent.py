@@ -1,6 +1,26 @@
+import sys
+from pathlib import Path
+from typing import Optional
+
 from google.adk.agents import Agent
 from google.adk.tools.tool_context import ToolContext
 
+from .context_budget import REMINDER_WINDOW, log_prompt_size, render_reminders
+from .output import log
+from .reminder_index import get_index, invalidate_index, peek_index
+from .reminder_store import LEGACY_KEY, REMINDER_PREFIX, ReminderStore
+
+# Torna o pacote `shared/` (na raiz do repositório) importável
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from shared.prompt_template import PromptTemplate  # noqa: E402
+from shared.tool_cache import ToolCache, read_only  # noqa: E402
+
+# Reaproveita, no mesmo turno, o resultado de ferramentas somente leitura
+# chamadas de novo com os mesmos argumentos. Ferramentas que alteram os
+# lembretes descartam automaticamente esses resultados.
+tool_cache = ToolCache()
+
 
 def add_reminder(reminder: str, tool_context: ToolContext) -> dict:
     """Adiciona um novo lembrete à lista do usuário.
@@ -12,44 +32,108 @@ def add_reminder(reminder: str, tool_context: ToolContext) -> dict:
     Returns:
         Dicionário com confirmação da ação realizada
     """
-    print(f"--- Ferramenta: add_reminder chamada para '{reminder}' ---")
+    log(f"--- Ferramenta: add_reminder chamada para '{reminder}' ---")
 
-    # Obtém lembretes atuais do estado da sessão
-    reminders = tool_context.state.get('reminders', [])
+    store = ReminderStore(tool_context.state)
+    if store.migrate_legacy():
+        invalidate_index(tool_context)
 
-    # Adiciona o novo lembrete
-    reminders.append(reminder)
+    # Índice de busca (find_reminder) da sessão, se existir e estiver em dia
+    search_index = peek_index(tool_context)
 
-    # Atualiza o estado com a nova lista de lembretes.
+    # Grava apenas a chave do novo lembrete no estado.
     # Esta mudança será persistida automaticamente pelo Runner.
-    tool_context.state['reminders'] = reminders
+    reminder_id = store.add(reminder)
+
+    # Mantém o índice atualizado incrementalmente
+    if search_index is not None:
+        search_index.add(reminder_id, reminder)
 
     # É importante retornar um dicionário para melhor funcionamento do ADK.
     return {
         'action': 'add_reminder',
+        'id': reminder_id,
         'reminder': reminder,
         'message': f'Lembrete adicionado: {reminder}',
     }
 
 
-def view_reminders(tool_context: ToolContext) -> dict:
-    """Visualiza todos os lembretes atuais.
+@read_only(reads=(REMINDER_PREFIX, LEGACY_KEY))
+def view_reminders(
+    tool_context: ToolContext,
+    offset: Optional[int] = None,
+    limit: Optional[int] = None,
+) -> dict:
+    """Visualiza os lembretes atuais, uma página por vez.
 
     Args:
         tool_context: Contexto para acessar o estado da sessão
+        offset: Quantos lembretes pular a partir do primeiro (padrão 0)
+        limit: Quantidade máxima de lembretes retornados (padrão 20)
 
     Returns:
-        Dicionário com a lista de lembretes e contador
+        Dicionário com a página de lembretes (com seus índices), o total e
+        se ainda existem mais lembretes
     """
-    print('--- Ferramenta: view_reminders chamada ---')
+    # Os padrões ficam aqui, e não na assinatura: a API do Gemini não aceita
+    # valores padrão na declaração da ferramenta
+    offset = 0 if offset is None else offset
+    limit = REMINDER_WINDOW if limit is None else limit
+    log(
+        f'--- Ferramenta: view_reminders chamada (offset={offset}, limit={limit}) ---'
+    )
+
+    store = ReminderStore(tool_context.state)
+    if store.migrate_legacy():
+        invalidate_index(tool_context)
 
-    # Obtém lembretes do estado
-    reminders = tool_context.state.get('reminders', [])
+    # A lista só é montada aqui, quando alguém realmente precisa dela
+    reminders = store.texts()
+    offset = max(offset, 0)
+    limit = max(limit, 1)
+    page = reminders[offset : offset + limit]
 
     return {
         'action': 'view_reminders',
-        'reminders': reminders,
+        'reminders': [
+            {'index': index, 'text': text}
+            for index, text in enumerate(page, offset + 1)
+        ],
         'count': len(reminders),
+        'offset': offset,
+        'has_more': offset + len(page) < len(reminders),
+    }
+
+
+@read_only(reads=(REMINDER_PREFIX, LEGACY_KEY))
+def find_reminder(query: str, tool_context: ToolContext) -> dict:
+    """Procura lembretes pelo conteúdo e retorna os índices mais prováveis.
+
+    Args:
+        query: Trecho ou descrição do lembrete (ex: "reunião")
+        tool_context: Contexto para acessar o estado da sessão
+
+    Returns:
+        Dicionário com as correspondências ordenadas da mais para a menos provável
+    """
+    log(f"--- Ferramenta: find_reminder chamada para '{query}' ---")
+
+    # Busca no índice de trigramas da sessão em vez de percorrer a lista
+    matches = get_index(tool_context).search(query)
+
+    if not matches:
+        return {
+            'action': 'find_reminder',
+            'status': 'not_found',
+            'query': query,
+            'message': f"Nenhum lembrete parecido com '{query}' foi encontrado.",
+        }
+
+    return {
+        'action': 'find_reminder',
+        'query': query,
+        'matches': matches,
+        'best_index': matches[0]['index'],
     }
 
 
@@ -66,31 +150,35 @@ def update_reminder(
     Returns:
         Dicionário com resultado da operação (sucesso ou erro)
     """
-    print(
+    log(
         f"--- Ferramenta: update_reminder chamada para índice {index} com '{updated_text}' ---"
     )
 
-    # Obtém lembretes atuais do estado
-    reminders = tool_context.state.get('reminders', [])
+    store = ReminderStore(tool_context.state)
+    if store.migrate_legacy():
+        invalidate_index(tool_context)
 
-    # Verifica se o índice é válido
-    if not reminders or index < 1 or index > len(reminders):
+    # Converte a posição vista pelo usuário no ID estável do lembrete
+    reminder_id = store.id_at(index)
+    if reminder_id is None:
         return {
             'action': 'update_reminder',
             'status': 'error',
-            'message': f'Não foi possível encontrar lembrete na posição {index}. Atualmente existem {len(reminders)} lembretes.',
+            'message': f'Não foi possível encontrar lembrete na posição {index}. Atualmente existem {len(store)} lembretes.',
         }
 
-    # Atualiza o lembrete (ajustando para índices baseados em 0)
-    old_reminder = reminders[index - 1]
-    reminders[index - 1] = updated_text
+    # Atualiza somente a chave deste lembrete
+    search_index = peek_index(tool_context)
+    old_reminder = store.get(reminder_id)
+    store.update(reminder_id, updated_text)
 
-    # Atualiza o estado com a lista modificada
-    tool_context.state['reminders'] = reminders
+    if search_index is not None:
+        search_index.update(reminder_id, updated_text)
 
     return {
         'action': 'update_reminder',
         'index': index,
+        'id': reminder_id,
         'old_text': old_reminder,
         'updated_text': updated_text,
         'message': f"Lembrete {index} atualizado de '{old_reminder}' para '{updated_text}'",
@@ -107,28 +195,33 @@ def delete_reminder(index: int, tool_context: ToolContext) -> dict:
     Returns:
         Dicionário com resultado da operação
     """
-    print(f'--- Ferramenta: delete_reminder chamada para índice {index} ---')
+    log(f'--- Ferramenta: delete_reminder chamada para índice {index} ---')
 
-    # Obtém lembretes atuais
-    reminders = tool_context.state.get('reminders', [])
+    store = ReminderStore(tool_context.state)
+    if store.migrate_legacy():
+        invalidate_index(tool_context)
 
-    # Verifica se o índice é válido
-    if not reminders or index < 1 or index > len(reminders):
+    # Converte a posição vista pelo usuário no ID estável do lembrete
+    reminder_id = store.id_at(index)
+    if reminder_id is None:
         return {
             'action': 'delete_reminder',
             'status': 'error',
-            'message': f'Não foi possível encontrar lembrete na posição {index}. Atualmente existem {len(reminders)} lembretes.',
+            'message': f'Não foi possível encontrar lembrete na posição {index}. Atualmente existem {len(store)} lembretes.',
         }
 
-    # Remove o lembrete (ajustando para índices baseados em 0)
-    deleted_reminder = reminders.pop(index - 1)
+    # Remove somente a chave deste lembrete
+    search_index = peek_index(tool_context)
+    deleted_reminder = store.get(reminder_id)
+    store.delete(reminder_id)
 
-    # Atualiza o estado com a lista modificada
-    tool_context.state['reminders'] = reminders
+    if search_index is not None:
+        search_index.remove(reminder_id)
 
     return {
         'action': 'delete_reminder',
         'index': index,
+        'id': reminder_id,
         'deleted_reminder': deleted_reminder,
         'message': f"Lembrete {index} removido: '{deleted_reminder}'",
     }
@@ -144,7 +237,7 @@ def update_user_name(name: str, tool_context: ToolContext) -> dict:
     Returns:
         Dicionário com confirmação da mudança
     """
-    print(f"--- Ferramenta: update_user_name chamada com '{name}' ---")
+    log(f"--- Ferramenta: update_user_name chamada com '{name}' ---")
 
     # Obtém nome atual do estado
     old_name = tool_context.state.get('user_name', '')
@@ -160,20 +253,12 @@ def update_user_name(name: str, tool_context: ToolContext) -> dict:
     }
 
 
-# Cria um agente persistente simples
-memory_agent = Agent(
-    name='memory_agent',
-    model='gemini-2.5-flash',
-    description='Um agente inteligente de lembretes com memória persistente',
-    # A instrução usa placeholders de estado ({user_name}, {reminders})
-    # que são preenchidos automaticamente pelo Runner com dados da sessão.
-    instruction="""
+# A instrução usa placeholders ({user_name}, {reminders}) preenchidos com os
+# dados da sessão. Eles ficam no fim do texto: todo o restante é um prefixo
+# estático, idêntico a cada turno, que o provedor pode manter em cache.
+INSTRUCTION = """
     Você é um assistente amigável de lembretes que lembra dos usuários entre conversas.
     
-    As informações do usuário estão armazenadas no estado:
-    - Nome do usuário: {user_name}
-    - Lembretes: {reminders}
-    
     Você pode ajudar os usuários a gerenciar seus lembretes com as seguintes capacidades:
     1. Adicionar novos lembretes
     2. Visualizar lembretes existentes
@@ -190,8 +275,8 @@ memory_agent = Agent(
     
     1. Quando o usuário pedir para atualizar ou excluir um lembrete sem fornecer um índice:
        - Se eles mencionarem o conteúdo do lembrete (ex: "exclua meu lembrete de reunião"), 
-         procure nos lembretes para encontrar uma correspondência
-       - Se encontrar uma correspondência exata ou próxima, use esse índice
+         use a ferramenta find_reminder (ex: find_reminder("reunião")) para encontrar uma correspondência
+       - Use o 'best_index' retornado como índice, sem procurar na lista manualmente
        - Nunca peça esclarecimento sobre qual lembrete o usuário está se referindo, apenas use a primeira correspondência
        - Se nenhuma correspondência for encontrada, liste todos os lembretes e peça para o usuário especificar
     
@@ -207,6 +292,8 @@ memory_agent = Agent(
     
     4. Para visualização:
        - Sempre use a ferramenta view_reminders quando o usuário pedir para ver seus lembretes
+       - A lista acima mostra apenas os lembretes mais recentes; para ver os demais,
+         chame view_reminders com offset e limit (ex: view_reminders(offset=20, limit=20))
        - Formate a resposta em uma lista numerada para clareza
        - Se não houver lembretes, sugira adicionar alguns
     
@@ -229,10 +316,49 @@ memory_agent = Agent(
     - Use seu melhor julgamento para determinar a qual lembrete o usuário está se referindo.
     - Você não precisa estar 100% correto, mas tente ser o mais próximo possível.
     - Nunca peça ao usuário para esclarecer qual lembrete eles estão mencionando.
-    """,
+
+    As informações do usuário estão armazenadas no estado:
+    - Nome do usuário: {user_name?}
+    - Lembretes: {reminders}
+"""
+
+
+def current_reminders(state) -> str:
+    """Lembretes do estado, já renderizados para a instrução."""
+    reminders = ReminderStore(state).texts() or (state.get(LEGACY_KEY) or [])
+    # Apenas os lembretes mais recentes entram no prompt; os demais viram um
+    # resumo, para que o tamanho do prompt não cresça com a lista.
+    return render_reminders(reminders)
+
+
+# A instrução é compilada uma única vez: a cada turno, só o nome e os
+# lembretes são preenchidos. O tempo de renderização e os tokens do prompt
+# em cache de cada turno são exibidos no fim do turno (`utils.py`).
+instruction_template = PromptTemplate(
+    INSTRUCTION, fields={'reminders': current_reminders}
+)
+
+
+# Cria um agente persistente simples
+memory_agent = Agent(
+    name='memory_agent',
+    model='gemini-2.5-flash',
+    description='Um agente inteligente de lembretes com memória persistente',
+    # A instrução é gerada por uma função a cada turno: os lembretes só são
+    # montados a partir do estado quando o prompt é construído.
+    instruction=instruction_template.instruction,
+    # Registra o tamanho estimado do prompt antes de cada chamada ao modelo
+    before_model_callback=[
+        log_prompt_size,
+        instruction_template.before_model_callback,
+    ],
+    after_model_callback=instruction_template.after_model_callback,
+    before_tool_callback=tool_cache.before_tool_callback,
+    after_tool_callback=tool_cache.after_tool_callback,
     tools=[
         add_reminder,
         view_reminders,
+        find_reminder,
         update_reminder,
         delete_reminder,
         update_user_name,
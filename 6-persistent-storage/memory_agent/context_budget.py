@@ -0,0 +1,93 @@
+import json
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+
+from .output import log
+
+# Quantos lembretes (os mais recentes) entram diretamente na instrução.
+# O restante aparece apenas como um resumo e pode ser paginado com view_reminders.
+REMINDER_WINDOW = 20
+# Quantos caracteres de cada lembrete entram no resumo dos mais antigos
+SUMMARY_PREVIEW_CHARS = 24
+SUMMARY_PREVIEW_COUNT = 3
+
+# Aproximação comum para textos em português/inglês: ~4 caracteres por token
+CHARS_PER_TOKEN = 4
+
+
+def render_reminders(
+    reminders: list[str], window: int = REMINDER_WINDOW
+) -> str:
+    """Renderiza os lembretes com tamanho limitado para a instrução do agente.
+
+    Mostra os `window` lembretes mais recentes numerados com sua posição real e
+    resume os mais antigos em uma única linha, para que o prompt não cresça com
+    o número de lembretes.
+    """
+    if not reminders:
+        return 'Nenhum lembrete'
+
+    older_count = max(len(reminders) - window, 0)
+    lines = [
+        f'{index}. {text}'
+        for index, text in enumerate(reminders[older_count:], older_count + 1)
+    ]
+
+    if older_count:
+        previews = ', '.join(
+            f"'{text[:SUMMARY_PREVIEW_CHARS]}'"
+            for text in reminders[:SUMMARY_PREVIEW_COUNT]
+        )
+        lines.insert(
+            0,
+            f'[{older_count} lembretes mais antigos (posições 1 a {older_count}) '
+            f'omitidos, ex: {previews}. Use view_reminders(offset, limit) para vê-los.]',
+        )
+    return '\n' + '\n'.join(f'      {line}' for line in lines)
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _content_text(content) -> str:
+    """Extrai o texto (e chamadas/respostas de ferramentas) de um `types.Content`."""
+    chunks = []
+    for part in content.parts or []:
+        if part.text:
+            chunks.append(part.text)
+        if part.function_call:
+            chunks.append(
+                json.dumps(part.function_call.args or {}, default=str)
+            )
+        if part.function_response:
+            chunks.append(
+                json.dumps(part.function_response.response or {}, default=str)
+            )
+    return ''.join(chunks)
+
+
+def log_prompt_size(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> Optional[LlmResponse]:
+    """Callback `before_model_callback` que registra o tamanho estimado do prompt.
+
+    Permite confirmar que o prompt fica estável mesmo com muitos lembretes.
+    """
+    system_instruction = llm_request.config.system_instruction or ''
+    if not isinstance(system_instruction, str):
+        system_instruction = _content_text(system_instruction)
+
+    instruction_tokens = estimate_tokens(system_instruction)
+    history_tokens = sum(
+        estimate_tokens(_content_text(content))
+        for content in llm_request.contents
+    )
+    log(
+        f'--- Prompt: ~{instruction_tokens + history_tokens} tokens '
+        f'(instrução: ~{instruction_tokens}, histórico: ~{history_tokens}) ---'
+    )
+    # Retornar None deixa a chamada ao modelo seguir normalmente
+    return None
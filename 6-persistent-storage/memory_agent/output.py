@@ -0,0 +1,17 @@
+from typing import Callable
+
+# Para onde vão as mensagens das ferramentas e callbacks do agente. Por padrão
+# é o `print()` (ex: no `adk web`); o main.py troca pelo `console.print`, para
+# que essas linhas entrem no mesmo buffer do restante da saída, na ordem certa.
+_output: Callable[..., None] = print
+
+
+def set_output(output: Callable[..., None]):
+    """Troca a função usada para exibir as mensagens do agente."""
+    global _output
+    _output = output
+
+
+def log(*values, **kwargs):
+    """Exibe uma mensagem do agente, com o mesmo uso do `print()`."""
+    _output(*values, **kwargs)
@@ -0,0 +1,189 @@
+import bisect
+import re
+import unicodedata
+from collections import Counter, OrderedDict, defaultdict
+from typing import Optional
+
+from google.adk.tools.tool_context import ToolContext
+
+from .reminder_store import ReminderStore, sort_key
+
+# Quantos índices (um por sessão) manter em memória ao mesmo tempo (LRU)
+MAX_INDEXED_SESSIONS = 256
+# Pontuação mínima (coeficiente de Dice entre trigramas) para considerar uma correspondência
+MIN_SCORE = 0.15
+
+_WORD_PATTERN = re.compile(r'\w+')
+
+
+def _normalize(text: str) -> str:
+    """Minúsculas e sem acentos, para que 'Reunião' encontre 'reuniao'."""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def trigrams(text: str) -> set[str]:
+    """Trigramas de cada palavra, com o mesmo preenchimento usado pelo pg_trgm."""
+    grams = set()
+    for word in _WORD_PATTERN.findall(_normalize(text)):
+        padded = f'  {word} '
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class ReminderIndex:
+    """Índice invertido de trigramas sobre os lembretes de uma sessão.
+
+    É atualizado incrementalmente pelas ferramentas de escrita, então uma busca
+    só olha as listas de postings dos trigramas da consulta, sem percorrer
+    todos os lembretes.
+
+    `version` acompanha a versão do `ReminderStore` (`VERSION_KEY`): cada
+    `add`, `update` ou `remove` soma 1, como a operação correspondente do
+    store. Se as duas não batem, o índice está desatualizado.
+    """
+
+    def __init__(self, version: int = 0):
+        self.version = version
+        self._postings: dict[str, set[str]] = defaultdict(set)
+        self._grams: dict[str, set[str]] = {}
+        self._texts: dict[str, str] = {}
+        self._normalized: dict[str, str] = {}
+        # IDs em ordem de criação: a posição vista pelo usuário sai por bisect
+        self._ids: list[str] = []
+
+    @classmethod
+    def from_store(cls, store: ReminderStore) -> 'ReminderIndex':
+        index = cls()
+        for reminder_id, text in store.items():
+            index._insert(reminder_id, text)
+        index.version = store.version
+        return index
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, reminder_id: str, text: str):
+        self._insert(reminder_id, text)
+        self.version += 1
+
+    def update(self, reminder_id: str, text: str):
+        self._insert(reminder_id, text)
+        self.version += 1
+
+    def remove(self, reminder_id: str):
+        self._delete(reminder_id)
+        self.version += 1
+
+    def _insert(self, reminder_id: str, text: str):
+        if reminder_id in self._texts:
+            self._delete(reminder_id)
+        grams = trigrams(text)
+        for gram in grams:
+            self._postings[gram].add(reminder_id)
+        self._grams[reminder_id] = grams
+        self._texts[reminder_id] = text
+        self._normalized[reminder_id] = _normalize(text)
+        bisect.insort(self._ids, reminder_id, key=sort_key)
+
+    def _delete(self, reminder_id: str):
+        for gram in self._grams.pop(reminder_id, ()):
+            postings = self._postings[gram]
+            postings.discard(reminder_id)
+            if not postings:
+                del self._postings[gram]
+        self._normalized.pop(reminder_id, None)
+        if self._texts.pop(reminder_id, None) is not None:
+            del self._ids[
+                bisect.bisect_left(
+                    self._ids, sort_key(reminder_id), key=sort_key
+                )
+            ]
+
+    def position(self, reminder_id: str) -> int:
+        """Posição do lembrete na lista do usuário (baseada em 1)."""
+        return (
+            bisect.bisect_left(self._ids, sort_key(reminder_id), key=sort_key)
+            + 1
+        )
+
+    def search(self, query: str, limit: int = 3) -> list[dict]:
+        """Retorna os lembretes mais parecidos com a consulta, do melhor ao pior."""
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self._postings.get(gram, ()))
+
+        normalized_query = _normalize(query).strip()
+        scored = []
+        for reminder_id, common in shared.items():
+            score = (
+                2 * common / (len(query_grams) + len(self._grams[reminder_id]))
+            )
+            # Pequeno bônus quando a consulta aparece literalmente no lembrete
+            if normalized_query in self._normalized[reminder_id]:
+                score += 0.5
+            if score >= MIN_SCORE:
+                scored.append((score, reminder_id))
+
+        # Em caso de empate, o lembrete mais antigo (menor posição) vem primeiro
+        scored.sort(key=lambda item: (-item[0], sort_key(item[1])))
+        return [
+            {
+                'index': self.position(reminder_id),
+                'text': self._texts[reminder_id],
+                'score': round(min(score, 1.0), 3),
+            }
+            for score, reminder_id in scored[:limit]
+        ]
+
+
+# Um índice por sessão, reaproveitado entre turnos enquanto a versão dos
+# lembretes no estado for a mesma do índice. Se o estado mudou por fora das
+# ferramentas deste processo (outro processo, outro worker), a versão não
+# bate e o índice é reconstruído do estado.
+_indexes: 'OrderedDict[tuple, ReminderIndex]' = OrderedDict()
+
+
+def _session_key(tool_context: ToolContext) -> tuple:
+    session = tool_context._invocation_context.session
+    return (session.app_name, session.user_id, session.id)
+
+
+def get_index(tool_context: ToolContext) -> ReminderIndex:
+    """Índice da sessão, reconstruído se os lembretes mudaram desde a última vez."""
+    key = _session_key(tool_context)
+    store = ReminderStore(tool_context.state)
+    index = _indexes.get(key)
+    if index is None or index.version != store.version:
+        index = ReminderIndex.from_store(store)
+        _indexes[key] = index
+        if len(_indexes) > MAX_INDEXED_SESSIONS:
+            _indexes.popitem(last=False)
+    else:
+        _indexes.move_to_end(key)
+    return index
+
+
+def peek_index(tool_context: ToolContext) -> Optional[ReminderIndex]:
+    """Índice da sessão, apenas se já existir e estiver em dia com o estado.
+
+    As ferramentas de escrita chamam esta função ANTES de alterar os
+    lembretes e repetem a alteração no índice. Se o índice ainda não existe,
+    ele será construído depois já com a alteração, direto do estado.
+    """
+    index = _indexes.get(_session_key(tool_context))
+    if (
+        index is None
+        or index.version != ReminderStore(tool_context.state).version
+    ):
+        return None
+    return index
+
+
+def invalidate_index(tool_context: ToolContext):
+    """Descarta o índice da sessão (ex: após migrar a lista antiga)."""
+    _indexes.pop(_session_key(tool_context), None)
@@ -0,0 +1,163 @@
+import uuid
+from typing import Any, Mapping, MutableMapping, Optional
+
+# Cada lembrete fica em sua própria chave do estado ('reminder:<id>'), com um ID
+# estável. Assim, adicionar, atualizar ou excluir um lembrete gera um delta de
+# estado de uma única chave, não importa quantos lembretes existam.
+#
+# O ID é '<seq>-<token>': `seq` vem de um contador persistido no estado e
+# define a ordem; `token` é aleatório. Dois turnos simultâneos na mesma sessão
+# podem receber o mesmo `seq`, mas criam chaves diferentes e suas alterações
+# são mescladas sem conflito (o empate na ordem é decidido pelo token).
+REMINDER_PREFIX = 'reminder:'
+# Próximo `seq`; dois turnos simultâneos gravam o mesmo valor, sem conflito
+NEXT_ID_KEY = 'reminder_next_id'
+# Chave antiga, onde a lista inteira era regravada a cada alteração
+LEGACY_KEY = 'reminders'
+# Versão dos lembretes: +1 a cada inclusão, atualização ou exclusão. Permite
+# saber se algo mudou (ex: para reaproveitar o índice de busca) sem ler a lista
+VERSION_KEY = 'reminder_version'
+
+
+def _reminder_key(reminder_id: str) -> str:
+    return f'{REMINDER_PREFIX}{reminder_id}'
+
+
+def sort_key(reminder_id: str) -> tuple[int, int, str]:
+    """Ordem de criação dos lembretes.
+
+    IDs de versões anteriores (só dígitos: um contador ou o relógio em
+    microssegundos) foram todos criados antes dos IDs '<seq>-<token>'.
+    """
+    seq, _, token = reminder_id.partition('-')
+    return (1 if token else 0, int(seq), token)
+
+
+def compact_state(state: Mapping[str, Any]) -> dict[str, Any]:
+    """Cópia do estado sem os marcadores de lembretes excluídos.
+
+    O estado do ADK não remove chaves: excluir um lembrete grava None na sua
+    chave, e a lista antiga migrada fica vazia. Use esta função ao regravar o
+    estado persistido (ex: na compactação do histórico) para descartá-los.
+    """
+    return {
+        key: value
+        for key, value in state.items()
+        if not (
+            (key.startswith(REMINDER_PREFIX) and value is None)
+            or (key == LEGACY_KEY and not value)
+        )
+    }
+
+
+class ReminderStore:
+    """Lembretes guardados como chaves individuais no estado da sessão.
+
+    Funciona com o `tool_context.state` das ferramentas (leitura e escrita) e com
+    qualquer mapeamento somente leitura, como `session.state` ou o estado de um
+    `ReadonlyContext`. A lista ordenada só é montada quando alguém pede por ela.
+    """
+
+    def __init__(self, state: Mapping[str, Any]):
+        self._state = state
+        self._ids: Optional[list[str]] = None
+
+    def _snapshot(self) -> Mapping[str, Any]:
+        # O `State` do ADK junta o valor persistido com o delta pendente em `to_dict()`
+        if hasattr(self._state, 'to_dict'):
+            return self._state.to_dict()
+        return self._state
+
+    def ids(self) -> list[str]:
+        """IDs dos lembretes existentes, na ordem em que foram criados.
+
+        Montada uma vez por `ReminderStore` (uma chamada de ferramenta ou um
+        turno) e mantida pelas operações de escrita.
+        """
+        if self._ids is None:
+            self._ids = sorted(
+                (
+                    key[len(REMINDER_PREFIX) :]
+                    for key, value in self._snapshot().items()
+                    if key.startswith(REMINDER_PREFIX) and value is not None
+                ),
+                key=sort_key,
+            )
+        return self._ids
+
+    def __len__(self) -> int:
+        return len(self.ids())
+
+    @property
+    def version(self) -> int:
+        return self._state.get(VERSION_KEY) or 0
+
+    def get(self, reminder_id: str) -> Optional[str]:
+        return self._state.get(_reminder_key(reminder_id))
+
+    def id_at(self, index: int) -> Optional[str]:
+        """Converte a posição vista pelo usuário (baseada em 1) em ID."""
+        ids = self.ids()
+        if index < 1 or index > len(ids):
+            return None
+        return ids[index - 1]
+
+    def items(self) -> list[tuple[str, str]]:
+        """Materializa a lista de pares (id, texto) em ordem."""
+        return [
+            (reminder_id, self._state.get(_reminder_key(reminder_id)))
+            for reminder_id in self.ids()
+        ]
+
+    def texts(self) -> list[str]:
+        return [text for _, text in self.items()]
+
+    # ===== Operações de escrita (exigem um estado mutável) =====
+
+    @property
+    def _writable(self) -> MutableMapping[str, Any]:
+        return self._state  # type: ignore[return-value]
+
+    def _bump_version(self):
+        self._writable[VERSION_KEY] = self.version + 1
+
+    def _new_id(self) -> str:
+        seq = self._state.get(NEXT_ID_KEY) or 0
+        self._writable[NEXT_ID_KEY] = seq + 1
+        return f'{seq}-{uuid.uuid4().hex[:8]}'
+
+    def add(self, text: str) -> str:
+        reminder_id = self._new_id()
+        self._writable[_reminder_key(reminder_id)] = text
+        self._bump_version()
+        if self._ids is not None:
+            self._ids.append(reminder_id)
+            self._ids.sort(key=sort_key)
+        return reminder_id
+
+    def update(self, reminder_id: str, text: str):
+        self._writable[_reminder_key(reminder_id)] = text
+        self._bump_version()
+
+    def delete(self, reminder_id: str):
+        # O estado do ADK não tem remoção de chaves: gravamos None como
+        # marcador, descartado depois por `compact_state`
+        self._writable[_reminder_key(reminder_id)] = None
+        self._bump_version()
+        if self._ids is not None and reminder_id in self._ids:
+            self._ids.remove(reminder_id)
+
+    def migrate_legacy(self) -> int:
+        """Move a lista antiga em 'reminders' para chaves individuais (uma única vez).
+
+        Returns:
+            Quantidade de lembretes migrados
+        """
+        legacy = self._state.get(LEGACY_KEY)
+        if not legacy:
+            return 0
+        for text in legacy:
+            self.add(text)
+        # Lista vazia: `compact_state` remove a chave ao regravar o estado
+        self._writable[LEGACY_KEY] = []
+        return len(legacy)
@@ -0,0 +1,198 @@
+"""Mede a renderização da instrução e os tokens em cache do memory_agent.
+
+Roda uma conversa com roteiro fixo contra o FakeLlm com `prefix_cache=True`,
+que simula o cache de contexto do provedor (o início da instrução igual ao de
+uma chamada anterior conta como tokens em cache). Compara duas disposições
+da mesma instrução:
+
+- estático primeiro: a instrução atual, com nome e lembretes no fim
+- dinâmico primeiro: nome e lembretes logo no início, como era antes
+
+Também compara o custo de renderização do `PromptTemplate` compilado com a
+substituição do ADK (que procura os placeholders no texto inteiro a cada
+chamada) e com o `str.format`.
+
+Exemplo:
+    python prompt_cache_demo.py --turns 20 --reminders 50
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import sys
+import timeit
+from pathlib import Path
+from types import SimpleNamespace
+
+from benchmark import memory_agent_script, user_messages
+from google.adk.agents import Agent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.adk.utils.instructions_utils import inject_session_state
+from google.genai import types
+from memory_agent.agent import INSTRUCTION, current_reminders, memory_agent
+from memory_agent.reminder_store import ReminderStore
+
+# Torna o pacote `shared/` (na raiz do repositório) importável
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from shared.fake_llm import FakeLlm  # noqa: E402
+from shared.prompt_template import PromptTemplate  # noqa: E402
+
+APP_NAME = 'Prompt Cache Demo'
+USER_BLOCK = '\n    As informações do usuário estão armazenadas no estado:'
+
+
+def dynamic_first(instruction: str) -> str:
+    """A mesma instrução, com o bloco do usuário logo após a primeira linha."""
+    static, user_block = instruction.split(USER_BLOCK)
+    first_line, rest = static.split('\n    \n', 1)
+    return f'{first_line}\n{USER_BLOCK}{user_block}    \n{rest}'
+
+
+async def run_conversation(template: PromptTemplate, args) -> list:
+    agent = Agent(
+        name=memory_agent.name,
+        model=FakeLlm(
+            responder=memory_agent_script,
+            prefix_cache=True,
+            min_cached_tokens=args.min_cached_tokens,
+        ),
+        description=memory_agent.description,
+        instruction=template.instruction,
+        before_model_callback=template.before_model_callback,
+        after_model_callback=template.after_model_callback,
+        tools=memory_agent.tools,
+    )
+    session_service = InMemorySessionService()
+    runner = Runner(
+        agent=agent, app_name=APP_NAME, session_service=session_service
+    )
+    state = {'user_name': 'Usuário 0'}
+    store = ReminderStore(state)
+    for i in range(args.reminders):
+        store.add(f'lembrete antigo {i}')
+    session = await session_service.create_session(
+        app_name=APP_NAME, user_id='user-0', state=state
+    )
+
+    turns = []
+    # As ferramentas imprimem no terminal; a demonstração descarta essa saída
+    with contextlib.redirect_stdout(io.StringIO()):
+        for text in user_messages(0, args.turns):
+            invocation_id = None
+            async for event in runner.run_async(
+                user_id='user-0',
+                session_id=session.id,
+                new_message=types.Content(
+                    role='user', parts=[types.Part(text=text)]
+                ),
+            ):
+                invocation_id = event.invocation_id
+            turns.append(template.turn_metrics(invocation_id))
+    return turns
+
+
+def print_turns(label: str, template: PromptTemplate, turns: list):
+    print(f'\n=== {label} ===')
+    print(
+        f'{"turno":>5} {"render (µs)":>11} {"prompt":>7} '
+        f'{"em cache":>9} {"sem cache":>9}'
+    )
+    for i, turn in enumerate(turns, 1):
+        print(
+            f'{i:>5} {turn.render_seconds * 1e6:>11.0f} '
+            f'{turn.prompt_tokens:>7} {turn.cached_tokens:>9} '
+            f'{turn.uncached_tokens:>9}'
+        )
+    stats = template.stats
+    print(
+        f'Total: {stats["prompt_tokens"]} tokens de prompt, '
+        f'{stats["cached_tokens"]} em cache ({stats["cached_ratio"]:.0%}); '
+        f'prefixo estático de {stats["static_chars"]} de '
+        f'{stats["template_chars"]} caracteres'
+    )
+
+
+def compare_rendering(args):
+    """Custo de renderizar a instrução por chamada, três maneiras."""
+    state = {'user_name': 'Usuário 0'}
+    store = ReminderStore(state)
+    for i in range(args.reminders):
+        store.add(f'lembrete antigo {i}')
+    reminders = current_reminders(state)
+    values = {'user_name': state['user_name'], 'reminders': reminders}
+
+    # Para comparar só a substituição, os lembretes já vão renderizados
+    template = PromptTemplate(INSTRUCTION)
+    context = SimpleNamespace(
+        _invocation_context=SimpleNamespace(
+            session=SimpleNamespace(state=values), artifact_service=None
+        )
+    )
+    # O `str.format` não conhece o '?' de placeholder opcional
+    adk_text = INSTRUCTION
+    format_text = INSTRUCTION.replace('{user_name?}', '{user_name}')
+
+    async def adk_batch():
+        for _ in range(args.renders):
+            await inject_session_state(adk_text, context)
+
+    # Cada opção renderiza a instrução `args.renders` vezes
+    candidates = {
+        'PromptTemplate': lambda: [
+            template.render(values) for _ in range(args.renders)
+        ],
+        'str.format': lambda: [
+            format_text.format(**values) for _ in range(args.renders)
+        ],
+        'ADK (inject_session_state)': lambda: asyncio.run(adk_batch()),
+    }
+    print('\n=== Renderização da instrução (sem os lembretes) ===')
+    for name, function in candidates.items():
+        seconds = min(timeit.repeat(function, number=1, repeat=5))
+        print(f'{name:<28} {seconds / args.renders * 1e6:8.1f} µs')
+
+
+async def main_async(args):
+    layouts = {
+        'Estático primeiro (instrução atual)': INSTRUCTION,
+        'Dinâmico primeiro (como era antes)': dynamic_first(INSTRUCTION),
+    }
+    for label, text in layouts.items():
+        template = PromptTemplate(
+            text, fields={'reminders': current_reminders}
+        )
+        turns = await run_conversation(template, args)
+        print_turns(label, template, turns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--turns', type=int, default=12)
+    parser.add_argument(
+        '--reminders',
+        type=int,
+        default=10,
+        help='Lembretes já existentes na sessão',
+    )
+    parser.add_argument(
+        '--min-cached-tokens',
+        type=int,
+        default=0,
+        help='Menor prefixo reaproveitado pelo cache simulado, em tokens',
+    )
+    parser.add_argument(
+        '--renders',
+        type=int,
+        default=2000,
+        help='Renderizações por medição na comparação de custo',
+    )
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+    compare_rendering(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
+
+from google.adk.events import EventActions
+from google.adk.sessions import (
+    BaseSessionService,
+    DatabaseSessionService,
+    Session,
+)
+from google.adk.sessions.base_session_service import GetSessionConfig
+from google.adk.sessions.database_session_service import (
+    StorageEvent,
+    StorageSession,
+)
+from google.genai import types
+from sqlalchemy import JSON, DateTime, String, delete, func, select
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+# Autor do evento de resumo. Como não é 'user' nem o agente atual, o ADK o
+# apresenta ao modelo como contexto ("For context: [...] said: ...").
+COMPACTION_AUTHOR = 'history_compactor'
+
+# Limites do resumo extrativo padrão
+SUMMARY_MAX_MESSAGES = 20
+SUMMARY_MAX_CHARS = 160
+
+# Uma mensagem antiga resumida: {'author': str, 'text': str, 'timestamp': datetime}
+Summarizer = Callable[[list[dict[str, Any]]], str]
+# Recebe o estado persistido da sessão e devolve o estado a gravar
+StateCompactor = Callable[[dict[str, Any]], dict[str, Any]]
+
+
+class _ArchiveBase(DeclarativeBase):
+    pass
+
+
+class ArchivedEvent(_ArchiveBase):
+    """Evento retirado do histórico ativo de uma sessão pela compactação."""
+
+    __tablename__ = 'archived_events'
+
+    id: Mapped[str] = mapped_column(String(128), primary_key=True)
+    app_name: Mapped[str] = mapped_column(String(128), primary_key=True)
+    user_id: Mapped[str] = mapped_column(String(128), primary_key=True)
+    session_id: Mapped[str] = mapped_column(String(128), primary_key=True)
+    invocation_id: Mapped[str] = mapped_column(String(256))
+    author: Mapped[str] = mapped_column(String(256))
+    timestamp: Mapped[datetime] = mapped_column(DateTime())
+    content: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    # As ações em JSON (e não com pickle, como na tabela `events`), para que
+    # o arquivo continue legível mesmo se as classes do ADK mudarem
+    actions: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    archived_at: Mapped[datetime] = mapped_column(
+        DateTime(), default=func.now()
+    )
+
+
+def _text_of(content: Optional[dict]) -> str:
+    if not content:
+        return ''
+    return ' '.join(
+        part['text'].strip()
+        for part in content.get('parts', [])
+        if part.get('text') and not part.get('thought')
+    )
+
+
+def summarize_messages(messages: list[dict[str, Any]]) -> str:
+    """Resumo extrativo padrão: o resumo anterior e as últimas mensagens trocadas.
+
+    Não chama nenhum modelo; troque por um resumidor com LLM se quiser um texto
+    mais fluido.
+    """
+    previous = [
+        m['text'] for m in messages if m['author'] == COMPACTION_AUTHOR
+    ]
+    dialogue = [
+        m for m in messages if m['author'] != COMPACTION_AUTHOR and m['text']
+    ]
+
+    lines = [
+        f'Resumo automático de {len(messages)} eventos anteriores desta conversa.'
+    ]
+    if previous:
+        lines.append(previous[-1])
+    if dialogue:
+        start = dialogue[0]['timestamp'].strftime('%Y-%m-%d %H:%M')
+        end = dialogue[-1]['timestamp'].strftime('%Y-%m-%d %H:%M')
+        lines.append(f'Mensagens mais recentes do período ({start} a {end}):')
+        for message in dialogue[-SUMMARY_MAX_MESSAGES:]:
+            text = message['text']
+            if len(text) > SUMMARY_MAX_CHARS:
+                text = text[:SUMMARY_MAX_CHARS] + '...'
+            lines.append(f'- {message["author"]}: {text}')
+    return '\n'.join(lines)
+
+
+async def compact_session(
+    database: DatabaseSessionService,
+    *,
+    app_name: str,
+    user_id: str,
+    session_id: str,
+    keep_last: int = 100,
+    summarize: Summarizer = summarize_messages,
+    compact_state: Optional[StateCompactor] = None,
+) -> int:
+    """Move os eventos antigos de uma sessão para o arquivo e deixa um resumo no lugar.
+
+    Mantém os `keep_last` eventos mais recentes no histórico ativo; os demais
+    são copiados para a tabela `archived_events`, removidos de `events` e
+    substituídos por um único evento de resumo. Os deltas dos eventos antigos
+    já estão aplicados no estado da sessão; se `compact_state` for informado,
+    o estado persistido é regravado com o que ele devolver (ex: sem os
+    marcadores de itens excluídos).
+
+    Returns:
+        Quantidade de eventos arquivados (0 se nada precisou ser compactado)
+    """
+    # O SQLAlchemy usado pelo DatabaseSessionService é síncrono: a
+    # compactação roda em uma thread para não travar o event loop
+    return await asyncio.to_thread(
+        _compact_session,
+        database,
+        app_name=app_name,
+        user_id=user_id,
+        session_id=session_id,
+        keep_last=keep_last,
+        summarize=summarize,
+        compact_state=compact_state,
+    )
+
+
+def _compact_session(
+    database: DatabaseSessionService,
+    *,
+    app_name: str,
+    user_id: str,
+    session_id: str,
+    keep_last: int,
+    summarize: Summarizer,
+    compact_state: Optional[StateCompactor],
+) -> int:
+    _ArchiveBase.metadata.create_all(database.db_engine)
+
+    with database.database_session_factory() as db:
+        storage_session = db.get(
+            StorageSession, (app_name, user_id, session_id)
+        )
+        if storage_session is None:
+            return 0
+
+        if compact_state is not None:
+            state = compact_state(dict(storage_session.state))
+            if state != storage_session.state:
+                storage_session.state = state
+
+        events = db.scalars(
+            select(StorageEvent)
+            .filter(StorageEvent.app_name == app_name)
+            .filter(StorageEvent.user_id == user_id)
+            .filter(StorageEvent.session_id == session_id)
+            .order_by(StorageEvent.timestamp)
+        ).all()
+        if len(events) <= keep_last + 1:
+            db.commit()
+            return 0
+
+        old_events = events[: len(events) - keep_last]
+        first_kept = events[len(events) - keep_last] if keep_last else None
+
+        summary = summarize(
+            [
+                {
+                    'author': e.author,
+                    'text': _text_of(e.content),
+                    'timestamp': e.timestamp,
+                }
+                for e in old_events
+            ]
+        )
+
+        for e in old_events:
+            db.add(
+                ArchivedEvent(
+                    id=e.id,
+                    app_name=app_name,
+                    user_id=user_id,
+                    session_id=session_id,
+                    invocation_id=e.invocation_id,
+                    author=e.author,
+                    timestamp=e.timestamp,
+                    content=e.content,
+                    actions=(
+                        e.actions.model_dump(exclude_none=True, mode='json')
+                        if e.actions
+                        else None
+                    ),
+                )
+            )
+        db.execute(
+            delete(StorageEvent)
+            .where(StorageEvent.app_name == app_name)
+            .where(StorageEvent.user_id == user_id)
+            .where(StorageEvent.session_id == session_id)
+            .where(StorageEvent.id.in_([e.id for e in old_events]))
+        )
+
+        # O resumo fica imediatamente antes do primeiro evento mantido
+        if first_kept is not None:
+            summary_time = first_kept.timestamp - timedelta(microseconds=1)
+        else:
+            summary_time = datetime.now()
+        summary_event = StorageEvent(
+            id=str(uuid.uuid4()),
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            invocation_id=f'compaction-{uuid.uuid4()}',
+            author=COMPACTION_AUTHOR,
+            timestamp=summary_time,
+            actions=EventActions(),
+        )
+        summary_event.content = types.Content(
+            role='model', parts=[types.Part(text=summary)]
+        ).model_dump(exclude_none=True, mode='json')
+        db.add(summary_event)
+
+        db.commit()
+        return len(old_events)
+
+
+async def get_recent_session(
+    session_service: BaseSessionService,
+    *,
+    app_name: str,
+    user_id: str,
+    session_id: str,
+    last_n: Optional[int] = None,
+    after: Optional[datetime] = None,
+) -> Optional[Session]:
+    """Carrega a sessão apenas com os últimos `last_n` eventos e/ou os posteriores a `after`.
+
+    O estado vem completo; só o histórico é limitado, então o custo da leitura
+    não depende da idade da sessão.
+    """
+    return await session_service.get_session(
+        app_name=app_name,
+        user_id=user_id,
+        session_id=session_id,
+        config=GetSessionConfig(
+            num_recent_events=last_n,
+            after_timestamp=after.timestamp() if after else None,
+        ),
+    )
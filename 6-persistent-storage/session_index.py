@@ -0,0 +1,121 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+from adk_storage import update_timestamp
+from google.adk.sessions import DatabaseSessionService, Session
+from google.adk.sessions.database_session_service import StorageSession
+from sqlalchemy import Index, String, and_, or_, select, type_coerce
+
+# Índice composto para "sessões de um usuário, da mais recente para a mais
+# antiga". Com ele, buscar a sessão mais recente lê uma única entrada do
+# índice, em vez de carregar todas as sessões do usuário.
+SESSION_UPDATE_INDEX = Index(
+    'ix_sessions_app_user_update_time',
+    StorageSession.app_name,
+    StorageSession.user_id,
+    StorageSession.update_time,
+)
+
+# `update_time` como está gravado no banco. No SQLite, o ADK grava datas com
+# e sem microssegundos; comparar o valor gravado (e não um datetime
+# convertido de volta) mantém a paginação consistente com a ordenação.
+_RAW_UPDATE_TIME = type_coerce(StorageSession.update_time, String)
+
+# Apenas o cabeçalho da sessão: nada de estado ou eventos
+_HEADER_COLUMNS = (
+    StorageSession.app_name,
+    StorageSession.user_id,
+    StorageSession.id,
+    StorageSession.update_time,
+    _RAW_UPDATE_TIME.label('raw_update_time'),
+)
+
+
+def ensure_session_index(engine):
+    """Cria o índice na tabela `sessions` do ADK, se ainda não existir."""
+    SESSION_UPDATE_INDEX.create(engine, checkfirst=True)
+
+
+@dataclass
+class SessionPage:
+    # Sessões sem estado e sem eventos, da mais recente para a mais antiga
+    sessions: list[Session] = field(default_factory=list)
+    # Passe para `list_sessions_page` para buscar a próxima página
+    next_page_token: Optional[str] = None
+
+
+def _header(row, dialect_name: str) -> Session:
+    return Session(
+        app_name=row.app_name,
+        user_id=row.user_id,
+        id=row.id,
+        last_update_time=update_timestamp(row.update_time, dialect_name),
+    )
+
+
+def _newest_first(app_name: str, user_id: str):
+    return (
+        select(*_HEADER_COLUMNS)
+        .where(
+            StorageSession.app_name == app_name,
+            StorageSession.user_id == user_id,
+        )
+        .order_by(StorageSession.update_time.desc(), StorageSession.id.desc())
+    )
+
+
+async def latest_session(
+    database: DatabaseSessionService, *, app_name: str, user_id: str
+) -> Optional[Session]:
+    """Cabeçalho da sessão atualizada mais recentemente, ou None se não houver."""
+    with database.database_session_factory() as db:
+        row = db.execute(_newest_first(app_name, user_id).limit(1)).first()
+    if row is None:
+        return None
+    return _header(row, database.db_engine.dialect.name)
+
+
+async def list_sessions_page(
+    database: DatabaseSessionService,
+    *,
+    app_name: str,
+    user_id: str,
+    page_size: int = 20,
+    page_token: Optional[str] = None,
+) -> SessionPage:
+    """Lista as sessões do usuário em páginas, da mais recente para a mais antiga.
+
+    A paginação continua a partir da última sessão da página anterior (e não
+    por OFFSET), então cada página custa o mesmo, não importa quantas vieram
+    antes.
+    """
+    query = _newest_first(app_name, user_id)
+    if page_token:
+        update_time, session_id = page_token.split('|', 1)
+        query = query.where(
+            or_(
+                _RAW_UPDATE_TIME < update_time,
+                and_(
+                    _RAW_UPDATE_TIME == update_time,
+                    StorageSession.id < session_id,
+                ),
+            )
+        )
+
+    with database.database_session_factory() as db:
+        rows = db.execute(query.limit(page_size + 1)).all()
+
+    next_page_token = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        raw = last.raw_update_time
+        if not isinstance(raw, str):
+            raw = raw.isoformat()
+        next_page_token = f'{raw}|{last.id}'
+    return SessionPage(
+        sessions=[
+            _header(row, database.db_engine.dialect.name) for row in rows
+        ],
+        next_page_token=next_page_token,
+    )
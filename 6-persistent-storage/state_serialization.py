@@ -0,0 +1,232 @@
+import json
+import weakref
+from typing import Any, Optional
+
+from google.adk.sessions.database_session_service import (
+    DynamicJSON,
+    StorageAppState,
+    StorageSession,
+    StorageUserState,
+)
+from sqlalchemy import Engine, text
+from sqlalchemy.orm import configure_mappers
+
+# Cabeçalho dos valores gravados em formato binário:
+# MAGIC + 1 byte com o codec + 1 byte de flags. Linhas antigas (texto JSON)
+# não têm esse cabeçalho e continuam sendo lidas normalmente.
+MAGIC = b'ADKS'
+FLAG_ZSTD = 0x01
+
+
+class StateSerializer:
+    """Serializador JSON padrão do estado; base para os formatos binários.
+
+    Com `compress_threshold`, valores serializados maiores que esse número de
+    bytes são comprimidos com zstd (requer `pip install zstandard`).
+    """
+
+    codec_id = 0
+    name = 'json'
+
+    def __init__(self, compress_threshold: Optional[int] = None):
+        self.compress_threshold = compress_threshold
+        if compress_threshold is not None:
+            try:
+                import zstandard
+            except ImportError as e:
+                raise ImportError(
+                    'A compressão zstd requer o pacote zstandard: pip install zstandard'
+                ) from e
+            self._compressor = zstandard.ZstdCompressor(level=3)
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, separators=(',', ':')).encode()
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+    def encode(self, value: Any) -> bytes:
+        payload = self.dumps(value)
+        flags = 0
+        if (
+            self.compress_threshold is not None
+            and len(payload) > self.compress_threshold
+        ):
+            payload = self._compressor.compress(payload)
+            flags |= FLAG_ZSTD
+        return MAGIC + bytes([self.codec_id, flags]) + payload
+
+
+class OrjsonSerializer(StateSerializer):
+    """JSON com orjson: mesmo formato, codificação e decodificação bem mais rápidas."""
+
+    codec_id = 1
+    name = 'orjson'
+
+    def __init__(self, compress_threshold: Optional[int] = None):
+        super().__init__(compress_threshold)
+        try:
+            import orjson
+        except ImportError as e:
+            raise ImportError(
+                'OrjsonSerializer requer o pacote orjson: pip install orjson'
+            ) from e
+        self._orjson = orjson
+
+    def dumps(self, value: Any) -> bytes:
+        return self._orjson.dumps(value)
+
+    def loads(self, data: bytes) -> Any:
+        return self._orjson.loads(data)
+
+
+class MsgpackSerializer(StateSerializer):
+    """MessagePack: formato binário compacto, sem o custo de escapar strings."""
+
+    codec_id = 2
+    name = 'msgpack'
+
+    def __init__(self, compress_threshold: Optional[int] = None):
+        super().__init__(compress_threshold)
+        try:
+            import msgpack
+        except ImportError as e:
+            raise ImportError(
+                'MsgpackSerializer requer o pacote msgpack: pip install msgpack'
+            ) from e
+        self._msgpack = msgpack
+
+    def dumps(self, value: Any) -> bytes:
+        return self._msgpack.packb(value, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Any:
+        return self._msgpack.unpackb(data, raw=False)
+
+
+_SERIALIZERS = {
+    cls.codec_id: cls
+    for cls in (StateSerializer, OrjsonSerializer, MsgpackSerializer)
+}
+
+
+def decode(value: Any, cache: dict[int, StateSerializer]) -> Any:
+    """Decodifica um valor lido do banco, em qualquer um dos formatos suportados."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        # Linha antiga gravada pelo DatabaseSessionService: texto JSON
+        return json.loads(value)
+
+    data = bytes(value)
+    if not data.startswith(MAGIC):
+        return json.loads(data)
+
+    codec_id, flags = data[len(MAGIC)], data[len(MAGIC) + 1]
+    payload = data[len(MAGIC) + 2 :]
+    if flags & FLAG_ZSTD:
+        import zstandard
+
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+
+    # Lê linhas gravadas por outro serializador (ex: após trocar de formato)
+    serializer = cache.get(codec_id)
+    if serializer is None:
+        serializer = cache[codec_id] = _SERIALIZERS[codec_id]()
+    return serializer.loads(payload)
+
+
+# Serializador de cada engine que o ativou. As demais conexões do processo
+# (ex: outro DatabaseSessionService) continuam gravando JSON, como no ADK.
+_engine_serializers: 'weakref.WeakKeyDictionary[Any, StateSerializer]' = (
+    weakref.WeakKeyDictionary()
+)
+
+_STATE_MODELS = (StorageSession, StorageAppState, StorageUserState)
+
+
+class SerializedState(DynamicJSON):
+    """Coluna de estado do ADK que usa o serializador do engine, se houver um.
+
+    O SQLAlchemy passa o dialeto da conexão a cada valor lido ou gravado, e
+    cada engine tem o seu próprio objeto de dialeto: é por ele que o
+    serializador é escolhido. Sem serializador, o comportamento é o mesmo do
+    `DynamicJSON` do ADK (inclusive o tipo da coluna ao criar as tabelas).
+
+    No SQLite, uma coluna TEXT aceita valores binários, então as linhas antigas
+    em JSON e as novas em binário convivem na mesma tabela.
+    """
+
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        serializer = _engine_serializers.get(dialect)
+        if serializer is None or value is None:
+            return super().process_bind_param(value, dialect)
+        return serializer.encode(dict(value))
+
+    def process_result_value(self, value, dialect):
+        serializer = _engine_serializers.get(dialect)
+        if serializer is None:
+            return super().process_result_value(value, dialect)
+        return decode(value, {serializer.codec_id: serializer})
+
+
+def _install_column_type():
+    """Troca (uma única vez) o tipo das colunas de estado por `SerializedState`."""
+    if all(
+        isinstance(model.__table__.c.state.type, SerializedState)
+        for model in _STATE_MODELS
+    ):
+        return
+    # Configura os mappers antes da troca para manter o rastreamento de
+    # mutações (MutableDict) que o ADK registra nas colunas de estado.
+    configure_mappers()
+    column_type = SerializedState()
+    for model in _STATE_MODELS:
+        model.__table__.c.state.type = column_type
+
+
+def has_binary_state(engine: Engine) -> bool:
+    """Se o banco SQLite tem estado gravado em formato binário."""
+    with engine.connect() as connection:
+        for model in _STATE_MODELS:
+            table = model.__tablename__
+            row = connection.execute(
+                text(
+                    f"SELECT 1 FROM {table} WHERE typeof(state) = 'blob' LIMIT 1"
+                )
+            ).first()
+            if row is not None:
+                return True
+    return False
+
+
+def check_state_format(engine: Engine):
+    """Recusa abrir sem serializador um banco com estado em formato binário.
+
+    O `DatabaseSessionService` comum (e o `adk web`) não sabe ler essas
+    linhas: falharia no meio de uma leitura em vez de avisar logo na abertura.
+    """
+    if (
+        engine.dialect.name == 'sqlite'
+        and engine.dialect not in _engine_serializers
+        and has_binary_state(engine)
+    ):
+        raise RuntimeError(
+            f'O banco {engine.url} tem estado gravado por um StateSerializer '
+            'binário. Abra-o com o mesmo `serializer` (ex: '
+            'WriteBehindSessionService(..., serializer=MsgpackSerializer())).'
+        )
+
+
+def install_state_serializer(engine: Engine, serializer: StateSerializer):
+    """Grava o estado com `serializer` nas conexões deste engine (só SQLite).
+
+    Os outros engines do processo não são afetados. O formato no disco muda:
+    as linhas gravadas assim só podem ser lidas por um serviço que também
+    tenha o serializador instalado (veja `check_state_format`).
+    """
+    if engine.dialect.name != 'sqlite':
+        raise ValueError('O serializador de estado só é suportado no SQLite.')
+    _install_column_type()
+    _engine_serializers[engine.dialect] = serializer
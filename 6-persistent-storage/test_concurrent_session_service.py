@@ -0,0 +1,120 @@
+"""Conflitos e gravações concorrentes do ConcurrentSessionService.
+
+Rode com: pytest test_concurrent_session_service.py
+"""
+
+import asyncio
+import multiprocessing
+
+from concurrent_session_service import ConcurrentSessionService
+from google.adk.events import Event, EventActions
+
+APP_NAME = 'Teste'
+USER_ID = 'usuario'
+
+
+def _service(tmp_path) -> ConcurrentSessionService:
+    return ConcurrentSessionService(f'sqlite:///{tmp_path}/sessions.db')
+
+
+async def _write(service, session, key, value):
+    # Como o Runner: o ADK grava no estado em memória antes de `append_event`
+    session.state[key] = value
+    await service.append_event(
+        session,
+        Event(
+            author='user',
+            invocation_id=f'inv-{key}-{value}',
+            actions=EventActions(state_delta={key: value}),
+        ),
+    )
+
+
+def test_single_writer_has_no_conflicts(tmp_path):
+    async def scenario():
+        service = _service(tmp_path)
+        session = await service.create_session(
+            app_name=APP_NAME, user_id=USER_ID
+        )
+        for i in range(5):
+            await _write(service, session, 'counter', i)
+
+        stored = await service.get_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id=session.id
+        )
+        return service.conflicts, stored.state['counter']
+
+    conflicts, counter = asyncio.run(scenario())
+    assert conflicts == 0
+    assert counter == 4
+
+
+def test_two_writers_on_the_same_key_conflict_once(tmp_path):
+    async def scenario():
+        service = _service(tmp_path)
+        created = await service.create_session(
+            app_name=APP_NAME, user_id=USER_ID, state={'topic': 'inicial'}
+        )
+        # Dois turnos leem a mesma versão da sessão
+        first, second = [
+            await service.get_session(
+                app_name=APP_NAME, user_id=USER_ID, session_id=created.id
+            )
+            for _ in range(2)
+        ]
+        await _write(service, first, 'topic', 'primeiro')
+        await _write(service, second, 'topic', 'segundo')
+        # Chaves diferentes não conflitam
+        await _write(service, first, 'a', 1)
+        await _write(service, second, 'b', 2)
+
+        stored = await service.get_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id=created.id
+        )
+        return service.conflicts, stored.state
+
+    conflicts, state = asyncio.run(scenario())
+    assert conflicts == 1
+    assert state['topic'] == 'segundo'
+    assert state['a'] == 1 and state['b'] == 2
+
+
+def _write_keys(db_url, session_id, worker, count):
+    async def scenario():
+        service = ConcurrentSessionService(db_url)
+        for i in range(count):
+            session = await service.get_session(
+                app_name=APP_NAME, user_id=USER_ID, session_id=session_id
+            )
+            await _write(service, session, f'w{worker}-{i}', i)
+
+    asyncio.run(scenario())
+
+
+def test_writers_in_several_processes_keep_every_key(tmp_path):
+    db_url = f'sqlite:///{tmp_path}/sessions.db'
+    service = ConcurrentSessionService(db_url)
+    session = asyncio.run(
+        service.create_session(app_name=APP_NAME, user_id=USER_ID)
+    )
+    # Cada processo grava chaves próprias: nenhuma pode se perder
+    workers, count = 4, 25
+    context = multiprocessing.get_context('spawn')
+    processes = [
+        context.Process(
+            target=_write_keys, args=(db_url, session.id, worker, count)
+        )
+        for worker in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert all(process.exitcode == 0 for process in processes)
+
+    stored = asyncio.run(
+        service.get_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id=session.id
+        )
+    )
+    assert len(stored.state) == workers * count
@@ -0,0 +1,552 @@
+import contextvars
+import json
+import logging
+import secrets
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.events import Event
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import (
+    GetSessionConfig,
+    ListSessionsResponse,
+)
+from google.adk.tools import BaseTool, ToolContext
+from sqlalchemy import event as sa_event
+
+logger = logging.getLogger(__name__)
+
+# Span em andamento na tarefa atual (pai dos próximos spans)
+_current_span: contextvars.ContextVar[Optional['Span']] = (
+    contextvars.ContextVar('current_span', default=None)
+)
+
+
+def _json_size(value: Any) -> int:
+    return len(json.dumps(value, default=str).encode())
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: Optional[int] = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def ended(self) -> bool:
+        return self.end_ns is not None
+
+    @property
+    def duration(self) -> float:
+        """Duração em segundos (até agora, se o span ainda está aberto)."""
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e9
+
+    def add(self, key: str, amount: float = 1):
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def to_otlp(self) -> dict:
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': 1,  # SPAN_KIND_INTERNAL
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns or self.start_ns),
+            'attributes': [
+                {'key': key, 'value': _otlp_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            'status': {'code': 2, 'message': self.error}
+            if self.error
+            else {'code': 0},
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        # No OTLP/JSON, inteiros de 64 bits são enviados como string
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class OtlpExporter:
+    """Exporta os spans no formato OTLP/JSON.
+
+    Com `path`, cada turno vira uma linha (um `ExportTraceServiceRequest`) no
+    arquivo, o mesmo formato do file exporter do OpenTelemetry Collector. Com
+    `endpoint` (ex: http://localhost:4318/v1/traces), os spans também são
+    enviados a um collector por OTLP/HTTP, em uma thread separada.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        endpoint: Optional[str] = None,
+        service_name: str = 'memory-agent',
+    ):
+        self.path = path
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self._lock = threading.Lock()
+
+    def export(self, spans: list[Span]):
+        payload = {
+            'resourceSpans': [
+                {
+                    'resource': {
+                        'attributes': [
+                            {
+                                'key': 'service.name',
+                                'value': {'stringValue': self.service_name},
+                            }
+                        ]
+                    },
+                    'scopeSpans': [
+                        {
+                            'scope': {'name': __name__},
+                            'spans': [span.to_otlp() for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+        encoded = json.dumps(payload, ensure_ascii=False)
+        if self.path:
+            with self._lock, open(self.path, 'a', encoding='utf-8') as file:
+                file.write(encoded + '\n')
+        if self.endpoint:
+            threading.Thread(
+                target=self._post, args=(encoded.encode(),), daemon=True
+            ).start()
+
+    def _post(self, body: bytes):
+        request = urllib.request.Request(
+            self.endpoint,
+            data=body,
+            headers={'Content-Type': 'application/json'},
+        )
+        try:
+            urllib.request.urlopen(request, timeout=5).close()
+        except Exception as e:
+            logger.warning(f'Falha ao enviar spans para {self.endpoint}: {e}')
+
+
+class Tracer:
+    """Mede onde o tempo de cada turno é gasto.
+
+    Cria spans para o turno, para cada execução do Runner, para as chamadas ao
+    session service (`TracedSessionService`), para as chamadas ao modelo e
+    para as ferramentas (callbacks instalados por `instrument_agent`). Quando
+    um span raiz termina, os spans do turno são exportados e resumidos em
+    `turns`; `agents` acumula os totais por agente.
+    """
+
+    def __init__(self, exporter: Optional[OtlpExporter] = None):
+        self.exporter = exporter
+        self._spans: dict[str, list[Span]] = defaultdict(list)
+        self._open_models: dict[tuple, Span] = {}
+        self._open_tools: dict[str, Span] = {}
+        self.turns: list[dict] = []
+        self.agents: dict[str, dict] = defaultdict(lambda: defaultdict(float))
+        # Consultas feitas fora de qualquer span (ex: flush em segundo plano)
+        self.background_queries = 0
+
+    # ===== Spans =====
+
+    def start_span(
+        self, name: str, parent: Optional[Span] = None, **attributes
+    ) -> Span:
+        parent = parent or _current_span.get()
+        if parent is not None and parent.ended:
+            parent = None
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id if parent else None,
+            start_ns=time.time_ns(),
+            attributes=attributes,
+        )
+        self._spans[span.trace_id].append(span)
+        return span
+
+    def end_span(self, span: Span, error: Optional[BaseException] = None):
+        if span.ended:
+            return
+        span.end_ns = time.time_ns()
+        if error is not None:
+            span.error = f'{type(error).__name__}: {error}'
+        if span.parent_id is None:
+            self._finish_trace(span)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Span ao redor de um bloco; vira o pai dos spans criados dentro dele."""
+        span = self.start_span(name, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            self.end_span(span, e)
+            raise
+        finally:
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # Gerador encerrado em outro contexto (ex: aclose tardio)
+                pass
+            self.end_span(span)
+
+    def count_query(self):
+        """Conta uma consulta ao banco no span atual."""
+        span = _current_span.get()
+        if span is None or span.ended:
+            self.background_queries += 1
+        else:
+            span.add('db.queries')
+
+    def watch_engine(self, engine):
+        """Conta as consultas SQL executadas em um engine SQLAlchemy."""
+        sa_event.listen(
+            engine,
+            'before_cursor_execute',
+            lambda *args, **kwargs: self.count_query(),
+        )
+
+    # ===== Callbacks do agente =====
+
+    def before_model_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        # Instalado como ÚLTIMO before_model_callback: só roda quando nenhum
+        # outro callback (ex: um cache) respondeu no lugar do modelo
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        self._open_models[key] = self.start_span(
+            'model.generate',
+            **{
+                'gen_ai.request.model': llm_request.model or '',
+                'agent.name': callback_context.agent_name,
+                'gen_ai.request.contents': len(llm_request.contents),
+            },
+        )
+        return None
+
+    def after_model_callback(
+        self, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> Optional[LlmResponse]:
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        span = self._open_models.get(key)
+        if span is None:
+            return None
+        if llm_response.partial:
+            span.attributes.setdefault(
+                'gen_ai.time_to_first_chunk_ms',
+                round(span.duration * 1000, 1),
+            )
+            return None
+
+        del self._open_models[key]
+        usage = llm_response.usage_metadata
+        if usage is not None:
+            span.attributes['gen_ai.usage.input_tokens'] = (
+                usage.prompt_token_count or 0
+            )
+            span.attributes['gen_ai.usage.output_tokens'] = (
+                usage.candidates_token_count or 0
+            )
+            if usage.cached_content_token_count:
+                span.attributes['gen_ai.usage.cached_tokens'] = (
+                    usage.cached_content_token_count
+                )
+        self.end_span(
+            span,
+            RuntimeError(llm_response.error_message)
+            if llm_response.error_code
+            else None,
+        )
+        return None
+
+    def before_tool_callback(
+        self, tool: BaseTool, args: dict[str, Any], tool_context: ToolContext
+    ) -> Optional[dict]:
+        self._open_tools[tool_context.function_call_id] = self.start_span(
+            'tool.execute',
+            **{
+                'tool.name': tool.name,
+                'agent.name': tool_context.agent_name,
+                'tool.args_bytes': _json_size(args),
+            },
+        )
+        return None
+
+    def after_tool_callback(
+        self,
+        tool: BaseTool,
+        args: dict[str, Any],
+        tool_context: ToolContext,
+        tool_response: Any,
+    ) -> Optional[dict]:
+        span = self._open_tools.pop(tool_context.function_call_id, None)
+        if span is not None:
+            span.attributes['tool.response_bytes'] = _json_size(tool_response)
+            span.attributes['state.delta_keys'] = len(
+                tool_context.actions.state_delta
+            )
+            self.end_span(span)
+        return None
+
+    def instrument_agent(self, agent):
+        """Instala os callbacks de medição no agente e nos seus sub-agentes.
+
+        Os callbacks de medição não alteram nada: o de antes do modelo entra
+        por último e os demais entram primeiro, sempre devolvendo None.
+        """
+        if hasattr(agent, 'canonical_before_model_callbacks'):
+            agent.before_model_callback = [
+                *agent.canonical_before_model_callbacks,
+                self.before_model_callback,
+            ]
+            agent.after_model_callback = [
+                self.after_model_callback,
+                *agent.canonical_after_model_callbacks,
+            ]
+            agent.before_tool_callback = [
+                self.before_tool_callback,
+                *agent.canonical_before_tool_callbacks,
+            ]
+            agent.after_tool_callback = [
+                self.after_tool_callback,
+                *agent.canonical_after_tool_callbacks,
+            ]
+        for sub_agent in agent.sub_agents:
+            self.instrument_agent(sub_agent)
+        return agent
+
+    # ===== Resumos =====
+
+    def _finish_trace(self, root: Span):
+        spans = self._spans.pop(root.trace_id, [])
+        # Spans que ficaram abertos (ex: ferramenta que lançou exceção)
+        for span in spans:
+            if not span.ended:
+                span.end_ns = root.end_ns
+                span.error = span.error or 'não finalizado'
+        for key in [
+            key for key, span in self._open_models.items() if span.ended
+        ]:
+            del self._open_models[key]
+        for key in [
+            key for key, span in self._open_tools.items() if span.ended
+        ]:
+            del self._open_tools[key]
+
+        if self.exporter is not None:
+            try:
+                self.exporter.export(spans)
+            except Exception as e:
+                logger.warning(f'Falha ao exportar spans: {e}')
+        self.turns.append(self._summarize(root, spans))
+
+    def _summarize(self, root: Span, spans: list[Span]) -> dict:
+        summary = defaultdict(float)
+        summary['name'] = root.name
+        summary['total'] = root.duration
+        for span in spans:
+            summary['db_queries'] += span.attributes.get('db.queries', 0)
+            if span.name == 'session.get_session':
+                summary['session_load'] += span.duration
+            elif span.name == 'session.append_event':
+                summary['session_commit'] += span.duration
+                summary['state_delta_bytes'] += span.attributes.get(
+                    'state.delta_bytes', 0
+                )
+            elif span.name in ('model.generate', 'tool.execute'):
+                agent = self.agents[span.attributes.get('agent.name', '?')]
+                if span.name == 'model.generate':
+                    input_tokens = span.attributes.get(
+                        'gen_ai.usage.input_tokens', 0
+                    )
+                    output_tokens = span.attributes.get(
+                        'gen_ai.usage.output_tokens', 0
+                    )
+                    summary['model'] += span.duration
+                    summary['model_calls'] += 1
+                    summary['input_tokens'] += input_tokens
+                    summary['output_tokens'] += output_tokens
+                    agent['model_calls'] += 1
+                    agent['model_time'] += span.duration
+                    agent['input_tokens'] += input_tokens
+                    agent['output_tokens'] += output_tokens
+                else:
+                    summary['tools'] += span.duration
+                    summary['tool_calls'] += 1
+                    agent['tool_calls'] += 1
+                    agent['tool_time'] += span.duration
+        summary['other'] = max(
+            0.0,
+            summary['total']
+            - summary['session_load']
+            - summary['session_commit']
+            - summary['model']
+            - summary['tools'],
+        )
+        return dict(summary)
+
+    @staticmethod
+    def format_turn(summary: dict) -> str:
+        def ms(key):
+            return f'{summary.get(key, 0.0) * 1000:.0f} ms'
+
+        return (
+            f'Turno: {ms("total")} | carregar sessão {ms("session_load")} | '
+            f'modelo {ms("model")} ({summary.get("model_calls", 0):.0f}x, '
+            f'{summary.get("input_tokens", 0):.0f}+'
+            f'{summary.get("output_tokens", 0):.0f} tokens) | '
+            f'ferramentas {ms("tools")} '
+            f'({summary.get("tool_calls", 0):.0f}x) | '
+            f'gravar sessão {ms("session_commit")} | outros {ms("other")} | '
+            f'{summary.get("db_queries", 0):.0f} consultas, '
+            f'delta de estado {summary.get("state_delta_bytes", 0):.0f} B'
+        )
+
+    def format_agents(self) -> str:
+        lines = ['Resumo por agente:']
+        for name, totals in self.agents.items():
+            model_calls = totals['model_calls'] or 1
+            tool_calls = totals['tool_calls'] or 1
+            lines.append(
+                f'  {name}: {totals["model_calls"]:.0f} chamadas ao modelo '
+                f'(média {totals["model_time"] / model_calls * 1000:.0f} ms, '
+                f'{totals["input_tokens"]:.0f}+'
+                f'{totals["output_tokens"]:.0f} tokens), '
+                f'{totals["tool_calls"]:.0f} ferramentas '
+                f'(média {totals["tool_time"] / tool_calls * 1000:.0f} ms)'
+            )
+        lines.append(
+            f'  Consultas ao banco em segundo plano: {self.background_queries}'
+        )
+        return '\n'.join(lines)
+
+
+class TracedRunner(Runner):
+    """Runner que envolve cada `run_async` em um span 'runner.run_async'."""
+
+    def __init__(self, *, tracer: Tracer, **kwargs):
+        super().__init__(**kwargs)
+        self.tracer = tracer
+
+    async def run_async(self, **kwargs) -> AsyncGenerator[Event, None]:
+        with self.tracer.span(
+            'runner.run_async', **{'agent.name': self.agent.name}
+        ) as span:
+            async for event in super().run_async(**kwargs):
+                if event.partial:
+                    span.add('events.partial')
+                else:
+                    span.add('events')
+                yield event
+
+
+class TracedSessionService(BaseSessionService):
+    """Mede cada chamada a outro session service, como um span por chamada.
+
+    Com `engine`, as consultas SQL feitas durante a chamada são contadas no
+    span ('db.queries'). `append_event` também registra o tamanho do delta
+    de estado gravado.
+    """
+
+    def __init__(
+        self, inner: BaseSessionService, tracer: Tracer, *, engine=None
+    ):
+        self._inner = inner
+        self.tracer = tracer
+        if engine is not None:
+            tracer.watch_engine(engine)
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        with self.tracer.span('session.create_session'):
+            return await self._inner.create_session(
+                app_name=app_name,
+                user_id=user_id,
+                state=state,
+                session_id=session_id,
+            )
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        with self.tracer.span('session.get_session') as span:
+            session = await self._inner.get_session(
+                app_name=app_name,
+                user_id=user_id,
+                session_id=session_id,
+                config=config,
+            )
+            if session is not None:
+                span.attributes['session.events'] = len(session.events)
+            return session
+
+    async def list_sessions(
+        self, *, app_name: str, user_id: str
+    ) -> ListSessionsResponse:
+        with self.tracer.span('session.list_sessions'):
+            return await self._inner.list_sessions(
+                app_name=app_name, user_id=user_id
+            )
+
+    async def delete_session(
+        self, *, app_name: str, user_id: str, session_id: str
+    ) -> None:
+        with self.tracer.span('session.delete_session'):
+            await self._inner.delete_session(
+                app_name=app_name, user_id=user_id, session_id=session_id
+            )
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return await self._inner.append_event(session=session, event=event)
+        state_delta = event.actions.state_delta if event.actions else {}
+        with self.tracer.span(
+            'session.append_event',
+            **{
+                'event.author': event.author,
+                'state.delta_keys': len(state_delta),
+                'state.delta_bytes': _json_size(state_delta)
+                if state_delta
+                else 0,
+            },
+        ):
+            return await self._inner.append_event(session=session, event=event)
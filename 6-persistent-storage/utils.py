@@ -1,4 +1,12 @@
+import time
+import weakref
+from typing import Optional
+
+from console import console
+from google.adk.agents.run_config import RunConfig, StreamingMode
 from google.genai import types
+from memory_agent.agent import instruction_template
+from memory_agent.reminder_store import LEGACY_KEY, ReminderStore
 
 
 # Códigos de cores ANSI para saída colorida no terminal
@@ -28,40 +36,52 @@ class Colors:
     BG_WHITE = '\033[47m'
 
 
-async def display_state(
-    session_service, app_name, user_id, session_id, label='Current State'
-):
-    """Exibe o estado atual da sessão de forma formatada."""
-    try:
-        session = await session_service.get_session(
-            app_name=app_name, user_id=user_id, session_id=session_id
-        )
+RESPONSE_HEADER = f'\n{Colors.BG_BLUE}{Colors.WHITE}{Colors.BOLD}╔══ RESPOSTA DO AGENTE ═════════════════════════════════════════{Colors.RESET}'
+RESPONSE_FOOTER = f'{Colors.BG_BLUE}{Colors.WHITE}{Colors.BOLD}╚═════════════════════════════════════════════════════════════{Colors.RESET}\n'
+
+# Modelos que falharam com streaming em cada Runner: os próximos turnos desse
+# Runner vão direto pelo modo sem streaming
+_streaming_unsupported: 'weakref.WeakKeyDictionary[object, set[str]]' = (
+    weakref.WeakKeyDictionary()
+)
 
+
+async def display_state(session, label='Current State'):
+    """Exibe o estado atual da sessão de forma formatada.
+
+    Recebe a sessão já carregada, para não consultar o banco só para exibi-la.
+    """
+    try:
         # Formata a saída com seções claras
-        print(f'\n{"-" * 10} {label} {"-" * 10}')
+        console.print(f'\n{"-" * 10} {label} {"-" * 10}')
 
         # Exibe o nome do usuário
         user_name = session.state.get('user_name', 'Unknown')
-        print(f'👤 Usuário: {user_name}')
+        console.print(f'👤 Usuário: {user_name}')
 
         # Exibe os lembretes
-        reminders = session.state.get('reminders', [])
+        reminders = ReminderStore(session.state).texts() or (
+            session.state.get(LEGACY_KEY) or []
+        )
         if reminders:
-            print('📝 Lembretes:')
+            console.print('📝 Lembretes:')
             for idx, reminder in enumerate(reminders, 1):
-                print(f'  {idx}. {reminder}')
+                console.print(f'  {idx}. {reminder}')
         else:
-            print('📝 Lembretes: Nenhum')
+            console.print('📝 Lembretes: Nenhum')
 
-        print('-' * (22 + len(label)))
+        console.print('-' * (22 + len(label)))
     except Exception as e:
-        print(f'Erro ao exibir estado: {e}')
+        console.print(f'Erro ao exibir estado: {e}')
+
+    # Escreve o bloco inteiro de uma vez
+    console.flush()
 
 
 async def process_agent_response(event):
     """Processa e exibe eventos de resposta do agente."""
     # Log de informações básicas do evento
-    print(f'ID do Evento: {event.id}, Autor: {event.author}')
+    console.print(f'ID do Evento: {event.id}, Autor: {event.author}')
 
     # Verifica tipos específicos de partes primeiro
     has_specific_part = False
@@ -69,7 +89,7 @@ async def process_agent_response(event):
         for part in event.content.parts:
             if hasattr(part, 'executable_code') and part.executable_code:
                 # Acessa o código real via .code
-                print(
+                console.print(
                     f'  Debug: Agente gerou código:\n```python\n{part.executable_code.code}\n```'
                 )
                 has_specific_part = True
@@ -78,19 +98,21 @@ async def process_agent_response(event):
                 and part.code_execution_result
             ):
                 # Acessa resultado e saída corretamente
-                print(
+                console.print(
                     f'  Debug: Resultado da Execução: {part.code_execution_result.outcome} - Saída:\n{part.code_execution_result.output}'
                 )
                 has_specific_part = True
             elif hasattr(part, 'tool_response') and part.tool_response:
                 # Imprime informações da resposta da ferramenta
-                print(f'  Resposta da Ferramenta: {part.tool_response.output}')
+                console.print(
+                    f'  Resposta da Ferramenta: {part.tool_response.output}'
+                )
                 has_specific_part = True
             # Também imprime qualquer parte de texto encontrada em qualquer evento para debug
             elif (
                 hasattr(part, 'text') and part.text and not part.text.isspace()
             ):
-                print(f"  Texto: '{part.text.strip()}'")
+                console.print(f"  Texto: '{part.text.strip()}'")
 
     # Verifica resposta final após partes específicas
     final_response = None
@@ -103,57 +125,214 @@ async def process_agent_response(event):
         ):
             final_response = event.content.parts[0].text.strip()
             # Usa cores e formatação para destacar a resposta final
-            print(
-                f'\n{Colors.BG_BLUE}{Colors.WHITE}{Colors.BOLD}╔══ RESPOSTA DO AGENTE ═════════════════════════════════════════{Colors.RESET}'
-            )
-            print(f'{Colors.CYAN}{Colors.BOLD}{final_response}{Colors.RESET}')
-            print(
-                f'{Colors.BG_BLUE}{Colors.WHITE}{Colors.BOLD}╚═════════════════════════════════════════════════════════════{Colors.RESET}\n'
+            console.print(RESPONSE_HEADER)
+            console.print(
+                f'{Colors.CYAN}{Colors.BOLD}{final_response}{Colors.RESET}'
             )
+            console.print(RESPONSE_FOOTER)
         else:
-            print(
+            console.print(
                 f'\n{Colors.BG_RED}{Colors.WHITE}{Colors.BOLD}==> Resposta Final do Agente: [Sem conteúdo de texto no evento final]{Colors.RESET}\n'
             )
 
+    # Uma escrita por evento, mantendo a ordem com as mensagens das ferramentas
+    console.flush()
     return final_response
 
 
-async def call_agent_async(runner, user_id, session_id, query):
-    """Chama o agente de forma assíncrona com a consulta do usuário."""
+def _event_text(event) -> str:
+    if not event.content or not event.content.parts:
+        return ''
+    return ''.join(part.text or '' for part in event.content.parts)
+
+
+class StreamingResponse:
+    """Exibe a resposta do agente token a token, a partir dos eventos parciais.
+
+    Com `StreamingMode.SSE`, o ADK entrega pedaços do texto como eventos
+    `partial=True` e, no final, o evento completo com o texto inteiro. Os
+    pedaços são escritos no terminal assim que chegam; o evento completo só
+    fecha o quadro da resposta, sem repetir o texto.
+
+    Também mede o tempo até o primeiro token (TTFT) e o tempo total do turno.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_token: Optional[float] = None
+        self.total: Optional[float] = None
+        # Se há texto parcial sendo exibido dentro do quadro da resposta
+        self._open = False
+
+    def _mark_first_token(self):
+        if self.first_token is None:
+            self.first_token = time.perf_counter() - self.started
+
+    def on_partial(self, event):
+        text = _event_text(event)
+        if not text:
+            return
+        self._mark_first_token()
+        if not self._open:
+            console.print(RESPONSE_HEADER)
+            console.print(f'{Colors.CYAN}{Colors.BOLD}', end='')
+            self._open = True
+        console.print(text, end='')
+        console.flush()
+
+    async def on_event(self, event) -> Optional[str]:
+        """Processa um evento completo; devolve o texto se for a resposta final."""
+        if _event_text(event).strip():
+            self._mark_first_token()
+        if not self._open:
+            # Modelo sem streaming (ou evento sem texto parcial antes)
+            return await process_agent_response(event)
+
+        self._open = False
+        console.print(Colors.RESET)
+        if event.is_final_response():
+            console.print(RESPONSE_FOOTER)
+            console.flush()
+            return _event_text(event).strip()
+        # Texto parcial seguido de uma chamada de ferramenta
+        console.print(RESPONSE_FOOTER)
+        return await process_agent_response(event)
+
+    def finish(self, invocation_id: Optional[str] = None):
+        self.total = time.perf_counter() - self.started
+        first_token = (
+            f'{self.first_token:.2f}s' if self.first_token is not None else '-'
+        )
+        console.print(
+            f'{Colors.YELLOW}⏱  Primeiro token: {first_token} | '
+            f'Turno completo: {self.total:.2f}s{Colors.RESET}'
+        )
+        # Métricas da instrução só depois da resposta, para não aparecerem no
+        # meio do texto em streaming
+        turn = instruction_template.turn_metrics(invocation_id)
+        if turn is not None:
+            console.print(f'--- {turn.summary()} ---')
+        console.flush()
+
+
+def _is_streaming_unsupported(error: BaseException) -> bool:
+    """Erro de um modelo/provedor que não aceita respostas em streaming.
+
+    Confere o tipo e o código do erro (e dos erros que o causaram), como o
+    `is_rate_limit_error` de `shared/rate_limit.py`: timeouts, limites de taxa,
+    falhas de autenticação ou de rede não contam.
+    """
+    while error is not None:
+        # Modelos do ADK sem implementação de streaming
+        if isinstance(error, NotImplementedError):
+            return True
+        # LiteLLM: parâmetro `stream` não suportado pelo provedor
+        if type(error).__name__ == 'UnsupportedParamsError':
+            return True
+        # HTTP 501 (Not Implemented) em qualquer provedor
+        for attr in ('code', 'status_code'):
+            if getattr(error, attr, None) == 501:
+                return True
+        # Gemini: o modelo não oferece o método `streamGenerateContent`
+        if getattr(error, 'code', None) in (400, 404) and (
+            'streamGenerateContent' in str(error)
+        ):
+            return True
+        error = error.__cause__
+    return False
+
+
+async def _run_turn(runner, user_id, session_id, content, streaming):
+    """Executa o turno e devolve o texto da resposta final."""
+    model = getattr(runner.agent, 'canonical_model', None)
+    model_name = str(getattr(model, 'model', runner.agent.name))
+    unsupported = _streaming_unsupported.setdefault(runner, set())
+    streaming = streaming and model_name not in unsupported
+    run_config = RunConfig(
+        streaming_mode=StreamingMode.SSE if streaming else StreamingMode.NONE
+    )
+    response = StreamingResponse()
+    final_response_text = None
+    invocation_id = None
+    received = False
+    try:
+        async for event in runner.run_async(
+            user_id=user_id,
+            session_id=session_id,
+            new_message=content,
+            run_config=run_config,
+        ):
+            received = True
+            invocation_id = event.invocation_id
+            if event.partial:
+                response.on_partial(event)
+                continue
+            text = await response.on_event(event)
+            if text:
+                final_response_text = text
+    except Exception as e:
+        if not streaming or received or not _is_streaming_unsupported(e):
+            raise
+        # O modelo recusou o streaming antes de responder qualquer coisa: a
+        # mesma mensagem vai de novo, em uma nova invocação sem streaming. O
+        # `run_async` não aceita continuar a sessão sem uma mensagem nova em
+        # todas as versões do ADK, então ela fica duas vezes no histórico.
+        unsupported.add(model_name)
+        console.print(
+            f'Streaming indisponível para {model_name} ({e}); '
+            'continuando sem streaming.'
+        )
+        console.flush()
+        async for event in runner.run_async(
+            user_id=user_id,
+            session_id=session_id,
+            new_message=content,
+            run_config=RunConfig(streaming_mode=StreamingMode.NONE),
+        ):
+            invocation_id = event.invocation_id
+            text = await response.on_event(event)
+            if text:
+                final_response_text = text
+    response.finish(invocation_id)
+    return final_response_text
+
+
+async def call_agent_async(runner, user_id, session_id, query, streaming=True):
+    """Chama o agente de forma assíncrona com a consulta do usuário.
+
+    Com `streaming=True`, a resposta aparece token a token à medida que o
+    modelo gera o texto; modelos sem suporte a streaming exibem a resposta
+    inteira no final, como antes.
+    """
     content = types.Content(role='user', parts=[types.Part(text=query)])
-    print(
+    console.print(
         f'\n{Colors.BG_GREEN}{Colors.BLACK}{Colors.BOLD}--- Executando Consulta: {query} ---{Colors.RESET}'
     )
     final_response_text = None
 
-    # Exibe estado antes do processamento
-    await display_state(
-        runner.session_service,
-        runner.app_name,
-        user_id,
-        session_id,
-        'Estado ANTES do processamento',
+    # Carrega a sessão uma única vez. Com o `CachedSessionService`, este é o
+    # mesmo objeto em memória que o Runner usa e atualiza durante o turno.
+    session = await runner.session_service.get_session(
+        app_name=runner.app_name, user_id=user_id, session_id=session_id
     )
 
+    # Exibe estado antes do processamento
+    await display_state(session, 'Estado ANTES do processamento')
+
     try:
         # O Google ADK recomenda sempre usar 'run_async' ao invés de 'run' para melhor performance.
-        async for event in runner.run_async(
-            user_id=user_id, session_id=session_id, new_message=content
-        ):
-            # Processa cada evento e obtém a resposta final se disponível
-            response = await process_agent_response(event)
-            if response:
-                final_response_text = response
+        final_response_text = await _run_turn(
+            runner, user_id, session_id, content, streaming
+        )
     except Exception as e:
-        print(f'Erro durante chamada do agente: {e}')
-
-    # Exibe estado após processar a mensagem
-    await display_state(
-        runner.session_service,
-        runner.app_name,
-        user_id,
-        session_id,
-        'Estado DEPOIS do processamento',
+        console.print(f'Erro durante chamada do agente: {e}')
+        console.flush()
+
+    # Exibe estado após processar a mensagem. A leitura é servida pelo cache,
+    # que já contém a sessão atualizada pelo Runner em `append_event`.
+    session = await runner.session_service.get_session(
+        app_name=runner.app_name, user_id=user_id, session_id=session_id
     )
+    await display_state(session, 'Estado DEPOIS do processamento')
 
     return final_response_text
@@ -0,0 +1,393 @@
+import asyncio
+import atexit
+import copy
+import logging
+import threading
+import time
+from typing import Any, Literal, Optional
+
+from adk_storage import extract_state_delta, storage_event, update_timestamp
+from google.adk.events import Event
+from google.adk.sessions import (
+    BaseSessionService,
+    DatabaseSessionService,
+    Session,
+)
+from google.adk.sessions.base_session_service import (
+    GetSessionConfig,
+    ListSessionsResponse,
+)
+from google.adk.sessions.database_session_service import (
+    StorageAppState,
+    StorageSession,
+    StorageUserState,
+)
+from session_index import (
+    SessionPage,
+    ensure_session_index,
+    latest_session,
+    list_sessions_page,
+)
+from sqlalchemy import event as sa_event
+from sqlalchemy import func
+from state_serialization import (
+    StateSerializer,
+    check_state_format,
+    install_state_serializer,
+)
+
+logger = logging.getLogger(__name__)
+
+# Mapeia o nível de durabilidade para o `PRAGMA synchronous` do SQLite:
+# - 'full': fsync a cada commit (mais seguro, mais lento)
+# - 'normal': em modo WAL, fsync apenas nos checkpoints (recomendado)
+# - 'off': nunca força fsync (mais rápido, pode perder dados em queda de energia)
+Durability = Literal['full', 'normal', 'off']
+_SYNCHRONOUS_PRAGMA = {'full': 'FULL', 'normal': 'NORMAL', 'off': 'OFF'}
+
+SessionKey = tuple[str, str, str]
+
+
+def _session_key(session: Session) -> SessionKey:
+    return (session.app_name, session.user_id, session.id)
+
+
+class WriteBehindSessionService(BaseSessionService):
+    """Session service com escrita adiada (write-behind) sobre o DatabaseSessionService.
+
+    Os eventos e deltas de estado de cada sessão ficam em um buffer na memória
+    e são gravados no banco em UMA única transação quando o buffer atinge
+    `max_pending_events` ou quando `flush_interval` segundos se passam desde o
+    primeiro evento pendente. Leituras de uma sessão com escrita pendente são
+    servidas pela cópia em memória, então o agente sempre enxerga seus
+    próprios dados.
+
+    Com `serializer` (ex: `MsgpackSerializer(compress_threshold=4096)`), o
+    estado é gravado em formato binário, opcionalmente comprimido; linhas já
+    gravadas em JSON continuam legíveis. Depois disso, o banco só pode ser
+    aberto por um serviço com o mesmo serializador: sem ele, a abertura falha.
+
+    ATENÇÃO: eventos ainda no buffer são perdidos se o processo morrer sem
+    chamar `close()`. Use `max_pending_events=1` para voltar ao comportamento
+    de gravação imediata.
+    """
+
+    def __init__(
+        self,
+        db_url: str,
+        *,
+        max_pending_events: int = 32,
+        flush_interval: float = 1.0,
+        durability: Durability = 'normal',
+        serializer: Optional[StateSerializer] = None,
+        **kwargs: Any,
+    ):
+        if durability not in _SYNCHRONOUS_PRAGMA:
+            raise ValueError(
+                f'Durabilidade inválida: {durability!r}. Use uma de {list(_SYNCHRONOUS_PRAGMA)}.'
+            )
+
+        self._inner = DatabaseSessionService(db_url=db_url, **kwargs)
+
+        engine = self._inner.db_engine
+        if serializer is not None and engine.dialect.name == 'sqlite':
+            # Só as conexões deste serviço usam o serializador
+            install_state_serializer(engine, serializer)
+        else:
+            if serializer is not None:
+                logger.warning(
+                    'Serializador de estado ignorado: só é suportado no SQLite.'
+                )
+            check_state_format(engine)
+        self.max_pending_events = max_pending_events
+        self.flush_interval = flush_interval
+        self.durability = durability
+
+        if self._inner.db_engine.dialect.name == 'sqlite':
+            self._configure_sqlite()
+        ensure_session_index(self._inner.db_engine)
+
+        # Eventos aguardando gravação, agrupados por sessão
+        self._pending: dict[SessionKey, list[Event]] = {}
+        # Última versão em memória de cada sessão com escrita pendente ou em andamento
+        self._live: dict[SessionKey, Session] = {}
+        self._pending_count = 0
+        self._first_pending_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+        self._closed = False
+
+        # Rede de segurança: grava o que restou se o programa terminar sem `close()`
+        atexit.register(self._flush_sync)
+
+    @property
+    def database(self) -> DatabaseSessionService:
+        """O DatabaseSessionService interno (ex: para manutenção como compactação)."""
+        return self._inner
+
+    def _configure_sqlite(self):
+        """Ativa o modo WAL e o nível de durabilidade em toda conexão SQLite."""
+        synchronous = _SYNCHRONOUS_PRAGMA[self.durability]
+
+        @sa_event.listens_for(self._inner.db_engine, 'connect')
+        def _set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute(f'PRAGMA synchronous={synchronous}')
+            cursor.close()
+
+        # O DatabaseSessionService já abriu conexões ao criar as tabelas;
+        # descartamos o pool para que as próximas conexões recebam os PRAGMAs.
+        self._inner.db_engine.dispose()
+
+    # ===== API do BaseSessionService =====
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        # A criação é gravada imediatamente: os eventos adiados precisam da linha da sessão.
+        return await self._inner.create_session(
+            app_name=app_name,
+            user_id=user_id,
+            state=state,
+            session_id=session_id,
+        )
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        with self._lock:
+            live = self._live.get((app_name, user_id, session_id))
+            if live is not None:
+                session = copy.deepcopy(live)
+            else:
+                session = None
+
+        if session is None:
+            return await self._inner.get_session(
+                app_name=app_name,
+                user_id=user_id,
+                session_id=session_id,
+                config=config,
+            )
+
+        # Aplica os mesmos filtros que o DatabaseSessionService aplicaria
+        if config:
+            if config.after_timestamp:
+                session.events = [
+                    e
+                    for e in session.events
+                    if e.timestamp >= config.after_timestamp
+                ]
+            if config.num_recent_events:
+                session.events = session.events[-config.num_recent_events :]
+        return session
+
+    async def list_sessions(
+        self, *, app_name: str, user_id: str
+    ) -> ListSessionsResponse:
+        return await self._inner.list_sessions(
+            app_name=app_name, user_id=user_id
+        )
+
+    async def latest_session(
+        self, *, app_name: str, user_id: str
+    ) -> Optional[Session]:
+        """Cabeçalho (sem estado e eventos) da sessão atualizada por último."""
+        # Eventos ainda no buffer também contam como atualização
+        await self.flush()
+        return await latest_session(
+            self._inner, app_name=app_name, user_id=user_id
+        )
+
+    async def list_sessions_page(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        page_size: int = 20,
+        page_token: Optional[str] = None,
+    ) -> SessionPage:
+        """Cabeçalhos das sessões, da mais recente para a mais antiga, em páginas."""
+        await self.flush()
+        return await list_sessions_page(
+            self._inner,
+            app_name=app_name,
+            user_id=user_id,
+            page_size=page_size,
+            page_token=page_token,
+        )
+
+    async def delete_session(
+        self, *, app_name: str, user_id: str, session_id: str
+    ) -> None:
+        key = (app_name, user_id, session_id)
+        with self._lock:
+            dropped = self._pending.pop(key, [])
+            self._pending_count -= len(dropped)
+            self._live.pop(key, None)
+        await self._inner.delete_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        )
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+
+        # Atualiza o estado e o histórico da sessão em memória (comportamento base)
+        await super().append_event(session=session, event=event)
+
+        key = _session_key(session)
+        with self._lock:
+            self._pending.setdefault(key, []).append(event)
+            self._live[key] = session
+            self._pending_count += 1
+            if self._first_pending_at is None:
+                self._first_pending_at = time.monotonic()
+            should_flush = self._pending_count >= self.max_pending_events
+
+        if should_flush:
+            await self.flush()
+        else:
+            self._ensure_flusher()
+        return event
+
+    # ===== Controle de gravação =====
+
+    async def flush(self):
+        """Grava todos os eventos pendentes em uma única transação."""
+        await asyncio.to_thread(self._flush_sync)
+
+    async def close(self):
+        """Para o flush periódico e grava o que ainda estiver pendente."""
+        self._closed = True
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+        atexit.unregister(self._flush_sync)
+
+    def _ensure_flusher(self):
+        if self._closed or (self._flusher and not self._flusher.done()):
+            return
+        self._flusher = asyncio.get_running_loop().create_task(
+            self._flush_periodically()
+        )
+
+    async def _flush_periodically(self):
+        while not self._closed:
+            await asyncio.sleep(self.flush_interval)
+            with self._lock:
+                first = self._first_pending_at
+            if first is None:
+                # Nada pendente: encerra e volta a ser criado no próximo evento
+                return
+            if time.monotonic() - first >= self.flush_interval:
+                try:
+                    await self.flush()
+                except Exception as e:
+                    logger.error(f'Falha ao gravar eventos pendentes: {e}')
+
+    def _flush_sync(self):
+        # Serializa os flushes para preservar a ordem dos eventos de uma sessão
+        with self._flush_lock:
+            with self._lock:
+                batch = self._pending
+                self._pending = {}
+                self._pending_count = 0
+                self._first_pending_at = None
+            if not batch:
+                return
+
+            try:
+                self._write_batch(batch)
+            except Exception:
+                # Devolve o lote ao buffer (na frente) para uma nova tentativa
+                with self._lock:
+                    for key, events in batch.items():
+                        self._pending[key] = events + self._pending.get(
+                            key, []
+                        )
+                    self._pending_count = sum(
+                        len(events) for events in self._pending.values()
+                    )
+                    self._first_pending_at = time.monotonic()
+                raise
+
+            with self._lock:
+                for key in batch:
+                    if key not in self._pending:
+                        self._live.pop(key, None)
+
+    def _write_batch(self, batch: dict[SessionKey, list[Event]]):
+        """Grava o lote agrupando os deltas de estado: uma atualização por linha."""
+        with self._inner.database_session_factory() as db:
+            for (app_name, user_id, session_id), events in batch.items():
+                storage_session = db.get(
+                    StorageSession, (app_name, user_id, session_id)
+                )
+                if storage_session is None:
+                    logger.warning(
+                        f'Sessão {session_id} não existe mais; {len(events)} eventos descartados.'
+                    )
+                    continue
+
+                # Coalesce: vários deltas viram um único dicionário por escopo
+                app_delta: dict[str, Any] = {}
+                user_delta: dict[str, Any] = {}
+                session_delta: dict[str, Any] = {}
+                for event in events:
+                    if event.actions and event.actions.state_delta:
+                        app, user, sess = extract_state_delta(
+                            event.actions.state_delta
+                        )
+                        app_delta.update(app)
+                        user_delta.update(user)
+                        session_delta.update(sess)
+                    db.add(storage_event(app_name, user_id, session_id, event))
+
+                if app_delta:
+                    storage_app_state = db.get(StorageAppState, (app_name))
+                    storage_app_state.state = {
+                        **storage_app_state.state,
+                        **app_delta,
+                    }
+                if user_delta:
+                    storage_user_state = db.get(
+                        StorageUserState, (app_name, user_id)
+                    )
+                    storage_user_state.state = {
+                        **storage_user_state.state,
+                        **user_delta,
+                    }
+                if session_delta:
+                    storage_session.state = {
+                        **storage_session.state,
+                        **session_delta,
+                    }
+                # Todo evento conta como atualização da sessão, mesmo sem
+                # mudança no estado (usado para achar a sessão mais recente)
+                storage_session.update_time = func.now()
+
+            db.commit()
+
+            # Mantém o `last_update_time` das sessões em memória alinhado com o banco
+            dialect_name = self._inner.db_engine.dialect.name
+            for key in batch:
+                storage_session = db.get(StorageSession, key)
+                live = self._live.get(key)
+                if storage_session is not None and live is not None:
+                    live.last_update_time = update_timestamp(
+                        storage_session.update_time, dialect_name
+                    )
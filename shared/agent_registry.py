@@ -0,0 +1,264 @@
+import ast
+import importlib
+import importlib.util
+import logging
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+# Pacotes pesados que só devem ser importados por quem realmente os usa
+HEAVY_IMPORTS = ('litellm',)
+
+
+@dataclass
+class AgentSpec:
+    # Nome da pasta do pacote (ex: 'openai-agent')
+    name: str
+    # Pasta da aula (ex: '3-litellm')
+    lesson: str
+    path: Path
+    # Variável do agent.py com o agente (ex: 'root_agent')
+    attribute: str
+    # `name` e `description` do agente, lidos do código-fonte
+    agent_name: Optional[str] = None
+    description: Optional[str] = None
+    # Pacotes de terceiros importados pelo agente (inclusive via shared/)
+    imports: frozenset[str] = field(default_factory=frozenset)
+    # Tempo do primeiro carregamento, em segundos (None se não carregado)
+    load_time: Optional[float] = None
+
+    @property
+    def heavy_imports(self) -> list[str]:
+        return [name for name in HEAVY_IMPORTS if name in self.imports]
+
+    @property
+    def uses_litellm(self) -> bool:
+        return 'litellm' in self.imports
+
+    @property
+    def module_name(self) -> str:
+        return self.name.replace('-', '_')
+
+
+def _imported_modules(tree: ast.Module, package: str) -> set[str]:
+    """Módulos importados em um arquivo (imports relativos ficam absolutos)."""
+    modules = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                modules.add(f'{package}.{node.module or ""}'.rstrip('.'))
+            else:
+                modules.add(node.module)
+                # `from shared import x` importa o módulo shared.x
+                modules.update(
+                    f'{node.module}.{alias.name}' for alias in node.names
+                )
+    return modules
+
+
+def _scan_imports(files: list[Path], package: str, root: Path) -> set[str]:
+    """Pacotes de terceiros importados, seguindo os módulos de shared/."""
+    roots, seen = set(), set()
+    pending = list(files)
+    while pending:
+        file = pending.pop()
+        if file in seen or not file.exists():
+            continue
+        seen.add(file)
+        tree = ast.parse(file.read_text(encoding='utf-8'))
+        for module in _imported_modules(tree, package):
+            top = module.split('.')[0]
+            if top == package or top in sys.stdlib_module_names:
+                continue
+            if top == 'shared':
+                pending.append(root / (module.replace('.', '/') + '.py'))
+                continue
+            roots.add(top)
+            # O LiteLlm do ADK importa o litellm ao ser importado
+            if 'lite_llm' in module:
+                roots.add('litellm')
+    return roots
+
+
+def _agent_assignment(tree: ast.Module) -> Optional[tuple[str, ast.Call]]:
+    """Variável do módulo que recebe o agente: `root_agent` ou `*_agent`."""
+    candidates = []
+    for node in tree.body:
+        if (
+            isinstance(node, ast.Assign)
+            and isinstance(node.value, ast.Call)
+            and len(node.targets) == 1
+            and isinstance(node.targets[0], ast.Name)
+        ):
+            func = node.value.func
+            func_name = getattr(func, 'id', None) or getattr(func, 'attr', '')
+            if func_name.endswith('Agent'):
+                candidates.append((node.targets[0].id, node.value))
+    for name, call in candidates:
+        if name == 'root_agent':
+            return name, call
+    return candidates[-1] if candidates else None
+
+
+def _keyword(call: ast.Call, name: str) -> Optional[str]:
+    for keyword in call.keywords:
+        if keyword.arg == name and isinstance(keyword.value, ast.Constant):
+            return keyword.value.value
+    return None
+
+
+def discover(root: Path = REPO_ROOT) -> list[AgentSpec]:
+    """Encontra os pacotes de agente (`<aula>/<pacote>/agent.py`) sem importá-los.
+
+    O `agent.py` de cada pacote é apenas lido e analisado (`ast`) para saber
+    qual variável guarda o agente e quais pacotes ele importa.
+    """
+    specs = []
+    for lesson in sorted(root.iterdir()):
+        if not lesson.is_dir() or lesson.name.startswith(('.', 'shared')):
+            continue
+        for package in sorted(lesson.iterdir()):
+            agent_file = package / 'agent.py'
+            if (
+                not (package / '__init__.py').exists()
+                or not agent_file.exists()
+            ):
+                continue
+            tree = ast.parse(agent_file.read_text(encoding='utf-8'))
+            assignment = _agent_assignment(tree)
+            if assignment is None:
+                logger.warning(f'Nenhum agente encontrado em {agent_file}')
+                continue
+            attribute, call = assignment
+            spec = AgentSpec(
+                name=package.name,
+                lesson=lesson.name,
+                path=package,
+                attribute=attribute,
+                agent_name=_keyword(call, 'name'),
+                description=_keyword(call, 'description'),
+            )
+            spec.imports = frozenset(
+                _scan_imports(
+                    sorted(package.glob('*.py')), spec.module_name, root
+                )
+            )
+            specs.append(spec)
+    return specs
+
+
+class AgentRegistry:
+    """Registro dos agentes do repositório, construídos só no primeiro uso.
+
+    A descoberta não importa nada: o ADK, o litellm e o código de cada agente
+    só são importados quando `get()` pede aquele agente pela primeira vez.
+    Um worker que atende todos os agentes sobe rápido e só paga o custo dos
+    agentes que realmente recebem pedidos (o litellm, por exemplo, só é
+    importado quando um agente que usa `LiteLlm` é pedido).
+
+    Exemplo:
+        registry = AgentRegistry()
+        registry.names()              # ['email_agent', 'greeting_agent', ...]
+        agent = registry.get('greeting_agent')
+    """
+
+    def __init__(self, root: Path = REPO_ROOT):
+        self.root = Path(root)
+        self._specs: dict[str, AgentSpec] = {}
+        for spec in discover(self.root):
+            if spec.name in self._specs:
+                logger.warning(
+                    f'Agente {spec.name} duplicado em {spec.lesson}; '
+                    f'usando o de {self._specs[spec.name].lesson}.'
+                )
+                continue
+            self._specs[spec.name] = spec
+        self._agents: dict[str, object] = {}
+        self._locks = {name: threading.Lock() for name in self._specs}
+
+    def names(self) -> list[str]:
+        return sorted(self._specs)
+
+    def spec(self, name: str) -> AgentSpec:
+        try:
+            return self._specs[name]
+        except KeyError:
+            raise KeyError(
+                f'Agente desconhecido: {name}. '
+                f'Disponíveis: {", ".join(self.names())}'
+            ) from None
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._specs
+
+    def __iter__(self) -> Iterator[AgentSpec]:
+        return iter(self._specs.values())
+
+    def loaded(self) -> list[str]:
+        return sorted(self._agents)
+
+    def get(self, name: str):
+        """Devolve o agente, importando o pacote na primeira chamada."""
+        agent = self._agents.get(name)
+        if agent is not None:
+            return agent
+        spec = self.spec(name)
+        # Duas threads pedindo o mesmo agente importam o pacote uma vez só
+        with self._locks[name]:
+            if name not in self._agents:
+                start = time.perf_counter()
+                self._agents[name] = self._load(spec)
+                spec.load_time = time.perf_counter() - start
+                logger.info(
+                    f'Agente {name} carregado em {spec.load_time:.2f}s'
+                )
+        return self._agents[name]
+
+    def _load(self, spec: AgentSpec):
+        # Como o `adk web`, carrega o .env da pasta do agente, se existir
+        env_file = spec.path / '.env'
+        if env_file.exists():
+            from dotenv import load_dotenv
+
+            load_dotenv(env_file)
+
+        package = self._import_package(spec)
+        module = importlib.import_module(f'{package.__name__}.agent')
+        return getattr(module, spec.attribute)
+
+    @staticmethod
+    def _import_package(spec: AgentSpec):
+        # Pastas como 'openai-agent' não são nomes de módulo válidos, então o
+        # pacote é importado pelo caminho, com '-' trocado por '_'
+        module_name = spec.module_name
+        existing = sys.modules.get(module_name)
+        if existing is not None:
+            if list(getattr(existing, '__path__', [])) == [str(spec.path)]:
+                return existing
+            module_name = f'{spec.lesson}_{module_name}'.replace('-', '_')
+
+        import_spec = importlib.util.spec_from_file_location(
+            module_name,
+            spec.path / '__init__.py',
+            submodule_search_locations=[str(spec.path)],
+        )
+        package = importlib.util.module_from_spec(import_spec)
+        sys.modules[module_name] = package
+        try:
+            import_spec.loader.exec_module(package)
+        except BaseException:
+            # Não deixa módulos pela metade para a próxima tentativa
+            for name in list(sys.modules):
+                if name == module_name or name.startswith(f'{module_name}.'):
+                    del sys.modules[name]
+            raise
+        return package
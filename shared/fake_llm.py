@@ -0,0 +1,144 @@
+import asyncio
+import os
+from collections import deque
+from typing import AsyncGenerator, Callable, Optional
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.genai import types
+from pydantic import PrivateAttr
+
+# Aproximação usada para preencher `usage_metadata`: ~4 caracteres por token
+CHARS_PER_TOKEN = 4
+
+# Recebe a requisição montada pelo ADK e devolve o conteúdo que o "modelo" responde
+Responder = Callable[[LlmRequest], types.Content]
+
+
+def text_reply(text: str) -> types.Content:
+    """Resposta de texto do modelo."""
+    return types.Content(role='model', parts=[types.Part(text=text)])
+
+
+def tool_call(name: str, /, **args) -> types.Content:
+    """Resposta do modelo pedindo a execução de uma ferramenta.
+
+    `name` é só posicional: ferramentas com um argumento `name` (como
+    `update_user_name`) podem recebê-lo em `args`.
+    """
+    return types.Content(
+        role='model',
+        parts=[
+            types.Part(function_call=types.FunctionCall(name=name, args=args))
+        ],
+    )
+
+
+def last_user_text(llm_request: LlmRequest) -> str:
+    """Texto da última mensagem do usuário na requisição."""
+    for content in reversed(llm_request.contents):
+        if content.role == 'user':
+            for part in content.parts or []:
+                if part.text:
+                    return part.text
+    return ''
+
+
+def last_function_response(
+    llm_request: LlmRequest,
+) -> Optional[types.FunctionResponse]:
+    """Resposta da ferramenta, se ela for a última coisa na requisição."""
+    if not llm_request.contents:
+        return None
+    for part in llm_request.contents[-1].parts or []:
+        if part.function_response:
+            return part.function_response
+    return None
+
+
+def _count_tokens(llm_request: LlmRequest) -> int:
+    chars = len(str(llm_request.config.system_instruction or ''))
+    for content in llm_request.contents:
+        for part in content.parts or []:
+            chars += len(part.text or '')
+            if part.function_call:
+                chars += len(str(part.function_call.args))
+            if part.function_response:
+                chars += len(str(part.function_response.response))
+    return chars // CHARS_PER_TOKEN
+
+
+class FakeLlm(BaseLlm):
+    """Modelo local e determinístico para testes e benchmarks sem acesso à rede.
+
+    As respostas vêm de um `responder` com roteiro fixo. Com `stream=True`, o
+    texto é entregue palavra por palavra como eventos parciais, como faria um
+    modelo real com SSE.
+    """
+
+    model: str = 'fake-llm'
+    responder: Responder
+    # Latência simulada de cada chamada, em segundos
+    latency: float = 0.0
+    # Contador de chamadas recebidas (útil para verificar caches)
+    calls: int = 0
+    # Simula o cache de contexto do provedor: o início da instrução igual ao
+    # de uma chamada anterior conta como tokens em cache
+    prefix_cache: bool = False
+    # Prefixos menores que isso não são reaproveitados (como nos provedores)
+    min_cached_tokens: int = 0
+
+    _instructions: deque = PrivateAttr(
+        default_factory=lambda: deque(maxlen=64)
+    )
+
+    @classmethod
+    def supported_models(cls) -> list[str]:
+        return [r'fake-.*']
+
+    def _cached_tokens(self, llm_request: LlmRequest) -> Optional[int]:
+        if not self.prefix_cache:
+            return None
+        instruction = str(llm_request.config.system_instruction or '')
+        shared = max(
+            (
+                len(os.path.commonprefix([instruction, previous]))
+                for previous in self._instructions
+            ),
+            default=0,
+        )
+        self._instructions.append(instruction)
+        cached = shared // CHARS_PER_TOKEN
+        return cached if cached >= max(self.min_cached_tokens, 1) else 0
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        self.calls += 1
+        content = self.responder(llm_request)
+        prompt_tokens = _count_tokens(llm_request)
+        output_tokens = (
+            sum(len(part.text or '') for part in content.parts)
+            // CHARS_PER_TOKEN
+        )
+        usage = types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_tokens,
+            cached_content_token_count=self._cached_tokens(llm_request),
+            candidates_token_count=output_tokens,
+            total_token_count=prompt_tokens + output_tokens,
+        )
+
+        text = ''.join(part.text or '' for part in content.parts)
+        if not stream or not text:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            yield LlmResponse(content=content, usage_metadata=usage)
+            return
+
+        # Streaming: distribui a latência entre os pedaços do texto
+        words = text.split(' ')
+        for i, word in enumerate(words):
+            if self.latency:
+                await asyncio.sleep(self.latency / len(words))
+            chunk = word if i == len(words) - 1 else word + ' '
+            yield LlmResponse(content=text_reply(chunk), partial=True)
+        yield LlmResponse(content=content, usage_metadata=usage)
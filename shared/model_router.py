@@ -0,0 +1,299 @@
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from typing import AsyncGenerator, Optional
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from pydantic import PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+
+class BackendStats:
+    """Latência e taxa de erro recentes de um backend, em médias móveis (EWMA).
+
+    A taxa de erro também cai com o tempo, pela metade a cada
+    `error_half_life` segundos: um backend marcado como não saudável, que não
+    recebe mais chamadas, volta a ser tentado depois de um tempo.
+    """
+
+    def __init__(
+        self, name: str, alpha: float, window: int, error_half_life: float
+    ):
+        self.name = name
+        self.alpha = alpha
+        self.error_half_life = error_half_life
+        self.latency: Optional[float] = None
+        self._error_rate = 0.0
+        self._error_time = time.monotonic()
+        self.samples: deque[float] = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+        self.wins = 0
+
+    @property
+    def error_rate(self) -> float:
+        elapsed = time.monotonic() - self._error_time
+        return self._error_rate * 0.5 ** (elapsed / self.error_half_life)
+
+    def _set_error_rate(self, error_rate: float):
+        self._error_rate = error_rate
+        self._error_time = time.monotonic()
+
+    def record_success(self, latency: float):
+        self.calls += 1
+        self.samples.append(latency)
+        self._update_latency(latency)
+        self._set_error_rate(self.error_rate * (1 - self.alpha))
+
+    def record_error(self, latency: float):
+        self.calls += 1
+        self.errors += 1
+        self._update_latency(latency)
+        self._set_error_rate(self.alpha + (1 - self.alpha) * self.error_rate)
+
+    def record_cancelled(self, elapsed: float):
+        # Perdeu a corrida: levou pelo menos `elapsed`, o que já indica lentidão
+        if self.latency is None or elapsed > self.latency:
+            self._update_latency(elapsed)
+
+    def _update_latency(self, latency: float):
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency = (
+                self.alpha * latency + (1 - self.alpha) * self.latency
+            )
+
+    def p95(self) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[max(0, int(len(ordered) * 0.95) - 1)]
+
+    def as_dict(self) -> dict:
+        p95 = self.p95()
+        return {
+            'latency_ewma_ms': (
+                round(self.latency * 1000, 1)
+                if self.latency is not None
+                else None
+            ),
+            'p95_ms': round(p95 * 1000, 1) if p95 is not None else None,
+            'error_rate': round(self.error_rate, 3),
+            'calls': self.calls,
+            'errors': self.errors,
+            'wins': self.wins,
+        }
+
+
+class RouterLlm(BaseLlm):
+    """Modelo que distribui as chamadas entre vários backends (LiteLlm, Gemini, ...).
+
+    Pode ser usado em qualquer lugar onde se usa um `LiteLlm`. Para cada backend
+    mantém médias móveis de latência e de erros e envia cada chamada ao mais
+    rápido entre os saudáveis (taxa de erro abaixo de `max_error_rate`). A
+    taxa de erro cai pela metade a cada `error_half_life` segundos, então um
+    backend fora da rotação volta a receber uma chamada de teste; se falhar
+    de novo, sai outra vez.
+
+    Se a resposta demorar mais que o p95 recente do backend escolhido, a mesma
+    requisição é enviada também ao segundo melhor (hedging) e vale a primeira
+    que responder. Se o backend falhar, o próximo é tentado.
+
+    `stats` mostra as médias de cada backend e as decisões tomadas. Cada
+    backend aparece pelo seu `model`; backends com o mesmo `model` (ex: o
+    mesmo modelo em dois `api_base`) ganham o sufixo `#<posição na lista>`.
+    """
+
+    model: str = 'router'
+    backends: list[BaseLlm]
+    # Peso da amostra mais recente nas médias móveis
+    alpha: float = 0.2
+    max_error_rate: float = 0.5
+    error_half_life: float = 30.0
+    # Espera antes do hedging enquanto o backend ainda tem poucas amostras
+    hedge_delay: float = 2.0
+    min_samples_for_p95: int = 20
+    window: int = 200
+
+    # Estatísticas na mesma ordem de `backends`
+    _stats: list[BackendStats] = PrivateAttr(default_factory=list)
+    _decisions: Counter = PrivateAttr(default_factory=Counter)
+    _hedges: int = PrivateAttr(default=0)
+    _hedge_wins: int = PrivateAttr(default=0)
+    _fallbacks: int = PrivateAttr(default=0)
+
+    def model_post_init(self, __context):
+        models = Counter(backend.model for backend in self.backends)
+        for i, backend in enumerate(self.backends):
+            name = backend.model
+            if models[name] > 1:
+                name = f'{name}#{i}'
+            self._stats.append(
+                BackendStats(
+                    name, self.alpha, self.window, self.error_half_life
+                )
+            )
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'backends': {stats.name: stats.as_dict() for stats in self._stats},
+            'routed_to': dict(self._decisions),
+            'hedges': self._hedges,
+            'hedge_wins': self._hedge_wins,
+            'fallbacks': self._fallbacks,
+        }
+
+    def _rank(self) -> list[int]:
+        """Posições dos backends do melhor para o pior: saudáveis primeiro, depois os mais rápidos.
+
+        Um backend ainda sem amostras vai à frente, para ser medido.
+        """
+
+        def key(index: int):
+            stats = self._stats[index]
+            error_rate = stats.error_rate
+            unhealthy = error_rate >= self.max_error_rate
+            latency = stats.latency if stats.latency is not None else 0.0
+            return (unhealthy, error_rate if unhealthy else 0, latency)
+
+        return sorted(range(len(self.backends)), key=key)
+
+    def _hedge_after(self, index: int) -> float:
+        stats = self._stats[index]
+        if len(stats.samples) < self.min_samples_for_p95:
+            return self.hedge_delay
+        return stats.p95()
+
+    async def _call(
+        self, index: int, llm_request: LlmRequest
+    ) -> list[LlmResponse]:
+        backend, stats = self.backends[index], self._stats[index]
+        # Cada backend recebe sua própria cópia: alguns alteram a requisição
+        request = llm_request.model_copy(deep=True)
+        request.model = backend.model
+        start = time.perf_counter()
+        try:
+            responses = [
+                response
+                async for response in backend.generate_content_async(request)
+            ]
+        except asyncio.CancelledError:
+            stats.record_cancelled(time.perf_counter() - start)
+            raise
+        except Exception:
+            stats.record_error(time.perf_counter() - start)
+            raise
+        if any(response.error_code for response in responses):
+            stats.record_error(time.perf_counter() - start)
+            raise RuntimeError(
+                f'{stats.name}: {responses[-1].error_code} '
+                f'{responses[-1].error_message}'
+            )
+        stats.record_success(time.perf_counter() - start)
+        return responses
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if stream:
+            async for response in self._generate_stream(llm_request):
+                yield response
+            return
+
+        ranking = self._rank()
+        self._decisions[self._stats[ranking[0]].name] += 1
+        pending: dict[asyncio.Task, int] = {}
+        next_index = 0
+        hedged = False
+        last_error: Optional[BaseException] = None
+
+        def launch():
+            nonlocal next_index
+            index = ranking[next_index]
+            next_index += 1
+            task = asyncio.ensure_future(self._call(index, llm_request))
+            pending[task] = index
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if not hedged and next_index < len(ranking):
+                    timeout = self._hedge_after(ranking[0])
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=timeout,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    # O backend escolhido passou do seu p95: dispara o segundo
+                    hedged = True
+                    self._hedges += 1
+                    logger.info(
+                        f'Hedging: {self._stats[ranking[0]].name} passou de '
+                        f'{timeout:.2f}s, chamando '
+                        f'{self._stats[ranking[next_index]].name}'
+                    )
+                    launch()
+                    continue
+
+                for task in done:
+                    index = pending.pop(task)
+                    stats = self._stats[index]
+                    try:
+                        responses = task.result()
+                    except Exception as e:
+                        last_error = e
+                        logger.warning(f'Backend {stats.name} falhou: {e!r}')
+                        if not pending and next_index < len(ranking):
+                            self._fallbacks += 1
+                            launch()
+                        continue
+
+                    stats.wins += 1
+                    if hedged and index != ranking[0]:
+                        self._hedge_wins += 1
+                    for response in responses:
+                        yield response
+                    return
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise last_error
+
+    async def _generate_stream(
+        self, llm_request: LlmRequest
+    ) -> AsyncGenerator[LlmResponse, None]:
+        """Streaming: sem hedging; troca de backend apenas antes do primeiro pedaço."""
+        ranking = self._rank()
+        self._decisions[self._stats[ranking[0]].name] += 1
+        last_error: Optional[BaseException] = None
+        for i, index in enumerate(ranking):
+            backend, stats = self.backends[index], self._stats[index]
+            request = llm_request.model_copy(deep=True)
+            request.model = backend.model
+            start = time.perf_counter()
+            started = False
+            try:
+                async for response in backend.generate_content_async(
+                    request, stream=True
+                ):
+                    started = True
+                    yield response
+            except Exception as e:
+                stats.record_error(time.perf_counter() - start)
+                if started:
+                    raise
+                last_error = e
+                if i + 1 < len(ranking):
+                    self._fallbacks += 1
+                continue
+            stats.record_success(time.perf_counter() - start)
+            stats.wins += 1
+            return
+        raise last_error
@@ -0,0 +1,201 @@
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+from typing import Any, AsyncGenerator, Optional
+
+import httpx
+import litellm
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.models.lite_llm import LiteLlm, LiteLLMClient
+
+logger = logging.getLogger(__name__)
+
+# Endereço usado no pré-aquecimento quando o agente não informa `api_base`
+DEFAULT_API_BASES = {
+    'openrouter': 'https://openrouter.ai/api/v1',
+    'openai': 'https://api.openai.com/v1',
+}
+
+_pool_size: Optional[int] = None
+
+
+def configure_pool(
+    pool_size: int = 20, keepalive_expiry: float = 60.0, timeout: float = 600.0
+):
+    """Cria o pool HTTP com keep-alive que o LiteLLM usa em todas as chamadas.
+
+    O LiteLLM guarda os clientes HTTP em variáveis globais, então o pool vale
+    para o processo inteiro e só é criado uma vez.
+    """
+    global _pool_size
+    if _pool_size is not None:
+        if pool_size != _pool_size:
+            logger.warning(
+                f'Pool HTTP do LiteLLM já criado com {_pool_size} conexões; '
+                f'ignorando pool_size={pool_size}.'
+            )
+        return
+    limits = httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
+        keepalive_expiry=keepalive_expiry,
+    )
+    # Cliente síncrono: usado pelo LiteLlm do ADK nas chamadas com streaming
+    litellm.client_session = httpx.Client(limits=limits, timeout=timeout)
+    litellm.aclient_session = httpx.AsyncClient(limits=limits, timeout=timeout)
+    _pool_size = pool_size
+
+
+def _request_key(model: str, messages: Any, tools: Any, kwargs: dict) -> str:
+    payload = {
+        'model': model,
+        'messages': messages,
+        'tools': tools,
+        'kwargs': kwargs,
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class PooledLiteLLMClient(LiteLLMClient):
+    """Cliente do LiteLlm que junta requisições idênticas em andamento.
+
+    Se várias sessões enviam exatamente a mesma requisição ao mesmo tempo, só
+    a primeira vai ao provedor; as demais aguardam e recebem uma cópia da
+    mesma resposta. Respostas em streaming não são compartilhadas.
+    """
+
+    def __init__(self, *, coalesce: bool = True):
+        self.coalesce = coalesce
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self.upstream_calls = 0
+        self.coalesced = 0
+
+    async def acompletion(self, model, messages, tools, **kwargs):
+        if not self.coalesce or kwargs.get('stream'):
+            self.upstream_calls += 1
+            return await super().acompletion(model, messages, tools, **kwargs)
+
+        key = _request_key(model, messages, tools, kwargs)
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.coalesced += 1
+            # `shield`: cancelar este chamador não cancela a chamada dos outros
+            return copy.deepcopy(await asyncio.shield(in_flight))
+
+        self.upstream_calls += 1
+        in_flight = asyncio.ensure_future(
+            super().acompletion(model, messages, tools, **kwargs)
+        )
+        self._in_flight[key] = in_flight
+        in_flight.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(in_flight)
+
+
+class PooledLiteLlm(LiteLlm):
+    """LiteLlm com conexões HTTP reaproveitadas, pré-aquecidas e requisições agrupadas.
+
+    - Um pool de conexões com keep-alive (`pool_size`) evita um novo handshake
+      TCP/TLS a cada chamada
+    - Com `prewarm`, as conexões do pool são abertas assim que possível
+      (ao carregar o agente no `adk web`, ou junto com a primeira chamada)
+    - Requisições idênticas em andamento viram uma única chamada ao provedor
+      (`coalesce`)
+
+    Aceita os mesmos argumentos do `LiteLlm` (api_key, api_base, ...).
+    """
+
+    _pool_size: int = 20
+    _prewarm: bool = True
+    _warm_task: Optional[asyncio.Task] = None
+    _warmed_connections: int = 0
+
+    def __init__(
+        self,
+        model: str,
+        *,
+        pool_size: int = 20,
+        keepalive_expiry: float = 60.0,
+        coalesce: bool = True,
+        prewarm: bool = True,
+        **kwargs: Any,
+    ):
+        super().__init__(
+            model=model,
+            llm_client=PooledLiteLLMClient(coalesce=coalesce),
+            **kwargs,
+        )
+        configure_pool(pool_size, keepalive_expiry)
+        self._pool_size = pool_size
+        self._prewarm = prewarm
+        if prewarm:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                # Sem event loop ainda: aquece junto com a primeira chamada
+                pass
+            else:
+                self._start_warm()
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'pool_size': self._pool_size,
+            'warmed_connections': self._warmed_connections,
+            'upstream_calls': self.llm_client.upstream_calls,
+            'coalesced': self.llm_client.coalesced,
+        }
+
+    def _start_warm(self):
+        if self._warm_task is None:
+            self._warm_task = asyncio.ensure_future(self.warm())
+
+    async def warm(self, connections: Optional[int] = None):
+        """Abre `connections` conexões com o provedor e as deixa no pool.
+
+        Faz requisições leves (GET /models) em paralelo; falhas apenas são
+        registradas no log, pois a chamada real ainda abrirá a conexão.
+        """
+        provider = self.model.split('/', 1)[0]
+        api_base = self._additional_args.get(
+            'api_base'
+        ) or DEFAULT_API_BASES.get(provider)
+        if not api_base:
+            return
+        headers = {}
+        if self._additional_args.get('api_key'):
+            headers['Authorization'] = (
+                f'Bearer {self._additional_args["api_key"]}'
+            )
+
+        async def open_connection():
+            await litellm.aclient_session.get(
+                f'{api_base.rstrip("/")}/models', headers=headers
+            )
+
+        results = await asyncio.gather(
+            *(
+                open_connection()
+                for _ in range(connections or self._pool_size)
+            ),
+            return_exceptions=True,
+        )
+        errors = [r for r in results if isinstance(r, Exception)]
+        self._warmed_connections = len(results) - len(errors)
+        if errors:
+            logger.warning(
+                f'Pré-aquecimento de {api_base}: {len(errors)} falhas '
+                f'({errors[0]!r})'
+            )
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if self._prewarm:
+            self._start_warm()
+        async for response in super().generate_content_async(
+            llm_request, stream=stream
+        ):
+            yield response
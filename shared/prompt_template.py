@@ -0,0 +1,297 @@
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Mapping, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.sessions.state import State
+
+# Cache explícito de contexto (ADK 1.15+): o ADK cria um cache no provedor com
+# a instrução, as ferramentas e o início do histórico. No ADK 1.3, resta o
+# cache implícito do provedor, que depende do prefixo estável da instrução.
+try:
+    from google.adk.agents.context_cache_config import ContextCacheConfig
+    from google.adk.apps import App
+except ImportError:
+    ContextCacheConfig = None
+    App = None
+
+# Mesma sintaxe de placeholders das instruções do ADK: {var}, {var?} e
+# {app:var}/{user:var}/{temp:var}. Chaves que não formam um nome de variável
+# (como o exemplo de JSON na instrução do email_agent) ficam como estão.
+PLACEHOLDER = re.compile(r'{+[^{}]*}+')
+
+# Calcula o valor de um placeholder a partir do estado da sessão
+Field = Callable[[Mapping[str, Any]], Any]
+
+
+def _is_state_name(name: str) -> bool:
+    parts = name.split(':')
+    if len(parts) == 1:
+        return name.isidentifier()
+    prefixes = (State.APP_PREFIX, State.USER_PREFIX, State.TEMP_PREFIX)
+    return (
+        len(parts) == 2
+        and f'{parts[0]}:' in prefixes
+        and parts[1].isidentifier()
+    )
+
+
+@dataclass(frozen=True)
+class _Placeholder:
+    name: str
+    optional: bool
+    # Texto estático logo depois do placeholder
+    suffix: str
+
+
+@dataclass
+class TurnMetrics:
+    invocation_id: str
+    renders: int = 0
+    render_seconds: float = 0.0
+    # Tamanho da instrução renderizada e da parte estática (prefixo)
+    instruction_chars: int = 0
+    static_chars: int = 0
+    model_calls: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    # Chamadas em que a instrução não começou pelo prefixo estático
+    prefix_misses: int = 0
+
+    @property
+    def uncached_tokens(self) -> int:
+        return self.prompt_tokens - self.cached_tokens
+
+    def summary(self) -> str:
+        return (
+            f'Instrução: renderizada em {self.render_seconds * 1e6:.0f} µs '
+            f'({self.static_chars}/{self.instruction_chars} caracteres '
+            f'estáticos) | Prompt: {self.prompt_tokens} tokens '
+            f'({self.cached_tokens} em cache, {self.uncached_tokens} sem cache)'
+        )
+
+
+class PromptTemplate:
+    """Instrução compilada uma única vez em partes estáticas e dinâmicas.
+
+    Com uma instrução em texto, o ADK procura os placeholders na instrução
+    inteira a cada chamada ao modelo. Aqui, o texto é dividido na criação:
+    o prefixo estático (tudo antes do primeiro placeholder) já fica pronto, e
+    cada chamada só preenche os placeholders e junta as partes.
+
+    Use `instruction` como a instrução do agente (um `InstructionProvider`).
+    Os placeholders são preenchidos pelo estado da sessão ou, para valores
+    calculados, por uma função em `fields` (que recebe o estado).
+
+    Os provedores reaproveitam (context caching) o início idêntico de
+    prompts repetidos: o Gemini 2.5 faz isso automaticamente e cobra menos
+    pelos tokens em cache. Por isso, deixe as partes dinâmicas no fim do
+    texto: quanto maior o prefixo estático, mais tokens em cache.
+    `before_model_callback` confere se a instrução enviada ainda começa pelo
+    prefixo estático, e `after_model_callback` registra, por turno, o tempo
+    de renderização e os tokens em cache e sem cache informados pelo modelo.
+    Quando o ADK instalado tem `ContextCacheConfig`, `runner_args` marca o
+    contexto para cache explícito; a conferência do prefixo continua valendo
+    para o cache implícito nas versões anteriores.
+
+    Exemplo:
+        template = PromptTemplate(
+            'Regras fixas...\\nLembretes: {reminders}',
+            fields={'reminders': lambda state: render(state)},
+        )
+        agent = Agent(..., instruction=template.instruction)
+        runner = Runner(
+            **template.runner_args('App', agent), session_service=...
+        )
+    """
+
+    def __init__(
+        self,
+        text: str,
+        *,
+        fields: Optional[Mapping[str, Field]] = None,
+        verbose: bool = False,
+        max_turns: int = 256,
+    ):
+        self.text = text
+        self.fields = dict(fields or {})
+        self.verbose = verbose
+        self.max_turns = max_turns
+
+        # Compila: prefixo estático + (placeholder, texto seguinte)...
+        placeholders, prefix, last_end = [], None, 0
+        pending: Optional[tuple[str, bool]] = None
+        for match in PLACEHOLDER.finditer(text):
+            name = match.group().lstrip('{').rstrip('}').strip()
+            optional = name.endswith('?')
+            name = name.removesuffix('?')
+            if name.startswith('artifact.'):
+                raise ValueError(
+                    f'Placeholders de artefatos não são suportados: {name}'
+                )
+            if not _is_state_name(name):
+                continue
+            literal = text[last_end : match.start()]
+            if pending is None:
+                prefix = literal
+            else:
+                placeholders.append(_Placeholder(*pending, literal))
+            pending = (name, optional)
+            last_end = match.end()
+        if pending is None:
+            prefix = text
+        else:
+            placeholders.append(_Placeholder(*pending, text[last_end:]))
+
+        self.static_prefix: str = prefix
+        self._placeholders: tuple[_Placeholder, ...] = tuple(placeholders)
+        self._turns: 'OrderedDict[str, TurnMetrics]' = OrderedDict()
+        self.renders = 0
+        self.render_seconds = 0.0
+        self.model_calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.prefix_misses = 0
+
+    @property
+    def variables(self) -> list[str]:
+        return [placeholder.name for placeholder in self._placeholders]
+
+    def render(self, state: Mapping[str, Any]) -> str:
+        """Preenche os placeholders com `fields` ou com os valores do estado."""
+        parts = [self.static_prefix]
+        for placeholder in self._placeholders:
+            field = self.fields.get(placeholder.name)
+            if field is not None:
+                value = field(state)
+            elif placeholder.name in state:
+                value = state[placeholder.name]
+            elif placeholder.optional:
+                value = ''
+            else:
+                raise KeyError(
+                    f'Context variable not found: `{placeholder.name}`.'
+                )
+            parts.append(str(value))
+            parts.append(placeholder.suffix)
+        return ''.join(parts)
+
+    # ===== Integração com o agente =====
+
+    def _turn(self, invocation_id: str) -> TurnMetrics:
+        turn = self._turns.get(invocation_id)
+        if turn is None:
+            turn = self._turns[invocation_id] = TurnMetrics(invocation_id)
+            while len(self._turns) > self.max_turns:
+                self._turns.popitem(last=False)
+        return turn
+
+    def instruction(self, context: ReadonlyContext) -> str:
+        """`InstructionProvider` do agente: renderiza a instrução do turno."""
+        start = time.perf_counter()
+        rendered = self.render(context.state)
+        elapsed = time.perf_counter() - start
+
+        self.renders += 1
+        self.render_seconds += elapsed
+        turn = self._turn(context.invocation_id)
+        turn.renders += 1
+        turn.render_seconds += elapsed
+        turn.instruction_chars = len(rendered)
+        turn.static_chars = len(self.static_prefix)
+        return rendered
+
+    def before_model_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        """Confere se a instrução enviada começa pelo prefixo estático.
+
+        Uma `global_instruction` ou outro texto colocado antes da instrução
+        muda o início do prompt e impede o reaproveitamento pelo provedor.
+        """
+        system_instruction = llm_request.config.system_instruction
+        if isinstance(system_instruction, str) and not (
+            system_instruction.startswith(self.static_prefix)
+        ):
+            self.prefix_misses += 1
+            self._turn(callback_context.invocation_id).prefix_misses += 1
+        return None
+
+    def after_model_callback(
+        self, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> Optional[LlmResponse]:
+        """Registra os tokens do prompt (em cache e sem cache) da chamada."""
+        usage = llm_response.usage_metadata
+        # Pedaços parciais do streaming não trazem o uso de tokens
+        if llm_response.partial or usage is None:
+            return None
+
+        prompt_tokens = usage.prompt_token_count or 0
+        cached_tokens = usage.cached_content_token_count or 0
+        self.model_calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.cached_tokens += cached_tokens
+        turn = self._turn(callback_context.invocation_id)
+        turn.model_calls += 1
+        turn.prompt_tokens += prompt_tokens
+        turn.cached_tokens += cached_tokens
+        if self.verbose:
+            print(f'--- {turn.summary()} ---')
+        return None
+
+    def runner_args(
+        self, app_name: str, agent: Any, **cache_options
+    ) -> dict[str, Any]:
+        """Argumentos do `Runner` para `agent`, com cache explícito se houver.
+
+        Com `ContextCacheConfig` no ADK instalado, o agente roda dentro de um
+        `App` com `context_cache_config` (`cache_options` são os campos do
+        `ContextCacheConfig`, como `ttl_seconds`). Sem ele, devolve apenas
+        `app_name` e `agent`, como antes.
+        """
+        if ContextCacheConfig is None:
+            return {'app_name': app_name, 'agent': agent}
+        # Abaixo de ~1024 tokens o Gemini 2.5 não aceita cache explícito
+        cache_options.setdefault('min_tokens', 1024)
+        return {
+            'app': App(
+                name=app_name,
+                root_agent=agent,
+                context_cache_config=ContextCacheConfig(**cache_options),
+            )
+        }
+
+    # ===== Métricas =====
+
+    def turn_metrics(self, invocation_id: str) -> Optional[TurnMetrics]:
+        return self._turns.get(invocation_id)
+
+    @property
+    def last_turn(self) -> Optional[TurnMetrics]:
+        return next(reversed(self._turns.values()), None)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'renders': self.renders,
+            'avg_render_us': (
+                round(self.render_seconds / self.renders * 1e6, 1)
+                if self.renders
+                else 0.0
+            ),
+            'static_chars': len(self.static_prefix),
+            'template_chars': len(self.text),
+            'model_calls': self.model_calls,
+            'prompt_tokens': self.prompt_tokens,
+            'cached_tokens': self.cached_tokens,
+            'cached_ratio': (
+                round(self.cached_tokens / self.prompt_tokens, 3)
+                if self.prompt_tokens
+                else 0.0
+            ),
+            'prefix_misses': self.prefix_misses,
+        }
@@ -0,0 +1,143 @@
+import asyncio
+import random
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Limita a taxa de chamadas: `rate` fichas por segundo, acumulando até `capacity`.
+
+    Cada chamada ao provedor consome uma ficha. Quem chega sem ficha espera a
+    vez, na ordem de chegada, sem ocupar a cota do provedor.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError('rate deve ser maior que zero.')
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0):
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+    def drain(self):
+        """Zera as fichas, por exemplo após o provedor recusar por limite de taxa."""
+        self._refill()
+        self._tokens = 0.0
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Erro de limite de taxa (HTTP 429) do Gemini ou de provedores via LiteLLM.
+
+    Confere o código HTTP do erro (e dos erros que o causaram), não o texto
+    da mensagem: um '429' qualquer no texto não é um limite de taxa.
+    """
+    while error is not None:
+        # `code` no google-genai, `status_code` no LiteLLM e no httpx
+        for attr in ('code', 'status_code'):
+            if getattr(error, attr, None) == 429:
+                return True
+        if getattr(error, 'status', None) == 'RESOURCE_EXHAUSTED':
+            return True
+        if type(error).__name__ == 'RateLimitError':
+            return True
+        error = error.__cause__
+    return False
+
+
+def backoff_delay(attempt: int, base: float, maximum: float = 60.0) -> float:
+    """Espera exponencial com jitter para a tentativa `attempt` (começando em 0)."""
+    return min(maximum, base * 2**attempt) * random.uniform(0.5, 1.5)
+
+
+class SharedTokenBucket:
+    """Token bucket guardado em um arquivo SQLite, compartilhado entre processos.
+
+    Todos os processos que usam o mesmo arquivo e o mesmo `name` dividem as
+    mesmas fichas. Cada retirada é uma transação curta (BEGIN IMMEDIATE), então
+    dois processos nunca gastam a mesma ficha. A transação roda em uma thread,
+    para não travar o event loop enquanto outro processo segura o arquivo.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        rate: float,
+        capacity: Optional[float] = None,
+        name: str = 'default',
+    ):
+        if rate <= 0:
+            raise ValueError('rate deve ser maior que zero.')
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.name = name
+        # Uma transação por vez na conexão compartilhada entre as threads
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS token_buckets ('
+            'name TEXT PRIMARY KEY, tokens REAL NOT NULL, '
+            'updated_at REAL NOT NULL)'
+        )
+
+    def _take(self, tokens: float) -> float:
+        """Tenta retirar as fichas; devolve quanto tempo esperar (0 se conseguiu)."""
+        # Relógio de parede: é o único comum a todos os processos
+        with self._db_lock:
+            return self._take_locked(tokens)
+
+    def _take_locked(self, tokens: float) -> float:
+        now = time.time()
+        self._db.execute('BEGIN IMMEDIATE')
+        try:
+            row = self._db.execute(
+                'SELECT tokens, updated_at FROM token_buckets WHERE name = ?',
+                (self.name,),
+            ).fetchone()
+            available = self.capacity
+            if row is not None:
+                elapsed = max(0.0, now - row[1])
+                available = min(self.capacity, row[0] + elapsed * self.rate)
+            wait = 0.0
+            if available >= tokens:
+                available -= tokens
+            else:
+                wait = (tokens - available) / self.rate
+            self._db.execute(
+                'INSERT OR REPLACE INTO token_buckets VALUES (?, ?, ?)',
+                (self.name, available, now),
+            )
+            self._db.execute('COMMIT')
+        except BaseException:
+            self._db.execute('ROLLBACK')
+            raise
+        return wait
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """Espera até conseguir as fichas; devolve o tempo total de espera."""
+        waited = 0.0
+        while (wait := await asyncio.to_thread(self._take, tokens)) > 0:
+            await asyncio.sleep(wait)
+            waited += wait
+        return waited
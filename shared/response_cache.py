@@ -0,0 +1,282 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+
+
+def request_key(llm_request: LlmRequest) -> str:
+    """Hash da requisição: modelo, instrução renderizada, conteúdos e schema de saída."""
+    config = llm_request.config
+    system_instruction = config.system_instruction if config else None
+    response_schema = config.response_schema if config else None
+    if isinstance(response_schema, type) and hasattr(
+        response_schema, 'model_json_schema'
+    ):
+        # `output_schema` do agente: uma classe Pydantic
+        response_schema = response_schema.model_json_schema()
+
+    payload = {
+        'model': llm_request.model,
+        'system_instruction': system_instruction,
+        'contents': [
+            content.model_dump(mode='json', exclude_none=True)
+            for content in llm_request.contents
+        ],
+        'response_schema': response_schema,
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResponseCache:
+    """Cache opcional de respostas do modelo, para agentes determinísticos sem ferramentas.
+
+    Use os métodos `before_model_callback` e `after_model_callback` como
+    callbacks do agente. Uma requisição idêntica (mesmo modelo, mesma instrução
+    já com o estado preenchido, mesmas mensagens e mesmo schema de saída)
+    devolve a resposta guardada sem chamar o modelo.
+
+    Tem dois níveis: um dicionário LRU em memória (`max_entries`) e, se
+    `db_path` for informado, um arquivo SQLite que sobrevive a reinicializações.
+    As entradas expiram após `ttl` segundos. Nos callbacks, as leituras e
+    gravações do SQLite rodam em uma thread, fora do event loop.
+
+    Se a chamada ao modelo falhar, o `after_model_callback` não roda; a chave
+    guardada para ela é descartada após `pending_timeout` segundos.
+    """
+
+    def __init__(
+        self,
+        *,
+        enabled: bool = True,
+        ttl: float = 3600,
+        max_entries: int = 1024,
+        db_path: Optional[str] = None,
+        max_disk_entries: int = 100_000,
+        pending_timeout: float = 600,
+    ):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.pending_timeout = pending_timeout
+        self._memory: 'OrderedDict[str, tuple[float, LlmResponse]]' = (
+            OrderedDict()
+        )
+        # Chave calculada no before_model, usada para guardar no after_model:
+        # invocation_id -> (início da chamada em perf_counter, chave)
+        self._pending: 'OrderedDict[str, tuple[float, str]]' = OrderedDict()
+        # Último acesso das entradas lidas do disco, gravado junto com o
+        # próximo `put` em vez de um commit a cada acerto
+        self._touched: dict[str, float] = {}
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        if enabled and db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS llm_responses ('
+                'key TEXT PRIMARY KEY, response TEXT NOT NULL, '
+                'expires_at REAL NOT NULL, last_access REAL NOT NULL)'
+            )
+            self._db.execute(
+                'CREATE INDEX IF NOT EXISTS llm_responses_last_access '
+                'ON llm_responses (last_access)'
+            )
+            self._db.commit()
+
+    @classmethod
+    def from_env(cls, **kwargs) -> 'ResponseCache':
+        """Cache ativado apenas com RESPONSE_CACHE=1 (opt-in).
+
+        RESPONSE_CACHE_DB define o arquivo SQLite do nível em disco.
+        """
+        return cls(
+            enabled=os.getenv('RESPONSE_CACHE') == '1',
+            db_path=os.getenv('RESPONSE_CACHE_DB'),
+            **kwargs,
+        )
+
+    @property
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_ratio': round(hits / total, 3) if total else 0.0,
+            'memory_entries': len(self._memory),
+        }
+
+    # ===== Níveis do cache =====
+
+    def _get_memory(self, key: str) -> Optional[LlmResponse]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, response = entry
+            if expires_at > time.time():
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return response
+            del self._memory[key]
+        return None
+
+    def _read_disk(self, key: str) -> Optional[tuple[str, float]]:
+        """Linha (resposta em JSON, expiração) do SQLite; bloqueia."""
+        with self._db_lock:
+            return self._db.execute(
+                'SELECT response, expires_at FROM llm_responses WHERE key = ?',
+                (key,),
+            ).fetchone()
+
+    def _disk_hit(
+        self, key: str, row: Optional[tuple[str, float]]
+    ) -> Optional[LlmResponse]:
+        now = time.time()
+        if row is None or row[1] <= now:
+            return None
+        response = LlmResponse.model_validate_json(row[0])
+        self._touched[key] = now
+        self._remember(key, row[1], response)
+        self.disk_hits += 1
+        return response
+
+    def get(self, key: str) -> Optional[LlmResponse]:
+        response = self._get_memory(key)
+        if response is None and self._db is not None:
+            response = self._disk_hit(key, self._read_disk(key))
+        if response is None:
+            self.misses += 1
+        return response
+
+    async def get_async(self, key: str) -> Optional[LlmResponse]:
+        """Como `get`, mas lê o SQLite em uma thread, fora do event loop."""
+        response = self._get_memory(key)
+        if response is None and self._db is not None:
+            row = await asyncio.to_thread(self._read_disk, key)
+            response = self._disk_hit(key, row)
+        if response is None:
+            self.misses += 1
+        return response
+
+    def _write_disk(self, row: tuple, touched: dict[str, float], now: float):
+        """Grava uma entrada e os últimos acessos pendentes; bloqueia."""
+        with self._db_lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?, ?)',
+                row,
+            )
+            self._db.executemany(
+                'UPDATE llm_responses SET last_access = ? WHERE key = ?',
+                [(at, key) for key, at in touched.items()],
+            )
+            # Remove expirados e, acima do limite, os menos usados
+            self._db.execute(
+                'DELETE FROM llm_responses WHERE expires_at <= ?', (now,)
+            )
+            self._db.execute(
+                'DELETE FROM llm_responses WHERE key IN ('
+                'SELECT key FROM llm_responses ORDER BY last_access DESC '
+                'LIMIT -1 OFFSET ?)',
+                (self.max_disk_entries,),
+            )
+            self._db.commit()
+
+    def _store(self, key: str, response: LlmResponse) -> Optional[tuple]:
+        """Guarda na memória; devolve os argumentos da gravação em disco, se houver."""
+        now = time.time()
+        expires_at = now + self.ttl
+        self._remember(key, expires_at, response)
+        if self._db is None:
+            return None
+        touched, self._touched = self._touched, {}
+        row = (
+            key,
+            response.model_dump_json(exclude_none=True),
+            expires_at,
+            now,
+        )
+        return row, touched, now
+
+    def put(self, key: str, response: LlmResponse):
+        disk_write = self._store(key, response)
+        if disk_write is not None:
+            self._write_disk(*disk_write)
+
+    async def put_async(self, key: str, response: LlmResponse):
+        """Como `put`, mas grava o SQLite em uma thread, fora do event loop."""
+        disk_write = self._store(key, response)
+        if disk_write is not None:
+            await asyncio.to_thread(self._write_disk, *disk_write)
+
+    def _remember(self, key: str, expires_at: float, response: LlmResponse):
+        self._memory[key] = (expires_at, response)
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    # ===== Callbacks do agente =====
+
+    def key(self, llm_request: LlmRequest) -> Optional[str]:
+        """Chave da requisição no cache; None indica que ela não deve ser guardada."""
+        return request_key(llm_request)
+
+    def _expire_pending(self):
+        """Descarta as chaves de chamadas que falharam (sem after_model)."""
+        limit = time.perf_counter() - self.pending_timeout
+        while self._pending:
+            invocation_id, (started, _) = next(iter(self._pending.items()))
+            if started > limit:
+                break
+            del self._pending[invocation_id]
+
+    async def before_model_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        """Devolve a resposta em cache, pulando a chamada ao modelo."""
+        if not self.enabled:
+            return None
+        self._expire_pending()
+        key = self.key(llm_request)
+        if key is None:
+            return None
+        cached = await self.get_async(key)
+        if cached is not None:
+            return cached.model_copy(deep=True)
+        self._pending[callback_context.invocation_id] = (
+            time.perf_counter(),
+            key,
+        )
+        return None
+
+    async def after_model_callback(
+        self, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> Optional[LlmResponse]:
+        """Guarda respostas completas e sem erro do modelo."""
+        if not self.enabled:
+            return None
+        if llm_response.partial:
+            return None
+        pending = self._pending.pop(callback_context.invocation_id, None)
+        if (
+            pending is not None
+            and llm_response.content
+            and not llm_response.error_code
+        ):
+            await self.put_async(
+                pending[1], llm_response.model_copy(deep=True)
+            )
+        return None
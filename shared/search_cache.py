@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import re
+import time
+import unicodedata
+from typing import Optional, Union
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+
+from .rate_limit import SharedTokenBucket, TokenBucket
+from .response_cache import ResponseCache
+
+
+# Pontuação de fim de frase, que não muda o sentido da pergunta
+_TRAILING_PUNCTUATION = re.compile(r'[\s?!.,;:]+$')
+
+
+def normalize_query(text: str) -> str:
+    """Forma canônica da pergunta: sem acentos, caixa ou espaços extras.
+
+    'Notícias de IA?' e '  noticias  de ia' viram a mesma chave. Fora a
+    pontuação no fim da frase, símbolos ficam como estão: 'C++', 'C#' e
+    '.NET' são perguntas diferentes de 'C' e 'NET'.
+    """
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = _TRAILING_PUNCTUATION.sub('', text.casefold())
+    return ' '.join(text.split())
+
+
+def _query_text(llm_request: LlmRequest) -> str:
+    if not llm_request.contents or llm_request.contents[-1].role != 'user':
+        return ''
+    return ' '.join(
+        part.text for part in llm_request.contents[-1].parts or [] if part.text
+    )
+
+
+class SearchCache(ResponseCache):
+    """Cache das respostas com busca do Google, indexado pela pergunta normalizada.
+
+    Funciona como o `ResponseCache` (memória + SQLite, com TTL), mas a chave é
+    a pergunta normalizada em vez do texto exato da requisição. Na primeira
+    mensagem de uma sessão a chave depende apenas da pergunta, então a mesma
+    pergunta feita por usuários diferentes reaproveita a resposta; nas
+    seguintes, o histórico anterior também entra na chave.
+
+    Em caso de falha no cache, a chamada passa pelo `limiter` (um token bucket,
+    que pode ser compartilhado entre processos) antes de chegar ao provedor.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl: float = 900,
+        limiter: Optional[Union[TokenBucket, SharedTokenBucket]] = None,
+        **kwargs,
+    ):
+        super().__init__(ttl=ttl, **kwargs)
+        self.limiter = limiter
+        # Latência média das chamadas que foram ao provedor (EWMA)
+        self.miss_latency: Optional[float] = None
+        self.throttled_seconds = 0.0
+
+    @classmethod
+    def from_env(cls, **kwargs) -> 'SearchCache':
+        """Cache ativado apenas com SEARCH_CACHE=1 (opt-in), como o
+        `ResponseCache.from_env`; desativado, nenhum arquivo é criado.
+
+        - SEARCH_CACHE_DB: arquivo SQLite do cache (padrão: search_cache.db)
+        - SEARCH_RATE_LIMIT: buscas por minuto permitidas entre todos os
+          processos que usam o mesmo arquivo
+        """
+        enabled = os.getenv('SEARCH_CACHE') == '1'
+        db_path = os.getenv('SEARCH_CACHE_DB', 'search_cache.db')
+        limiter = None
+        if enabled and os.getenv('SEARCH_RATE_LIMIT'):
+            limiter = SharedTokenBucket(
+                db_path,
+                rate=float(os.getenv('SEARCH_RATE_LIMIT')) / 60,
+                name='google_search',
+            )
+        return cls(
+            enabled=enabled,
+            db_path=db_path,
+            limiter=limiter,
+            **kwargs,
+        )
+
+    @property
+    def stats(self) -> dict:
+        stats = super().stats
+        hits = self.memory_hits + self.disk_hits
+        stats['avg_miss_latency_ms'] = (
+            round(self.miss_latency * 1000, 1)
+            if self.miss_latency is not None
+            else None
+        )
+        stats['saved_latency_s'] = round(hits * (self.miss_latency or 0.0), 2)
+        stats['throttled_s'] = round(self.throttled_seconds, 2)
+        return stats
+
+    def key(self, llm_request: LlmRequest) -> Optional[str]:
+        query = normalize_query(_query_text(llm_request))
+        if not query:
+            return None
+        config = llm_request.config
+        payload = {
+            'model': llm_request.model,
+            'system_instruction': str(
+                config.system_instruction if config else ''
+            ),
+            'query': query,
+            'history': [
+                content.model_dump(mode='json', exclude_none=True)
+                for content in llm_request.contents[:-1]
+            ],
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    async def before_model_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        cached = await super().before_model_callback(
+            callback_context, llm_request
+        )
+        if cached is not None or not self.enabled:
+            return cached
+        if self.limiter is not None:
+            self.throttled_seconds += await self.limiter.acquire() or 0.0
+            # A latência do provedor não inclui a espera pelo limite
+            pending = self._pending.get(callback_context.invocation_id)
+            if pending is not None:
+                self._pending[callback_context.invocation_id] = (
+                    time.perf_counter(),
+                    pending[1],
+                )
+        return None
+
+    async def after_model_callback(
+        self, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> Optional[LlmResponse]:
+        if llm_response.partial:
+            return None
+        pending = self._pending.get(callback_context.invocation_id)
+        if pending is not None:
+            latency = time.perf_counter() - pending[0]
+            self.miss_latency = (
+                latency
+                if self.miss_latency is None
+                else 0.2 * latency + 0.8 * self.miss_latency
+            )
+        return await super().after_model_callback(
+            callback_context, llm_response
+        )
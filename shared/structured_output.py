@@ -0,0 +1,289 @@
+import logging
+from collections import OrderedDict
+from typing import Any, Optional, Union
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.models.registry import LLMRegistry
+from google.genai import types
+from pydantic import BaseModel, ValidationError
+
+logger = logging.getLogger(__name__)
+
+_CLOSERS = {'{': '}', '[': ']'}
+_CONTROL_ESCAPES = {'\n': '\\n', '\r': '\\r', '\t': '\\t'}
+
+
+class JsonRepairer:
+    """Lê um JSON pedaço por pedaço e corrige os defeitos mais comuns dos LLMs.
+
+    Cada caractere é processado uma única vez, então o texto pode ser
+    alimentado conforme chega no streaming. Corrige:
+    - Texto ou cercas de código (```json) antes e depois do JSON
+    - Vírgulas sobrando antes de '}' ou ']'
+    - Quebras de linha e tabulações literais dentro de strings
+    - Saída truncada: fecha a string e as estruturas que ficaram abertas
+    """
+
+    def __init__(self):
+        self._out: list[str] = []
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escape = False
+        self._started = False
+        self._done = False
+        # Vírgula (e espaços seguintes) aguardando o próximo caractere útil
+        self._pending = ''
+        self.length = 0
+        self.repairs: set[str] = set()
+
+    def feed(self, chunk: str):
+        self.length += len(chunk)
+        for char in chunk:
+            self._feed_char(char)
+
+    def _feed_char(self, char: str):
+        if self._done:
+            if not char.isspace():
+                self.repairs.add('trailing_text')
+            return
+
+        if not self._started:
+            if char in _CLOSERS:
+                self._started = True
+                self._stack.append(_CLOSERS[char])
+                self._out.append(char)
+            elif not char.isspace():
+                self.repairs.add('leading_text')
+            return
+
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == '\\':
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+            elif char in _CONTROL_ESCAPES:
+                self.repairs.add('control_char')
+                char = _CONTROL_ESCAPES[char]
+            self._out.append(char)
+            return
+
+        if self._pending:
+            if char.isspace():
+                self._pending += char
+                return
+            if char in '}]':
+                # Descarta a vírgula, mantendo os espaços
+                self.repairs.add('trailing_comma')
+                self._out.append(self._pending[1:])
+            else:
+                self._out.append(self._pending)
+            self._pending = ''
+
+        if char == ',':
+            self._pending = ','
+            return
+        if char == '"':
+            self._in_string = True
+        elif char in _CLOSERS:
+            self._stack.append(_CLOSERS[char])
+        elif char in '}]' and self._stack:
+            self._stack.pop()
+            if not self._stack:
+                self._done = True
+        self._out.append(char)
+
+    def text(self) -> str:
+        """O JSON corrigido até aqui, com o que estiver aberto já fechado."""
+        if not self._started:
+            return ''
+        text = ''.join(self._out)
+        if self._done:
+            return text
+
+        # Saída truncada: fecha string, remove o que ficou pela metade e
+        # fecha objetos e listas na ordem inversa
+        if self._in_string:
+            if self._escape:
+                text = text[:-1]
+            text += '"'
+        text = text.rstrip()
+        if text.endswith(':'):
+            text += ' null'
+        return text + ''.join(reversed(self._stack))
+
+    @property
+    def truncated(self) -> bool:
+        return self._started and not self._done
+
+
+class StructuredOutputGuard:
+    """Valida (e, se possível, corrige) a saída JSON de um agente com `output_schema`.
+
+    Use `before_model_callback` e `after_model_callback` como callbacks do
+    agente. A resposta do modelo é validada com o validador já compilado do
+    Pydantic; se for inválida, o `JsonRepairer` tenta corrigi-la localmente.
+    Só quando a correção não basta o modelo é chamado de novo (até
+    `max_retries` vezes).
+
+    `stats` mostra quantas respostas vieram válidas, quantas foram corrigidas
+    localmente (retentativas evitadas) e quantas precisaram de retentativa.
+
+    As retentativas chamam `model` (o mesmo modelo do agente, como nome ou
+    `BaseLlm`); sem ele, o nome do modelo da própria requisição.
+
+    Com `limiter` (ex: um `TokenBucket` de `shared.rate_limit`), cada
+    retentativa espera uma ficha, como as demais chamadas ao provedor.
+    """
+
+    def __init__(
+        self,
+        schema: type[BaseModel],
+        *,
+        model: Union[str, BaseLlm, None] = None,
+        max_retries: int = 1,
+        limiter: Optional[Any] = None,
+        max_pending: int = 256,
+    ):
+        self.schema = schema
+        # Validador em Rust compilado uma única vez pelo Pydantic para o schema
+        self._validator = schema.__pydantic_validator__
+        self.model = model
+        self.max_retries = max_retries
+        self.limiter = limiter
+        self.max_pending = max_pending
+        # Requisições e streams em andamento por invocation_id. Chamadas que
+        # falham ou são interrompidas nunca chegam à resposta final, então as
+        # entradas mais antigas são descartadas (LRU) em vez de acumular.
+        self._requests: 'OrderedDict[str, LlmRequest]' = OrderedDict()
+        self._streams: 'OrderedDict[str, JsonRepairer]' = OrderedDict()
+        self.valid = 0
+        self.repaired = 0
+        self.retries = 0
+        self.failures = 0
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'valid_first_try': self.valid,
+            'retries_avoided': self.repaired,
+            'retries': self.retries,
+            'failures': self.failures,
+        }
+
+    def _is_valid(self, text: str) -> bool:
+        try:
+            self._validator.validate_json(text)
+            return True
+        except ValidationError:
+            return False
+
+    def repair(self, text: str, repairer: Optional[JsonRepairer] = None):
+        """Retorna o JSON válido (corrigido se preciso) ou None se não houver conserto."""
+        if self._is_valid(text):
+            return text
+        if repairer is None:
+            repairer = JsonRepairer()
+            repairer.feed(text)
+        candidate = repairer.text()
+        if candidate and self._is_valid(candidate):
+            repairs = set(repairer.repairs)
+            if repairer.truncated:
+                repairs.add('truncated')
+            logger.info(
+                f'Saída de {self.schema.__name__} corrigida localmente: '
+                f'{sorted(repairs)}'
+            )
+            return candidate
+        return None
+
+    def before_model_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        # Guarda a requisição para uma eventual retentativa
+        self._remember(
+            self._requests, callback_context.invocation_id, llm_request
+        )
+        return None
+
+    def _remember(self, entries: OrderedDict, invocation_id: str, value):
+        entries[invocation_id] = value
+        entries.move_to_end(invocation_id)
+        while len(entries) > self.max_pending:
+            entries.popitem(last=False)
+
+    async def after_model_callback(
+        self, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> Optional[LlmResponse]:
+        invocation_id = callback_context.invocation_id
+        text = _response_text(llm_response)
+
+        # Streaming: cada pedaço é processado assim que chega
+        if llm_response.partial:
+            repairer = self._streams.get(invocation_id)
+            if repairer is None:
+                repairer = JsonRepairer()
+                self._remember(self._streams, invocation_id, repairer)
+            repairer.feed(text)
+            return None
+
+        llm_request = self._requests.pop(invocation_id, None)
+        repairer = self._streams.pop(invocation_id, None)
+        if repairer is not None and repairer.length != len(text):
+            repairer = None
+        if not text:
+            return None
+
+        if self._is_valid(text):
+            self.valid += 1
+            return None
+
+        fixed = self.repair(text, repairer)
+        if fixed is None and llm_request is not None:
+            fixed = await self._retry(llm_request)
+        elif fixed is not None:
+            self.repaired += 1
+
+        if fixed is None:
+            self.failures += 1
+            return None
+
+        # Altera a resposta no lugar (e retorna None) para que os próximos
+        # callbacks da lista, como o cache de respostas, também a recebam
+        llm_response.content = types.Content(
+            role='model', parts=[types.Part(text=fixed)]
+        )
+        return None
+
+    def _model(self, llm_request: LlmRequest) -> BaseLlm:
+        model = self.model or llm_request.model
+        if isinstance(model, BaseLlm):
+            return model
+        # Resolvido uma única vez, como o `canonical_model` do LlmAgent
+        llm = LLMRegistry.new_llm(model)
+        if self.model is not None:
+            self.model = llm
+        return llm
+
+    async def _retry(self, llm_request: LlmRequest) -> Optional[str]:
+        model = self._model(llm_request)
+        for _ in range(self.max_retries):
+            if self.limiter is not None:
+                await self.limiter.acquire()
+            self.retries += 1
+            text = ''
+            async for response in model.generate_content_async(llm_request):
+                if not response.partial:
+                    text = _response_text(response)
+            fixed = self.repair(text)
+            if fixed is not None:
+                return fixed
+        return None
+
+
+def _response_text(llm_response: LlmResponse) -> str:
+    if not llm_response.content or not llm_response.content.parts:
+        return ''
+    return ''.join(part.text or '' for part in llm_response.content.parts)
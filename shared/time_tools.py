@@ -0,0 +1,120 @@
+import time
+from datetime import datetime, tzinfo
+from functools import lru_cache
+from typing import Callable, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from .tool_cache import read_only
+
+# Relógio: uma função que devolve o horário atual em segundos desde a época
+# (como `time.time`). Nos testes, basta passar uma função com horário fixo.
+Clock = Callable[[], float]
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class MonotonicClock:
+    """Horário de parede calculado a partir do relógio monotônico.
+
+    Lê o horário do sistema uma vez e, a partir daí, soma o tempo decorrido
+    em `time.monotonic()`, que nunca volta para trás. A cada `resync` segundos
+    o horário do sistema é lido de novo, para acompanhar ajustes do NTP.
+
+    Entre duas sincronizações o horário só avança. Na sincronização, o horário
+    do sistema é aceito mesmo se tiver sido atrasado: o relógio corrigido é o
+    certo, e segurar o horário antigo o deixaria parado até o sistema
+    alcançá-lo.
+    """
+
+    def __init__(self, resync: float = 60.0):
+        self.resync = resync
+        self._sync()
+
+    def _sync(self):
+        self._wall = time.time()
+        self._monotonic = time.monotonic()
+
+    def __call__(self) -> float:
+        if time.monotonic() - self._monotonic >= self.resync:
+            self._sync()
+        return self._wall + (time.monotonic() - self._monotonic)
+
+
+@lru_cache(maxsize=None)
+def _zone(timezone: Optional[str]) -> Optional[tzinfo]:
+    # None: fuso horário local da máquina
+    return ZoneInfo(timezone) if timezone else None
+
+
+class TimeTool:
+    """Horário atual formatado, calculado no máximo uma vez por segundo e fuso.
+
+    A formatação (`strftime`) só acontece quando o segundo muda; chamadas no
+    mesmo segundo, de qualquer sessão, devolvem a string já pronta.
+    """
+
+    def __init__(
+        self,
+        clock: Optional[Clock] = None,
+        time_format: str = TIME_FORMAT,
+    ):
+        self.clock = clock or MonotonicClock()
+        self.time_format = time_format
+        # fuso -> (segundo, texto formatado)
+        self._cache: dict[Optional[str], tuple[int, str]] = {}
+
+    def now(self, timezone: Optional[str] = None) -> str:
+        second = int(self.clock())
+        cached = self._cache.get(timezone)
+        if cached is not None and cached[0] == second:
+            return cached[1]
+        text = datetime.fromtimestamp(second, _zone(timezone)).strftime(
+            self.time_format
+        )
+        self._cache[timezone] = (second, text)
+        return text
+
+    def get_current_time(self, timezone: Optional[str] = None) -> dict:
+        """Retorna a hora atual no formato YYYY-MM-DD HH:MM:SS.
+
+        Args:
+            timezone: Fuso horário IANA opcional, como 'America/Sao_Paulo' ou
+                'Europe/Lisbon'. Se omitido, usa o fuso horário local.
+
+        Returns:
+            Um dicionário com a hora atual
+        """
+        try:
+            current_time = self.now(timezone or None)
+        except (ZoneInfoNotFoundError, ValueError):
+            return {
+                'status': 'error',
+                'error_message': f"Fuso horário desconhecido: '{timezone}'.",
+            }
+        result = {'current_time': current_time}
+        if timezone:
+            result['timezone'] = timezone
+        return result
+
+
+# Instância compartilhada pelos agentes do repositório
+time_tool = TimeTool()
+
+
+# Não lê o estado da sessão; com o ToolCache no agente, chamadas repetidas no
+# mesmo segundo nem chegam a executar a função
+@read_only(ttl=1.0)
+def get_current_time(timezone: Optional[str] = None) -> dict:
+    """Retorna a hora atual no formato YYYY-MM-DD HH:MM:SS.
+
+    Args:
+        timezone: Fuso horário IANA opcional, como 'America/Sao_Paulo' ou
+            'Europe/Lisbon'. Se omitido, usa o fuso horário local.
+
+    Returns:
+        Um dicionário com a hora atual
+    """
+    # É crucial especificar o tipo de retorno da ferramenta (-> dict) e garantir
+    # que a saída seja um dicionário. Retornar um dicionário com chaves bem
+    # nomeadas (como 'current_time') fornece um contexto muito mais rico ao LLM.
+    return time_tool.get_current_time(timezone)
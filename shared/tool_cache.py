@@ -0,0 +1,191 @@
+import copy
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Optional
+
+from google.adk.tools import BaseTool, ToolContext
+
+POLICY_ATTRIBUTE = '_tool_cache_policy'
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    # Prefixos das chaves do estado que a ferramenta lê; vazio = não lê o estado
+    reads: tuple[str, ...] = ()
+    # None: o resultado vale apenas dentro do mesmo turno
+    ttl: Optional[float] = None
+
+    def depends_on(self, state_keys: Iterable[str]) -> bool:
+        return any(key.startswith(self.reads) for key in state_keys)
+
+
+def read_only(
+    func: Optional[Callable] = None,
+    *,
+    reads: Iterable[str] = (),
+    ttl: Optional[float] = None,
+):
+    """Marca uma ferramenta como somente leitura, para que o `ToolCache` reaproveite o resultado.
+
+    Args:
+        reads: Prefixos das chaves do estado que a ferramenta lê (ex:
+            'reminder:'). Quando outra ferramenta altera uma chave com um
+            desses prefixos, o resultado guardado é descartado. Deixe vazio
+            para ferramentas que não dependem do estado.
+        ttl: Por quantos segundos o resultado pode ser reaproveitado, inclusive
+            em turnos seguintes. Sem `ttl`, o cache vale apenas dentro do
+            mesmo turno.
+
+    A função é devolvida sem alterações (o ADK continua lendo sua assinatura
+    e docstring); apenas ganha o atributo com a política de cache.
+    """
+
+    def mark(function: Callable) -> Callable:
+        setattr(
+            function,
+            POLICY_ATTRIBUTE,
+            CachePolicy(reads=tuple(reads), ttl=ttl),
+        )
+        return function
+
+    return mark(func) if func is not None else mark
+
+
+def _policy_of(tool: BaseTool) -> Optional[CachePolicy]:
+    return getattr(getattr(tool, 'func', None), POLICY_ATTRIBUTE, None)
+
+
+@dataclass
+class _Entry:
+    response: dict
+    policy: CachePolicy
+    expires_at: float
+
+
+class ToolCache:
+    """Cache dos resultados de ferramentas marcadas com `@read_only`.
+
+    Use `before_tool_callback` e `after_tool_callback` como callbacks do
+    agente. Uma chamada repetida com os mesmos argumentos, no mesmo turno ou
+    dentro do `ttl`, recebe o resultado guardado sem executar a ferramenta.
+
+    Qualquer ferramenta que altere o estado (como `add_reminder`) descarta
+    automaticamente, na mesma sessão, os resultados das ferramentas que leem
+    as chaves alteradas.
+    """
+
+    def __init__(self, max_sessions: int = 1024, max_entries: int = 64):
+        self.max_sessions = max_sessions
+        self.max_entries = max_entries
+        self._sessions: 'OrderedDict[tuple, OrderedDict[tuple, _Entry]]' = (
+            OrderedDict()
+        )
+        # IDs das chamadas respondidas pelo cache (para não guardá-las de novo)
+        self._served: set[str] = set()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 3) if total else 0.0,
+            'invalidations': self.invalidations,
+        }
+
+    @staticmethod
+    def _session_key(tool_context: ToolContext) -> tuple:
+        session = tool_context._invocation_context.session
+        return (session.app_name, session.user_id, session.id)
+
+    @staticmethod
+    def _entry_key(
+        tool: BaseTool,
+        args: dict[str, Any],
+        tool_context: ToolContext,
+        policy: CachePolicy,
+    ) -> tuple:
+        # Sem TTL, o turno (invocation_id) faz parte da chave
+        scope = None if policy.ttl is not None else tool_context.invocation_id
+        return (
+            tool.name,
+            scope,
+            json.dumps(args, sort_keys=True, default=str),
+        )
+
+    def invalidate(self, tool_context: ToolContext, state_keys: Iterable):
+        """Descarta os resultados da sessão que dependem das chaves alteradas."""
+        state_keys = list(state_keys)
+        entries = self._sessions.get(self._session_key(tool_context))
+        if not entries or not state_keys:
+            return
+        for key in [
+            key
+            for key, entry in entries.items()
+            if entry.policy.depends_on(state_keys)
+        ]:
+            del entries[key]
+            self.invalidations += 1
+
+    def before_tool_callback(
+        self, tool: BaseTool, args: dict[str, Any], tool_context: ToolContext
+    ) -> Optional[dict]:
+        policy = _policy_of(tool)
+        if policy is None:
+            return None
+        session_key = self._session_key(tool_context)
+        entries = self._sessions.get(session_key)
+        entry_key = self._entry_key(tool, args, tool_context, policy)
+        entry = entries.get(entry_key) if entries else None
+        if entry is None or entry.expires_at <= time.monotonic():
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._sessions.move_to_end(session_key)
+        entries.move_to_end(entry_key)
+        self._served.add(tool_context.function_call_id)
+        return copy.deepcopy(entry.response)
+
+    def after_tool_callback(
+        self,
+        tool: BaseTool,
+        args: dict[str, Any],
+        tool_context: ToolContext,
+        tool_response: Any,
+    ) -> Optional[dict]:
+        if tool_context.function_call_id in self._served:
+            self._served.discard(tool_context.function_call_id)
+            return None
+
+        # Chaves do estado alteradas por esta chamada
+        self.invalidate(tool_context, tool_context.actions.state_delta)
+
+        policy = _policy_of(tool)
+        if policy is None or not isinstance(tool_response, dict):
+            return None
+        if tool_response.get('status') == 'error':
+            return None
+
+        session_key = self._session_key(tool_context)
+        entries = self._sessions.setdefault(session_key, OrderedDict())
+        self._sessions.move_to_end(session_key)
+        if len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+        # Sem TTL a chave já inclui o turno; o prazo só evita que resultados
+        # de turnos antigos fiquem guardados para sempre
+        ttl = policy.ttl if policy.ttl is not None else 300.0
+        entries[self._entry_key(tool, args, tool_context, policy)] = _Entry(
+            response=copy.deepcopy(tool_response),
+            policy=policy,
+            expires_at=time.monotonic() + ttl,
+        )
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+        return None